@@ -1,4 +1,7 @@
 import os
+import threading
+import time
+from collections import OrderedDict
 from flask import Flask, render_template, redirect, url_for, request, flash, jsonify
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user, UserMixin
 from datetime import datetime
@@ -10,12 +13,14 @@ load_dotenv('config.env')
 # DB e Models (use SEMPRE os objetos do database.py)
 from backend.db.database import SessionLocal, engine, create_db_tables
 #from backend.models.models import Usuario, Oferta, LojaConfiavel, Tag, CanalTelegram, Produto, MetricaOferta
-from backend.models.models import Usuario, Oferta, LojaConfiavel, Tag, CanalTelegram, Produto
+from backend.models.models import Usuario, Oferta, LojaConfiavel, Tag, CanalTelegram, Produto, MetricaOferta
 from backend.utils.auth import hash_password, check_password
 from sqlalchemy.orm import joinedload, selectinload
-import unicodedata, re
 
 from backend.utils.config import get_config
+from backend.utils.cache import data_versions, bump_data_version, invalidate_data_versions
+from backend.utils.fila import parse_filtros, page_size, query_fila, serialize_oferta, count_fila
+from backend.utils.feed import change_feed
 from sqlalchemy import or_
 
 # Garantir as tabelas uma ÚNICA vez, usando o bootstrap centralizado do database.py
@@ -38,16 +43,49 @@ class UserLogin(UserMixin):
         self.email = user.email
         self.is_admin = user.is_admin
 
+# Cache de UserLogin por id (TTL + LRU). Evita 1 query por requisição autenticada;
+# a versão "usuarios" em versoes_dados invalida entre processos quando um usuário muda.
+USER_CACHE_TTL_SEC = float(os.getenv("USER_CACHE_TTL_SEC", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "256"))
+_user_cache: "OrderedDict[int, tuple[float, tuple, UserLogin]]" = OrderedDict()
+_user_cache_lock = threading.Lock()
+
+def invalidate_user_cache(uid: int | None = None):
+    with _user_cache_lock:
+        if uid is None:
+            _user_cache.clear()
+        else:
+            _user_cache.pop(uid, None)
+
 @login_manager.user_loader
 def load_user(user_id):
     try:
         uid = int(user_id)
     except ValueError:
         return None
+
+    versao = data_versions("usuarios")
+    now = time.monotonic()
+    with _user_cache_lock:
+        hit = _user_cache.get(uid)
+        if hit and hit[0] > now and hit[1] == versao:
+            _user_cache.move_to_end(uid)
+            return hit[2]
+
     # Fecha a sessão automaticamente ao fim do bloco
     with SessionLocal() as db:
         user = db.get(Usuario, uid)  # SQLAlchemy 2.x
-        return UserLogin(user) if user else None
+        login = UserLogin(user) if user else None
+    if login is None:
+        invalidate_user_cache(uid)
+        return None
+
+    with _user_cache_lock:
+        _user_cache[uid] = (now + USER_CACHE_TTL_SEC, versao, login)
+        _user_cache.move_to_end(uid)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+    return login
 
 @app.route("/login", methods=["GET", "POST"])
 def login():
@@ -58,8 +96,11 @@ def login():
         username = request.form["username"]
         password = request.form["password"]
 
+        # Só as colunas necessárias; a sessão é fechada ANTES do bcrypt (lento de propósito)
         with SessionLocal() as db:
-            user = db.query(Usuario).filter_by(username=username).first()
+            user = (db.query(Usuario.id, Usuario.username, Usuario.email, Usuario.is_admin, Usuario.password_hash)
+                      .filter_by(username=username)
+                      .first())
 
         if user and check_password(password, user.password_hash):
             login_user(UserLogin(user))
@@ -77,56 +118,56 @@ def logout():
     flash("Você foi desconectado.", "info")
     return redirect(url_for("login"))
 
-def _norm(s: str) -> str:
-    s = (s or "").strip().lower()
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    return re.sub(r"\s+", " ", s)
-
-def _compile_pat(token: str):
-    if len(token) <= 3 and re.fullmatch(r"[a-z0-9]+", token or ""):
-        return re.compile(rf"(?<!\w){re.escape(token)}(?!\w)", re.I)
-    return re.compile(re.escape(token), re.I)
-
 @app.route("/")
 @app.route("/dashboard")
 @login_required
 def dashboard():
+    filtros = parse_filtros(request.args)
+    # cursor do feed ANTES da primeira página: nada que mude durante a consulta se perde
+    feed_seq = change_feed.current_seq()
     with SessionLocal() as db:
-        ofertas = (
-            db.query(Oferta)
-              .options(
-                  joinedload(Oferta.produto).selectinload(Produto.tags),
-                  joinedload(Oferta.loja),
-              )
-              .filter(Oferta.status == "PENDENTE_APROVACAO")
-              .all()
-        )
         todas_tags = db.query(Tag).order_by(Tag.nome_tag).all()
+        lojas = db.query(LojaConfiavel).order_by(LojaConfiavel.nome_loja).all()
 
-        # pré-compila padrões das tags
-        pats = []
-        for t in todas_tags:
-            nt = _norm(t.nome_tag)
-            if not nt: continue
-            pats.append((t, _compile_pat(nt)))
-
-        # anota no objeto uma lista de tags "filtradas" (só para a view)
-        for of in ofertas:
-            name_norm = _norm(of.produto.nome_produto)
-            matched = [t for t, pat in pats if pat.search(name_norm)]
-            of._prefilter_tags = matched  # atributo ad-hoc para a view
+        # Só a primeira página; o restante vem de /api/fila conforme o scroll
+        ofertas, next_cursor = query_fila(db, filtros, limit=page_size(request.args))
+        pagina = {
+            "items": [serialize_oferta(of) for of in ofertas],
+            "next_cursor": next_cursor,
+        }
+        total = count_fila(db)
 
     return render_template("fila_aprovacao.html",
-                           ofertas=ofertas,
+                           pagina=pagina,
+                           total=total,
+                           feed_seq=feed_seq,
+                           filtros=filtros,
+                           lojas=lojas,
                            todas_tags=todas_tags)
 
 @app.route("/publicadas")
 @login_required
 def publicadas():
     with SessionLocal() as db:
-        ofertas_publicadas = db.query(Oferta).filter(Oferta.status == "PUBLICADO").all()
+        ofertas_publicadas = (
+            db.query(Oferta)
+              .options(joinedload(Oferta.produto))
+              .filter(Oferta.status == "PUBLICADO")
+              .all()
+        )
         tags = db.query(Tag).all()
+
+        # Último valor por oferta (metricas_ofertas) em uma única consulta
+        ids = [of.id for of in ofertas_publicadas]
+        ultimas = {}
+        if ids:
+            for m in (db.query(MetricaOferta)
+                        .filter(MetricaOferta.oferta_id.in_(ids))
+                        .order_by(MetricaOferta.data_atualizacao.asc())
+                        .all()):
+                ultimas[m.oferta_id] = m
+        for of in ofertas_publicadas:
+            of._metrica = ultimas.get(of.id)  # atributo ad-hoc para a view
     return render_template("ofertas_publicadas.html", ofertas=ofertas_publicadas, tags=tags)
 
 @app.route("/configuracoes")
@@ -161,55 +202,35 @@ def setup_admin():
                 is_admin=True
             )
             db.add(admin_user)
+            bump_data_version(db, "usuarios")
             db.commit()
+            invalidate_data_versions()
+            invalidate_user_cache()
             return "Usuário admin criado com sucesso!", 200
     return "Usuário admin já existe.", 200
 
 @app.route("/produtos")
 @login_required
 def lista_produtos():
-    with SessionLocal() as db:
-        produtos = (
-            db.query(Produto)
-              .options(
-                  selectinload(Produto.tags),
-                  selectinload(Produto.historico_precos),
-                  selectinload(Produto.ofertas),
-              )
-              .all()
-        )
-
-        # Coleta os IDs de loja existentes nos produtos
-        seller_ids = {p.product_id_loja for p in produtos if getattr(p, "product_id_loja", None)}
-        alt_ids    = {getattr(p, "product_id_loja_alt", None) for p in produtos if getattr(p, "product_id_loja_alt", None)}
-
-        by_seller, by_alt = {}, {}
-        if seller_ids or alt_ids:
-            lojas = (
-                db.query(LojaConfiavel)
-                  .filter(
-                      or_(
-                          LojaConfiavel.id_loja_api.in_(seller_ids) if seller_ids else False,
-                          LojaConfiavel.id_loja_api_alt.in_(alt_ids) if alt_ids else False,
-                      )
-                  )
-                  .all()
-            )
-            by_seller = {l.id_loja_api: l.nome_loja for l in lojas if getattr(l, "id_loja_api", None)}
-            by_alt    = {l.id_loja_api_alt: l.nome_loja for l in lojas if getattr(l, "id_loja_api_alt", None)}
-
-        # Anota nome da loja (se encontrado) sem depender da tabela no template
-        for p in produtos:
-            p._nome_loja = by_seller.get(getattr(p, "product_id_loja", None)) \
-                           or by_alt.get(getattr(p, "product_id_loja_alt", None))
-
-    return render_template("produtos.html", produtos=produtos)
+    # Os cards são carregados via /api/produtos (resumos calculados no SQL, paginados)
+    return render_template("produtos.html")
 
 @app.route("/variaveis")
 @login_required
 def variaveis():
     return render_template("env_vars.html")
 
+@app.route("/metrics")
+def prometheus_metrics():
+    """Métricas das últimas execuções do pipeline (por estágio) no formato texto do Prometheus."""
+    from backend.models.models import ExecucaoPipeline
+    from backend.utils.telemetry import render_prometheus
+    with SessionLocal() as db:
+        ultimas = db.query(ExecucaoPipeline).order_by(ExecucaoPipeline.id.desc()).limit(50).all()
+        total = db.query(ExecucaoPipeline).count()
+        corpo = render_prometheus(ultimas, total)
+    return app.response_class(corpo, mimetype="text/plain", headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
 if __name__ == "__main__":
     # Garante tabelas e cria admin se necessário
     create_db_tables()
@@ -228,6 +249,7 @@ if __name__ == "__main__":
                 is_admin=True
             )
             db.add(admin_user)
+            bump_data_version(db, "usuarios")
             db.commit()
             print(f"Usuário admin inicial '{admin_username}' criado.")
 
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
@@ -8,7 +8,59 @@ load_dotenv('config.env')
 
 # Configuração do banco de dados SQLite
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./backend/db/curadoria_ofertas.db")
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+# Perfil de concorrência do SQLite (painel web + pipeline escrevendo no mesmo arquivo):
+# - WAL: leitores não bloqueiam o escritor nem são bloqueados por ele
+# - busy_timeout: quem precisa do lock de escrita espera em vez de falhar com "database is locked"
+# - synchronous=NORMAL: seguro em WAL (não corrompe), fsync só no checkpoint
+# - cache_size (KiB, por conexão) e mmap_size (bytes) para leituras mais baratas
+# Lidos do ambiente (config.env): get_config depende deste módulo.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "15000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Pool do processo web (uma conexão por thread ativa do servidor + folga)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def _is_sqlite_file(url: str) -> bool:
+    return url.startswith("sqlite") and ":memory:" not in url and url.rstrip("/") not in {"sqlite:", "sqlite:/"}
+
+
+def _set_sqlite_pragmas(dbapi_conn, connection_record) -> None:
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cur.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        cur.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        cur.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")
+        cur.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        cur.execute("PRAGMA temp_store = MEMORY")
+    finally:
+        cur.close()
+
+
+def make_engine(url: str = DATABASE_URL):
+    """Engine com o perfil acima (pragmas em cada conexão nova + pool dimensionado)."""
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_pre_ping=True)
+    kwargs = {
+        # timeout do driver (s) = mesmo limite do busy_timeout
+        "connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+    }
+    if _is_sqlite_file(url):
+        kwargs.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    eng = create_engine(url, **kwargs)
+    if _is_sqlite_file(url):
+        event.listen(eng, "connect", _set_sqlite_pragmas)
+    return eng
+
+
+engine = make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Uma ÚNICA Base para todo o projeto
@@ -30,6 +82,29 @@ def create_db_tables() -> None:
             pass
     Base.metadata.create_all(bind=engine)
 
+    # Migrações versionadas (índices) antes de popular as estruturas derivadas
+    try:
+        from backend.db.migrations import run_migrations
+    except Exception:
+        from migrations import run_migrations
+    run_migrations(engine)
+
+    # Índice de busca textual de produtos (FTS5); populado na primeira vez
+    try:
+        from backend.db.fts import ensure_fts
+    except Exception:
+        from fts import ensure_fts
+    ensure_fts(engine)
+
+    # Intervalos de preço (histórico compactado); populados na primeira vez
+    try:
+        from backend.db.intervalos import ensure_intervalos
+        from backend.models.models import IntervaloPreco
+    except Exception:
+        from intervalos import ensure_intervalos
+        from models import IntervaloPreco
+    ensure_intervalos(engine, IntervaloPreco.__table__)
+
 if __name__ == "__main__":
     create_db_tables()
-    print("Tabelas do banco de dados criadas com sucesso!")
\ No newline at end of file
+    print("Tabelas do banco de dados criadas com sucesso!")
@@ -0,0 +1,65 @@
+# backend/db/fila_eventos.py
+"""
+Gravação do feed de mudanças da fila de aprovação (tabela fila_eventos).
+
+Os eventos são escritos pelos eventos do ORM em Oferta, na mesma transação da alteração,
+por qualquer processo (pipeline/Collector, Validator, API). O processo web lê a tabela em
+backend/utils/feed.py e repassa os deltas aos curadores conectados.
+
+- novo:      oferta entrou na fila (criada ou voltou para PENDENTE_APROVACAO)
+- alterado:  oferta pendente teve algum campo exibido no card alterado
+- removido:  oferta saiu da fila (aprovada, rejeitada, agendada, apagada...)
+
+Updates/deletes em massa via Query.update()/delete() não disparam eventos: grave-os à mão.
+
+A retenção (limpar_eventos) roda na manutenção do pipeline/daemon: a tabela cresce a cada gravação
+em Oferta mesmo sem nenhum painel aberto.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect
+
+STATUS_FILA = "PENDENTE_APROVACAO"
+CAMPOS_CARD = ("preco_oferta", "preco_original", "desconto_real", "motivo_validacao", "loja_id", "produto_id")
+
+
+def limpar_eventos(horas: float) -> None:
+    """Apaga eventos mais velhos que `horas` (0 = manter tudo)."""
+    if not horas:
+        return
+    from backend.db.database import SessionLocal
+    from backend.models.models import FilaEvento
+
+    limite = datetime.now() - timedelta(hours=horas)
+    with SessionLocal() as db:
+        db.query(FilaEvento).filter(FilaEvento.criado_em < limite).delete(synchronize_session=False)
+        db.commit()
+
+
+def register_fila_listeners(oferta_cls, eventos_table) -> None:
+
+    def _registrar(conn, oferta_id, tipo):
+        conn.execute(eventos_table.insert(), {"oferta_id": oferta_id, "tipo": tipo, "criado_em": datetime.now()})
+
+    @event.listens_for(oferta_cls, "after_insert")
+    def _after_insert(mapper, conn, target):
+        if target.status == STATUS_FILA:
+            _registrar(conn, target.id, "novo")
+
+    @event.listens_for(oferta_cls, "after_update")
+    def _after_update(mapper, conn, target):
+        attrs = inspect(target).attrs
+        hist = attrs.status.history
+        if hist.has_changes():
+            if target.status == STATUS_FILA:
+                _registrar(conn, target.id, "novo")
+            elif not hist.deleted or hist.deleted[0] == STATUS_FILA:
+                # valor anterior desconhecido (atributo expirado) também conta como saída da fila
+                _registrar(conn, target.id, "removido")
+        elif target.status == STATUS_FILA and any(getattr(attrs, c).history.has_changes() for c in CAMPOS_CARD):
+            _registrar(conn, target.id, "alterado")
+
+    @event.listens_for(oferta_cls, "after_delete")
+    def _after_delete(mapper, conn, target):
+        if target.status == STATUS_FILA:
+            _registrar(conn, target.id, "removido")
@@ -0,0 +1,111 @@
+# backend/db/fts.py
+"""
+Índice de busca textual (SQLite FTS5) sobre produtos.nome_produto normalizado.
+
+- produtos_fts(rowid = produtos.id, nome_norm) guarda o nome já passado por normalize_text
+  (mesma remoção de acentos do Collector); o tokenizer unicode61 remove_diacritics 2 é só reforço.
+- Sincronizado por eventos do ORM (insert/update/delete de Produto).
+  Inserções em massa via Core não disparam eventos: use rebuild_fts() depois delas.
+"""
+import re
+
+from sqlalchemy import event, inspect, text
+
+from backend.utils.text import normalize_text
+
+FTS_TABLE = "produtos_fts"
+_CREATE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(nome_norm, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+
+def _ensure_table(conn) -> None:
+    # sem flag por processo: o mesmo processo pode usar outro banco (DATABASE_URL de testes/benchmark)
+    conn.execute(text(_CREATE_SQL))
+
+
+def rebuild_fts(conn) -> int:
+    """Recria o conteúdo do índice a partir de produtos (em lotes, sem carregar tudo em memória)."""
+    _ensure_table(conn)
+    conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    total, last_id = 0, 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, nome_produto FROM produtos WHERE id > :last ORDER BY id LIMIT 5000"),
+            {"last": last_id},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, nome_norm) VALUES (:id, :nome)"),
+            [{"id": r[0], "nome": normalize_text(r[1])} for r in rows],
+        )
+        total += len(rows)
+        last_id = rows[-1][0]
+    return total
+
+
+def ensure_fts(engine) -> None:
+    """Cria o índice se faltar e o popula quando estiver vazio mas já houver produtos."""
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        vazio = conn.execute(text(f"SELECT NOT EXISTS (SELECT 1 FROM {FTS_TABLE})")).scalar()
+        tem_produtos = conn.execute(text("SELECT EXISTS (SELECT 1 FROM produtos)")).scalar()
+        if vazio and tem_produtos:
+            rebuild_fts(conn)
+
+
+def fts_query(q: str) -> str | None:
+    """Texto livre -> expressão MATCH: cada termo normalizado vira prefixo ("termo"*), todos obrigatórios."""
+    termos = [t for t in re.split(r"[^0-9a-z]+", normalize_text(q)) if t]
+    if not termos:
+        return None
+    return " AND ".join(f'"{t}"*' for t in termos)
+
+
+def fts_ids_select(q: str):
+    """SELECT rowid ... para usar em Produto.id.in_(...) (None se q não tiver termos)."""
+    expr = fts_query(q)
+    if expr is None:
+        return None
+    return text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :fts_q").bindparams(fts_q=expr)
+
+
+def search_ids(conn, q: str, limit: int = 20):
+    """[(produto_id, score)] ordenados por relevância (bm25; menor = melhor)."""
+    expr = fts_query(q)
+    if expr is None:
+        return []
+    return conn.execute(
+        text(f"SELECT rowid, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} "
+             f"WHERE {FTS_TABLE} MATCH :fts_q ORDER BY score LIMIT :limit"),
+        {"fts_q": expr, "limit": limit},
+    ).all()
+
+
+def register_fts_listeners(produto_cls) -> None:
+    """Mantém produtos_fts em dia a cada insert/update/delete de Produto feito pelo ORM."""
+
+    def _upsert(conn, target):
+        _ensure_table(conn)
+        conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": target.id})
+        conn.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, nome_norm) VALUES (:id, :nome)"),
+            {"id": target.id, "nome": normalize_text(target.nome_produto)},
+        )
+
+    @event.listens_for(produto_cls, "after_insert")
+    def _after_insert(mapper, conn, target):
+        _upsert(conn, target)
+
+    @event.listens_for(produto_cls, "after_update")
+    def _after_update(mapper, conn, target):
+        # só reindexa quando o nome realmente mudou
+        if inspect(target).attrs.nome_produto.history.has_changes():
+            _upsert(conn, target)
+
+    @event.listens_for(produto_cls, "after_delete")
+    def _delete(mapper, conn, target):
+        _ensure_table(conn)
+        conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": target.id})
@@ -0,0 +1,157 @@
+# backend/db/intervalos.py
+"""
+Histórico de preços compactado em intervalos (tabela intervalos_precos): uma linha por
+(produto, loja, preço vigente), com valido_de/valido_ate (valido_ate NULL = preço atual).
+
+- Mantido pelos eventos do ORM a cada HistoricoPreco inserido: preço igual ao do intervalo aberto
+  não muda nada; preço diferente fecha o aberto e abre outro. Inserção fora de ordem (data anterior
+  ao início do intervalo aberto) recalcula só aquele (produto, loja).
+  Inserções/remoções em massa via Core não disparam eventos: use rebuild_intervalos() depois delas
+  (ou python -m backend.db.intervalos), ou gere os intervalos junto com a carga via intervalos_de().
+- O arquivamento do histórico (utils/historico_arquivo.py) não mexe aqui: os intervalos cobrem o
+  histórico inteiro e o rebuild lê também a camada fria.
+- estatisticas(): mínimo, máximo e média ponderada pelo tempo numa janela, lendo só os intervalos
+  que a cruzam (custo proporcional ao nº de mudanças de preço, não ao de observações).
+- observacoes conta as linhas de histórico de cada intervalo: mínimo, média e contagem do histórico
+  inteiro (quente + arquivado) saem daqui sem ler o arquivo (resumo de produtos do painel).
+"""
+import itertools
+from datetime import datetime
+
+from sqlalchemy import delete, event, insert, or_, select, text, update
+
+_PRECO_IGUAL = 1e-6
+_LOTE = 5000
+
+
+def intervalos_de(linhas):
+    """(produto_id, loja_id, preco, data) em ordem de data por par -> dicts de intervalos (o último aberto)."""
+    abertos: dict[tuple, dict] = {}
+    for produto_id, loja_id, preco, data in linhas:
+        par = (produto_id, loja_id)
+        atual = abertos.get(par)
+        if atual is not None and abs(atual["preco"] - preco) < _PRECO_IGUAL:
+            atual["observacoes"] += 1
+            continue
+        if atual is not None:
+            atual["valido_ate"] = data
+            yield atual
+        abertos[par] = {"produto_id": produto_id, "loja_id": loja_id, "preco": preco,
+                        "valido_de": data, "valido_ate": None, "observacoes": 1}
+    yield from abertos.values()
+
+
+def _inserir(conn, tabela, intervalos) -> int:
+    total, lote = 0, []
+    for iv in intervalos:
+        lote.append(iv)
+        if len(lote) >= _LOTE:
+            conn.execute(insert(tabela), lote)
+            total, lote = total + len(lote), []
+    if lote:
+        conn.execute(insert(tabela), lote)
+        total += len(lote)
+    return total
+
+
+def _linhas_arquivadas(produto_id=None, loja_id=None):
+    from backend.utils import historico_arquivo
+
+    for lote in historico_arquivo.ler_por_mes(produto_id, loja_id):
+        yield from ((r[1], r[2], r[3], r[4]) for r in lote)
+
+
+def _linhas_quentes(conn, tabela, produto_id=None, loja_id=None):
+    h = tabela.metadata.tables["historico_precos"]
+    stmt = (select(h.c.produto_id, h.c.loja_id, h.c.preco, h.c.data_verificacao)
+            .order_by(h.c.produto_id, h.c.loja_id, h.c.data_verificacao, h.c.id))
+    if produto_id is not None:
+        stmt = stmt.where(h.c.produto_id == produto_id, h.c.loja_id == loja_id)
+    yield from conn.execution_options(yield_per=_LOTE).execute(stmt)
+
+
+def rebuild_intervalos(conn, tabela) -> int:
+    """Recria todos os intervalos a partir do histórico (arquivo + tabela), com memória O(nº de pares)."""
+    conn.execute(delete(tabela))
+    linhas = itertools.chain(_linhas_arquivadas(), _linhas_quentes(conn, tabela))
+    return _inserir(conn, tabela, intervalos_de(linhas))
+
+
+def _reconstruir_par(conn, tabela, produto_id: int, loja_id: int):
+    conn.execute(delete(tabela).where(tabela.c.produto_id == produto_id, tabela.c.loja_id == loja_id))
+    linhas = itertools.chain(_linhas_arquivadas(produto_id, loja_id), _linhas_quentes(conn, tabela, produto_id, loja_id))
+    _inserir(conn, tabela, list(intervalos_de(linhas)))
+
+
+def ensure_intervalos(engine, tabela) -> None:
+    """Popula a tabela na primeira vez (vazia, mas já com histórico)."""
+    with engine.begin() as conn:
+        vazia = conn.execute(select(tabela.c.id).limit(1)).first() is None
+        tem_historico = conn.execute(text("SELECT EXISTS (SELECT 1 FROM historico_precos)")).scalar()
+        if vazia and tem_historico:
+            rebuild_intervalos(conn, tabela)
+
+
+def aplicar(conn, tabela, produto_id: int, loja_id: int, preco: float, data: datetime):
+    """Incorpora uma observação nova de preço aos intervalos do par."""
+    t = tabela
+    aberto = conn.execute(
+        select(t.c.id, t.c.preco, t.c.valido_de)
+        .where(t.c.produto_id == produto_id, t.c.loja_id == loja_id, t.c.valido_ate.is_(None))
+    ).first()
+    if aberto is not None and data <= aberto.valido_de:
+        _reconstruir_par(conn, t, produto_id, loja_id)   # fora de ordem: recalcula o par
+        return
+    if aberto is not None:
+        if abs(aberto.preco - preco) < _PRECO_IGUAL:
+            conn.execute(update(t).where(t.c.id == aberto.id).values(observacoes=t.c.observacoes + 1))
+            return
+        conn.execute(update(t).where(t.c.id == aberto.id).values(valido_ate=data))
+    conn.execute(insert(t).values(produto_id=produto_id, loja_id=loja_id, preco=preco,
+                                  valido_de=data, valido_ate=None, observacoes=1))
+
+
+def register_intervalo_listeners(historico_cls, tabela) -> None:
+    """Mantém intervalos_precos em dia a cada HistoricoPreco inserido pelo ORM."""
+
+    @event.listens_for(historico_cls, "after_insert")
+    def _after_insert(mapper, conn, target):
+        aplicar(conn, tabela, target.produto_id, target.loja_id, float(target.preco), target.data_verificacao)
+
+
+def estatisticas(conn, tabela, produto_id: int, desde: datetime, ate: datetime, loja_id: int = None) -> dict:
+    """
+    Estatísticas de preço em [desde, ate) ponderadas pelo tempo em que cada preço vigorou
+    (intervalo aberto vale até `ate`). Sem loja_id, soma as lojas: cada (loja, período) pesa igual.
+    """
+    t = tabela
+    cond = [t.c.produto_id == produto_id, t.c.valido_de < ate,
+            or_(t.c.valido_ate.is_(None), t.c.valido_ate > desde)]
+    if loja_id is not None:
+        cond.append(t.c.loja_id == loja_id)
+    rows = conn.execute(select(t.c.preco, t.c.valido_de, t.c.valido_ate).where(*cond)).all()
+
+    minimo = maximo = None
+    soma = peso = 0.0
+    for preco, de, ate_iv in rows:
+        seg = (min(ate_iv or ate, ate) - max(de, desde)).total_seconds()
+        minimo = preco if minimo is None else min(minimo, preco)
+        maximo = preco if maximo is None else max(maximo, preco)
+        soma += preco * seg
+        peso += seg
+    return {
+        "intervalos": len(rows),
+        "minimo": minimo,
+        "maximo": maximo,
+        "media_ponderada": soma / peso if peso else None,
+        # fração da janela com preço conhecido (sem loja_id pode passar de 1: lojas simultâneas)
+        "cobertura": peso / (ate - desde).total_seconds() if ate > desde else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    from backend.db.database import engine
+    from backend.models.models import IntervaloPreco
+
+    with engine.begin() as conn:
+        print(f"Intervalos recriados: {rebuild_intervalos(conn, IntervaloPreco.__table__)}")
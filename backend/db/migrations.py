@@ -0,0 +1,100 @@
+# backend/db/migrations.py
+"""
+Migrações versionadas do schema (SQLite).
+
+Cada migração é (versão, descrição, [comandos SQL]) e roda na sua própria transação;
+a versão aplicada fica registrada em schema_migrations. Rodar de novo não faz nada.
+As migrações devem ser aditivas/idempotentes (CREATE ... IF NOT EXISTS), para rodar
+com o painel e o pipeline usando o banco (quem precisar escrever espera o busy_timeout).
+
+Uso:
+    python -m backend.db.migrations          # aplica as pendentes
+    python -m backend.db.migrations --status # só mostra a versão atual
+
+create_db_tables() também aplica as pendentes depois do create_all.
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+MIGRATIONS = [
+    (1, "índices dos caminhos quentes (fila, histórico de preços, lojas)", [
+        # Fila de aprovação: status = ? ORDER BY data_encontrado DESC, id DESC (keyset)
+        "CREATE INDEX IF NOT EXISTS ix_ofertas_status_data ON ofertas (status, data_encontrado, id)",
+        # Collector._has_open_offer: produto + loja + status
+        "CREATE INDEX IF NOT EXISTS ix_ofertas_produto_loja_status ON ofertas (produto_id, loja_id, status)",
+        # Collector._last_price: produto + loja, último por data
+        "CREATE INDEX IF NOT EXISTS ix_historico_produto_loja_data "
+        "ON historico_precos (produto_id, loja_id, data_verificacao)",
+        # Validator: AVG(preco) por produto num intervalo de datas (índice cobre a consulta toda)
+        "CREATE INDEX IF NOT EXISTS ix_historico_produto_data_preco "
+        "ON historico_precos (produto_id, data_verificacao, preco)",
+        # Collector._find_existing_store: seller_id (id_loja_api_alt já é UNIQUE)
+        "CREATE INDEX IF NOT EXISTS ix_lojas_confiaveis_id_loja_api ON lojas_confiaveis (id_loja_api)",
+        # estatísticas para o planejador escolher os índices novos
+        "ANALYZE",
+    ]),
+    (2, "índice parcial das pendentes ainda sem anotação do validador", [
+        # Validator.validar_nao_anotadas: lê só as pendentes sem motivo_validacao, em ordem de id
+        "CREATE INDEX IF NOT EXISTS ix_ofertas_nao_anotadas ON ofertas (id) "
+        "WHERE status = 'PENDENTE_APROVACAO' AND motivo_validacao IS NULL",
+    ]),
+]
+
+_CREATE_TABLE = (
+    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+    "versao INTEGER PRIMARY KEY, descricao TEXT NOT NULL, aplicada_em DATETIME NOT NULL)"
+)
+
+
+def current_version(conn) -> int:
+    conn.execute(text(_CREATE_TABLE))
+    return conn.execute(text("SELECT COALESCE(MAX(versao), 0) FROM schema_migrations")).scalar()
+
+
+def run_migrations(engine) -> list[int]:
+    """Aplica, em ordem, as migrações acima da versão registrada. Retorna as versões aplicadas."""
+    with engine.begin() as conn:
+        atual = current_version(conn)
+
+    aplicadas = []
+    for versao, descricao, comandos in MIGRATIONS:
+        if versao <= atual:
+            continue
+        with engine.connect() as conn:
+            if engine.dialect.name == "sqlite":
+                # o pysqlite roda DDL fora de transação: abre uma explícita, já com o lock
+                # de escrita, para a migração ser atômica e serializada entre processos
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+            # outro processo pode ter aplicado enquanto esperávamos o lock
+            if current_version(conn) >= versao:
+                conn.rollback()
+                continue
+            try:
+                for sql in comandos:
+                    conn.execute(text(sql))
+                conn.execute(
+                    text("INSERT INTO schema_migrations (versao, descricao, aplicada_em) VALUES (:v, :d, :t)"),
+                    {"v": versao, "d": descricao, "t": datetime.now()},
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        print(f"[migrations] v{versao} aplicada: {descricao}")
+        aplicadas.append(versao)
+    return aplicadas
+
+
+if __name__ == "__main__":
+    from backend.db.database import engine, create_db_tables
+
+    if "--status" in sys.argv:
+        with engine.begin() as conn:
+            v = current_version(conn)
+        print(f"Versão do schema: {v} (mais recente: {MIGRATIONS[-1][0]})")
+    else:
+        create_db_tables()
+        with engine.begin() as conn:
+            print(f"Schema na versão {current_version(conn)}.")
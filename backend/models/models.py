@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Table, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, Float, DateTime, ForeignKey, Index, Table, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -81,6 +81,13 @@ class Produto(Base):
     historico_precos = relationship("HistoricoPreco", back_populates="produto")
     ofertas = relationship("Oferta", back_populates="produto")
 
+# Índice FTS5 de produtos.nome_produto, mantido pelos eventos do ORM
+try:
+    from ..db.fts import register_fts_listeners
+except Exception:
+    from fts import register_fts_listeners
+register_fts_listeners(Produto)
+
 class HistoricoPreco(Base):
     __tablename__ = "historico_precos"
     __table_args__ = {'extend_existing': True}
@@ -93,6 +100,29 @@ class HistoricoPreco(Base):
     produto = relationship("Produto", back_populates="historico_precos")
     loja = relationship("LojaConfiavel", back_populates="historico_precos")
 
+class IntervaloPreco(Base):
+    """Histórico compactado: um preço e o período em que vigorou (ver db/intervalos.py)."""
+    __tablename__ = "intervalos_precos"
+    __table_args__ = (
+        Index("ix_intervalos_produto_loja_ate", "produto_id", "loja_id", "valido_ate"),
+        Index("ix_intervalos_produto_de", "produto_id", "valido_de"),
+        {'extend_existing': True},
+    )
+    id = Column(Integer, primary_key=True)
+    produto_id = Column(Integer, ForeignKey('produtos.id'), nullable=False)
+    loja_id = Column(Integer, ForeignKey('lojas_confiaveis.id'), nullable=False)
+    preco = Column(Float, nullable=False)
+    valido_de = Column(DateTime, nullable=False)
+    valido_ate = Column(DateTime, nullable=True)   # NULL = preço atual
+    observacoes = Column(Integer, default=1, nullable=False)   # linhas de histórico cobertas
+
+# Intervalos de preço mantidos pelos eventos do ORM em HistoricoPreco (Collector)
+try:
+    from ..db.intervalos import register_intervalo_listeners
+except Exception:
+    from intervalos import register_intervalo_listeners
+register_intervalo_listeners(HistoricoPreco, IntervaloPreco.__table__)
+
 class Oferta(Base):
     __tablename__ = "ofertas"
     __table_args__ = {'extend_existing': True}
@@ -115,6 +145,23 @@ class Oferta(Base):
     loja = relationship("LojaConfiavel", back_populates="ofertas")
     metricas = relationship("MetricaOferta", back_populates="oferta")
 
+class FilaEvento(Base):
+    """Feed de mudanças da fila de aprovação (novo/alterado/removido), lido pelo stream /api/fila/eventos."""
+    __tablename__ = "fila_eventos"
+    # AUTOINCREMENT: o id é o cursor dos clientes e não pode ser reaproveitado após a limpeza
+    __table_args__ = {'extend_existing': True, 'sqlite_autoincrement': True}
+    id = Column(Integer, primary_key=True)
+    oferta_id = Column(Integer, nullable=False)
+    tipo = Column(String, nullable=False)
+    criado_em = Column(DateTime, default=datetime.now, nullable=False, index=True)
+
+# Eventos da fila gravados pelos eventos do ORM em Oferta (Collector, Validator, API...)
+try:
+    from ..db.fila_eventos import register_fila_listeners
+except Exception:
+    from fila_eventos import register_fila_listeners
+register_fila_listeners(Oferta, FilaEvento.__table__)
+
 class MetricaOferta(Base):
     __tablename__ = "metricas_ofertas"
     __table_args__ = {'extend_existing': True}
@@ -126,6 +173,31 @@ class MetricaOferta(Base):
 
     oferta = relationship("Oferta", back_populates="metricas")
 
+class MetricaSnapshot(Base):
+    """Série temporal append-only: uma linha por oferta a cada coleta de métricas."""
+    __tablename__ = "metricas_snapshots"
+    __table_args__ = {'extend_existing': True}
+    id = Column(Integer, primary_key=True, index=True)
+    oferta_id = Column(Integer, ForeignKey('ofertas.id'), nullable=False, index=True)
+    cliques = Column(Integer, default=0, nullable=False)
+    vendas = Column(Integer, default=0, nullable=False)
+    data_coleta = Column(DateTime, default=datetime.now, nullable=False, index=True)
+
+class MetricaRollup(Base):
+    """Agregado por hora/dia da série (último total acumulado do intervalo + nº de amostras)."""
+    __tablename__ = "metricas_rollups"
+    __table_args__ = (
+        UniqueConstraint("oferta_id", "granularidade", "inicio", name="uq_metricas_rollups_bucket"),
+        {'extend_existing': True}
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    oferta_id = Column(Integer, ForeignKey('ofertas.id'), nullable=False)
+    granularidade = Column(String, nullable=False)   # "hora" | "dia"
+    inicio = Column(DateTime, nullable=False, index=True)
+    cliques = Column(Integer, default=0, nullable=False)
+    vendas = Column(Integer, default=0, nullable=False)
+    amostras = Column(Integer, default=0, nullable=False)
+
 class OfertaPublicada(Base):
     __tablename__ = "ofertas_publicadas"
     __table_args__ = {'extend_existing': True}
@@ -152,3 +224,82 @@ class ConfigVar(Base):
     is_secret = Column(Boolean, default=True, nullable=False)
     description = Column(String, nullable=True)    # dica/ajuda na UI
     updated_at = Column(DateTime, default=datetime.now, nullable=False)
+
+class ConfigVersao(Base):
+    """Linha única com o contador de versão de config_vars (invalida o cache de get_config entre processos)."""
+    __tablename__ = "config_versao"
+    __table_args__ = {'extend_existing': True}
+    id = Column(Integer, primary_key=True)
+    versao = Column(Integer, default=0, nullable=False)
+
+class ExecucaoPipeline(Base):
+    """Resumo de uma execução do RunPipeline (tempos/contadores por estágio em JSON, ver utils/telemetry.py)."""
+    __tablename__ = "execucoes_pipeline"
+    __table_args__ = {'extend_existing': True}
+    id = Column(Integer, primary_key=True, index=True)
+    iniciado_em = Column(DateTime, nullable=False)
+    finalizado_em = Column(DateTime, nullable=False, index=True)
+    status = Column(String, nullable=False)          # "ok" | "erro"
+    duracao_seg = Column(Float, nullable=False)
+    resumo = Column(String, nullable=True)
+
+class PipelineLock(Base):
+    """Trava entre processos: uma linha por nome enquanto há execução (ver utils/run_lock.py)."""
+    __tablename__ = "pipeline_locks"
+    __table_args__ = {'extend_existing': True}
+    nome = Column(String, primary_key=True)
+    token = Column(String, nullable=False)           # identifica o dono (host:pid:aleatório)
+    host = Column(String, nullable=False)
+    pid = Column(Integer, nullable=False)
+    adquirido_em = Column(DateTime, nullable=False)
+    heartbeat_em = Column(DateTime, nullable=False)
+
+class PipelineCheckpoint(Base):
+    """Progresso da execução corrente para retomar após queda (ver utils/checkpoint.py)."""
+    __tablename__ = "pipeline_checkpoints"
+    __table_args__ = {'extend_existing': True}
+    nome = Column(String, primary_key=True)
+    iniciado_em = Column(DateTime, nullable=False)
+    atualizado_em = Column(DateTime, nullable=False)
+    estagios = Column(String, nullable=False, default="[]")   # JSON: estágios concluídos
+    pagina = Column(Integer, nullable=False, default=0)       # última página de listagem baixada
+    item = Column(Integer, nullable=False, default=-1)        # índice do último item processado
+    ofertas = Column(String, nullable=False, default="[]")    # legado: itens agora ficam em pipeline_checkpoint_paginas
+    concluido = Column(Boolean, nullable=False, default=False)
+
+class PipelineCheckpointPagina(Base):
+    """Itens extraídos de uma página da listagem, por checkpoint (gravados uma vez, sem reescrever as anteriores)."""
+    __tablename__ = "pipeline_checkpoint_paginas"
+    __table_args__ = {'extend_existing': True}
+    nome = Column(String, primary_key=True)
+    pagina = Column(Integer, primary_key=True)
+    ofertas = Column(String, nullable=False)                  # JSON: itens extraídos desta página
+
+class HistoricoArquivo(Base):
+    """Manifesto da camada fria do histórico: um arquivo Parquet por linha (ver utils/historico_arquivo.py)."""
+    __tablename__ = "historico_arquivos"
+    __table_args__ = {'extend_existing': True}
+    id = Column(Integer, primary_key=True, index=True)
+    caminho = Column(String, nullable=False, unique=True)   # relativo a HISTORICO_ARQUIVO_DIR
+    ano_mes = Column(String, nullable=False, index=True)    # "2024-03"
+    linhas = Column(Integer, nullable=False)
+    id_min = Column(Integer, nullable=False)
+    id_max = Column(Integer, nullable=False)
+    data_min = Column(DateTime, nullable=False)
+    data_max = Column(DateTime, nullable=False)
+    criado_em = Column(DateTime, default=datetime.now, nullable=False)
+
+class HistoricoArquivoExclusao(Base):
+    """Produto excluído: linhas arquivadas dele anteriores a excluido_em deixam de ser lidas (id pode ser reusado)."""
+    __tablename__ = "historico_arquivo_exclusoes"
+    __table_args__ = {'extend_existing': True}
+    id = Column(Integer, primary_key=True)
+    produto_id = Column(Integer, nullable=False, index=True)
+    excluido_em = Column(DateTime, nullable=False)
+
+class VersaoDados(Base):
+    """Contador de versão por conjunto de dados ("tags", "canais", "lojas"...) para invalidar caches de leitura."""
+    __tablename__ = "versoes_dados"
+    __table_args__ = {'extend_existing': True}
+    chave = Column(String, primary_key=True)
+    versao = Column(Integer, default=0, nullable=False)
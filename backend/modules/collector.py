@@ -1,25 +1,30 @@
 # -*- coding: utf-8 -*-
 """
-Collector Mercado Livre:
-- SEMPRE faz scraping global das páginas de ofertas (ignora lojas cadastradas para buscar).
+Collector (fontes plugáveis, ver backend/modules/fontes/; a primeira é o Mercado Livre):
+- SEMPRE faz scraping global das páginas de ofertas de cada fonte ativa (COLETA_FONTES), uma
+  thread por fonte com limitador de taxa próprio; a persistência é uma só, na thread do Collector.
 - Salva/atualiza TODOS os Produtos SEM filtro.
 - Cria Oferta somente se:
     * Loja (seller) já existir na tabela lojas_confiaveis (NÃO cria loja aqui)
     * Passar filtro de tags (se houver tags e REQUIRE_DB_TAG_MATCH=true)
     * Não existir oferta aberta mesma loja/produto/preço.
 """
+import queue
 import re
-import time
+import threading
 from datetime import datetime
 from typing import List, Dict, Optional
-from urllib.parse import unquote, urlparse, parse_qs
 
 import requests
-from bs4 import BeautifulSoup
-import unicodedata
 from sqlalchemy.exc import IntegrityError
 
+from backend.modules.fontes.registro import carregar_fontes
+
 from backend.utils.config import get_config
+from backend.utils.text import normalize_text
+from backend.utils.telemetry import telemetria, instrument_http
+from backend.utils.bus import bus, OFERTA_CRIADA
+from backend.utils import prazo
 
 try:
     from backend.models.models import Produto, Oferta, LojaConfiavel, HistoricoPreco, Tag
@@ -28,11 +33,14 @@ except Exception:  # pragma: no cover
 
 
 class Collector:
-    def __init__(self, db_session):
+    def __init__(self, db_session, http: Optional[requests.Session] = None):
         self.db = db_session
-        self.max_pages = int(get_config("ML_MAX_PAGES", "2"))
-        self.delay_sec = float(get_config("ML_REQUEST_DELAY_SEC", "0.6"))
-        self.affiliate_template = (get_config("ML_AFFILIATE_TEMPLATE", "") or "").strip()
+        # Sessão HTTP (keep-alive); pode ser compartilhada entre instâncias (ex.: fila de jobs da API)
+        self.http = instrument_http(http or requests.Session())
+        # Fontes ativas (listagem, cards, vendedor); limite de páginas/ritmo/afiliado por fonte
+        self.fontes = carregar_fontes(self.http)
+        # Itens já resolvidos aguardando gravação (contrapressão sobre as threads das fontes)
+        self.fila_max = int(get_config("COLETA_FILA_MAX", "200"))
 
         min_pct = get_config("ML_MIN_DISCOUNT_PCT")
         if min_pct:
@@ -49,21 +57,10 @@ class Collector:
         self._tags_by_norm: Dict[str, Tag] = {}
         self._load_db_tags_as_keywords()
 
-        self.headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/139.0.0.0 Safari/537.36"
-            )
-        }
-
     # ---------------- Tags ----------------
     @staticmethod
     def _normalize_text(s: str) -> str:
-        s = (s or "").strip().lower()
-        s = unicodedata.normalize("NFKD", s)
-        s = "".join(ch for ch in s if not unicodedata.combining(ch))
-        return re.sub(r"\s+", " ", s)
+        return normalize_text(s)
 
     def _compile_pattern_for_tag(self, norm_tag: str) -> re.Pattern:
         if len(norm_tag) <= 3 and re.fullmatch(r"[a-z0-9]+", norm_tag):
@@ -93,16 +90,19 @@ class Collector:
         matched = self._match_db_tags_in_name(product_name)
         return (len(matched) > 0, matched)
 
-    # --------------- Utils ---------------
-    def _affiliate_url(self, raw_url: str) -> str:
-        if self.affiliate_template:
-            try:
-                from urllib.parse import quote
-                return self.affiliate_template.format(url=quote(raw_url, safe=""))
-            except Exception:
-                return raw_url
-        return raw_url
+    # --------------- Fontes ---------------
+    def _fonte_para_url(self, url: str):
+        """Fonte dona do link (a primeira ativa, se nenhuma reconhecer)."""
+        for fonte in self.fontes:
+            if fonte.aceita_url(url):
+                return fonte
+        return self.fontes[0]
 
+    def _scrape_product(self, product_url: str) -> dict:
+        """Raspa uma página de produto isolada (reprocessamento pela API), com store_info."""
+        return self._fonte_para_url(product_url).raspar_produto(product_url)
+
+    # --------------- Utils ---------------
     def _last_price(self, produto_id: int, loja_id: int) -> Optional[float]:
         last = (
             self.db.query(HistoricoPreco)
@@ -113,121 +113,60 @@ class Collector:
         return float(last.preco) if last else None
 
     def _has_open_offer(self, produto_id: int, loja_id: int) -> bool:
-        estados_abertos = {"PENDENTE_APROVACAO", "APROVADO", "AGENDADO", "PUBLICADO"}
+        estados_abertos = {"PENDENTE_APROVACAO", "APROVADO", "PUBLICANDO", "AGENDADO", "PUBLICADO"}
         return self.db.query(Oferta).filter(
             Oferta.produto_id == produto_id,
             Oferta.loja_id == loja_id,
             Oferta.status.in_(estados_abertos)
         ).first() is not None
 
-    def _extrair_codigo(self, url: str) -> Optional[str]:
-        if not url:
-            return None
-        padroes = [r"MLB-\d{10}", r"MLB\d{8,}"]
-        if "click1.mercadolivre.com.br" in url:
-            parsed = urlparse(url)
-            destino = parse_qs(parsed.query).get("url", [None])[0]
-            if destino:
-                destino_dec = unquote(destino)
-                for p in padroes:
-                    m = re.search(p, destino_dec)
-                    if m:
-                        return m.group()
-        for p in padroes:
-            m = re.search(p, url)
-            if m:
-                codigo = m.group()
-                return codigo.replace("MLB-", "MLB")  # remove o hífen se existir
-        return None
-
-    def _parse_price_brl(self, txt: str) -> float:
-        if not txt:
-            return 0.0
-        txt = re.sub(r"[^\d,\.]", "", txt.strip()).replace(".", "").replace(",", ".")
-        try:
-            return float(txt)
-        except Exception:
-            return 0.0
-
     # --------------- Store resolution (somente para oferta) ---------------
-    def _resolve_store_from_product_page(self, product_url: str) -> Dict[str, Optional[str]]:
+    def _create_inactive_store(self, store_info: Dict[str, Optional[str]], plataforma: str = "Mercado Livre") -> Optional[LojaConfiavel]:
+        """Cria a LojaConfiavel (ativa=False) a partir dos ids extraídos da página, se houver."""
+        loja = None
+        seller_id = (store_info.get("seller_id") or "").strip() or None
+        alt_id = (store_info.get("item_id_alt") or "").strip() or None
+        nome_loja = (store_info.get("store_name") or "").strip()
+        if seller_id or alt_id:
+            if not nome_loja:
+                nome_loja = f"Loja {seller_id or alt_id}"
+            try:
+                nova_loja = LojaConfiavel(
+                    nome_loja=nome_loja,
+                    plataforma=plataforma,
+                    id_loja_api=seller_id,
+                    id_loja_api_alt=alt_id,
+                    pontuacao_confianca=3,
+                    ativa=False,  # permanece inativa até ativação manual
+                    **({"lojaconfiavel": True} if hasattr(LojaConfiavel, "lojaconfiavel") else {})
+                )
+                self.db.add(nova_loja)
+                self.db.commit()
+                loja = nova_loja
+            except IntegrityError:
+                self.db.rollback()
+                loja = self._find_existing_store(seller_id, alt_id)
+            except Exception:
+                self.db.rollback()
+        return loja
+
+    def _resolve_store_by_alt_or_scrape(self, product_url: str):
         """
-        Baixa a página do produto e extrai:
-          seller_id        -> id_loja_api (seller_id ou official_store_id)
-          item_id_alt      -> id_loja_api_alt (item_id)
-          store_name       -> nome da loja (sem 'Vendido por')
-          id_product       -> código principal do produto (parent_url -> /p/MLBxxxx)
+        Resolve a loja de um link de produto: primeiro pelo código do anúncio no próprio link (id alternativo),
+        senão abre a página do produto e busca/cria a loja. Retorna (loja | None, alt_id | None).
         """
-        out = {"seller_id": None, "item_id_alt": None, "store_name": None, "id_product": None}
-        if not product_url:
-            return out
-        try:
-            #print("Resolvendo loja na página do produto:", product_url)          
-            time.sleep(self.delay_sec)
-            r = requests.get(product_url, headers=self.headers, timeout=10)  
-            if not r.ok:
-                return out
-            soup = BeautifulSoup(r.text, "html.parser")
-
-            # --- seller / item alt (link com parâmetros) ---
-            link = soup.select_one("a.andes-button.andes-button--medium.andes-button--quiet.andes-button--full-width[href]")
-            if not link:
-                #print("Link principal não encontrado, tentando alternativo...")
-                link = soup.select_one('a[href*="item_id="][href*="seller_id="]') or \
-                       soup.select_one('a[href*="item_id="][href*="official_store_id="]')
-            if link:
-                #print("Link encontrado:", link.get("href"))
-                q = parse_qs(urlparse(link.get("href")).query)
-                out["item_id_alt"] = (q.get("item_id", [None])[0] or "").strip() or None
-                #print("item_id_alt extraído:", out["item_id_alt"])
-                out["seller_id"] = (
-                    (q.get("seller_id", [None])[0] or "").strip()
-                    or (q.get("official_store_id", [None])[0] or "").strip()
-                    or None
-                )
-                #print("seller_id extraído:", out["seller_id"])
-
-            # --- nome da loja ---
-            h2 = soup.select_one("h2.ui-seller-data-header__title") or soup.select_one(
-                "h2.ui-pdp-color--BLACK.ui-pdp-size--MEDIUM.ui-pdp-family--SEMIBOLD.ui-seller-data-header__title.non-selectable"
-            )
-            if h2:
-                name = h2.get_text(strip=True)
-                if name.lower().startswith("vendido por"):
-                    name = name[len("vendido por"):].strip()
-                out["store_name"] = name
-
-            # --- id_product (parent_url hidden input) ---
-            parent_input = soup.find("input", {"type": "hidden", "name": "parent_url"})
-            if parent_input:
-                val = parent_input.get("value") or ""
-                # Suporta dois formatos:
-                # 1) /p/MLB47519001
-                # 2) https://produto.mercadolivre.com.br/MLB-5421177204-conjunto-...
-                def _extract_id_product(parent_val: str) -> Optional[str]:
-                    if not parent_val:
-                        return None
-                    # Formato /p/MLBxxxxx
-                    m = re.search(r"/p/(MLB\d+)", parent_val, re.IGNORECASE)
-                    if m:
-                        return m.group(1).upper()
-                    # Formato URL ou slug com MLB-########## (listing) -> normaliza removendo hífen
-                    m = re.search(r"(MLB-\d+)", parent_val, re.IGNORECASE)
-                    if m:
-                        return m.group(1).upper().replace("MLB-", "MLB")
-                    # Fallback: qualquer MLB#########
-                    m = re.search(r"(MLB\d+)", parent_val, re.IGNORECASE)
-                    if m:
-                        return m.group(1).upper()
-                    return None
-
-                extracted = _extract_id_product(val)
-                if extracted:
-                    out["id_product"] = extracted
-
-        except Exception:
-            pass
-        return out
+        fonte = self._fonte_para_url(product_url)
+        alt = fonte.extrair_codigo(product_url)
+        loja = self._find_existing_store_by_altid(alt) if alt else None
+        if loja:
+            return loja, alt
+
+        store_info = fonte.resolver_vendedor(product_url)
+        alt = store_info.get("item_id_alt") or alt
+        loja = self._find_existing_store(store_info.get("seller_id"), store_info.get("item_id_alt"))
+        if not loja:
+            loja = self._create_inactive_store(store_info, fonte.plataforma)
+        return loja, alt
 
     def _find_existing_store(self, seller_id: Optional[str], alt_id: Optional[str]) -> Optional[LojaConfiavel]:
         q = self.db.query(LojaConfiavel)
@@ -254,7 +193,7 @@ class Collector:
         return q.filter(or_(*conds)).first()
 
     # --------------- Persistência ---------------
-    def _save_product_and_offer(self, product_data: dict):
+    def _save_product_and_offer(self, product_data: dict, store_info: Optional[Dict[str, Optional[str]]] = None, fonte=None):
         """
         Salva/atualiza sempre o Produto.
         (Reincluída) lógica de criação automática da loja em LojaConfiavel caso não exista
@@ -264,20 +203,23 @@ class Collector:
           2. product_id_loja_alt
           3. product_id_loja
         Cria Oferta somente se a loja existir e estiver ativa e passar filtro de tags.
+        store_info: ids da loja já extraídos (ex.: pela thread da fonte); evita baixar a página de novo.
+        fonte: a fonte do item (padrão: a que reconhece url_base).
         """
         from sqlalchemy import or_
 
-        # Extrai dados completos da página (ids de loja / id_product / nome loja)
-        store_info = self._resolve_store_from_product_page(product_data["url_base"])
+        fonte = fonte or self._fonte_para_url(product_data["url_base"])
+        # Extrai dados completos da página (ids de loja / id_product / nome loja), se ainda não vieram
+        if store_info is None:
+            store_info = fonte.resolver_vendedor(product_data["url_base"])
         #print("Url do produto:", product_data["url_base"])
         print(f"[collector] Extraídos - seller_id: {store_info.get('seller_id')}, item_id_alt: {store_info.get('item_id_alt')}, store_name: {store_info.get('store_name')}, id_product: {store_info.get('id_product')}")
         id_product_store = store_info.get("id_product") or None
         alt_code = (store_info.get("item_id_alt") or "").strip() or None
         listing_code = (store_info.get("seller_id") or "").strip() or None
 
-        # Normalização MLB-
-        def _norm(c: Optional[str]):
-            return c.replace("MLB-", "MLB") if c and "MLB-" in c else c
+        # Normalização dos códigos (ex.: MLB- -> MLB)
+        _norm = fonte.normalizar_codigo
 
         id_product_store = _norm(id_product_store)
         alt_code = _norm(alt_code)
@@ -306,30 +248,7 @@ class Collector:
 
         # Cria loja automaticamente se não existir e houver identificadores mínimos
         if not loja:
-            seller_id = (store_info.get("seller_id") or "").strip() or None
-            alt_id = (store_info.get("item_id_alt") or "").strip() or None
-            nome_loja = (store_info.get("store_name") or "").strip()
-            if seller_id or alt_id:
-                if not nome_loja:
-                    nome_loja = f"Loja {seller_id or alt_id}"
-                try:
-                    nova_loja = LojaConfiavel(
-                        nome_loja=nome_loja,
-                        plataforma="Mercado Livre",
-                        id_loja_api=seller_id,
-                        id_loja_api_alt=alt_id,
-                        pontuacao_confianca=3,
-                        ativa=False,  # permanece inativa até ativação manual
-                        **({"lojaconfiavel": True} if hasattr(LojaConfiavel, "lojaconfiavel") else {})
-                    )
-                    self.db.add(nova_loja)
-                    self.db.commit()
-                    loja = nova_loja
-                except IntegrityError:
-                    self.db.rollback()
-                    loja = self._find_existing_store(seller_id, alt_id)
-                except Exception:
-                    self.db.rollback()
+            loja = self._create_inactive_store(store_info, fonte.plataforma)
 
         # Localiza produto existente
         produto = None
@@ -413,7 +332,7 @@ class Collector:
             preco_original=product_data.get("preco_original"),
             preco_oferta=current_price,
             status="PENDENTE_APROVACAO",
-            url_afiliado_longa=self._affiliate_url(product_data["url_base"]) if hasattr(Oferta, "url_afiliado_longa") else None,
+            url_afiliado_longa=fonte.url_afiliado(product_data["url_base"]) if hasattr(Oferta, "url_afiliado_longa") else None,
         )
         if hasattr(oferta, "data_encontrado"):
             oferta.data_encontrado = datetime.utcnow()
@@ -422,76 +341,99 @@ class Collector:
 
         self.db.add(oferta)
         self.db.commit()
+        # avisa os próximos estágios (ex.: validação incremental no daemon)
+        bus.publish(OFERTA_CRIADA, oferta_id=oferta.id)
         return True
 
-    # --------------- Scraping ---------------
-    def _fetch_ml_ofertas_page(self, page_num: int) -> str:
-        url = f"https://www.mercadolivre.com.br/ofertas?page={page_num}"
-        r = requests.get(url, headers=self.headers, timeout=10)
-        r.raise_for_status()
-        print(f"[collector] Página {page_num} OK")
-        return r.text
-
-    def _parse_ml_offers(self, html: str) -> List[dict]:
-        site = BeautifulSoup(html, "html.parser")
-        descricoes = site.find_all("h3", class_="poly-component__title-wrapper")
-        precosAntes = site.find_all("s", class_="andes-money-amount andes-money-amount--previous andes-money-amount--cents-comma")
-        precosDepois = site.find_all("span", class_="andes-money-amount andes-money-amount--cents-superscript")
-        links = site.find_all("a", class_="poly-component__title")
-        descontos = site.find_all("span", class_="andes-money-amount__discount")
-        imagens = site.find_all("img", class_="poly-component__picture")
-
-        results: List[dict] = []
-        for descricao, precoAntes, precoDepois, link, desconto, imagem in zip(descricoes, precosAntes, precosDepois, links, descontos, imagens):
-            href = link.get("href", "") or ""
-            name = (descricao.get_text(strip=True) or "").strip()
-            price_before = self._parse_price_brl(precoAntes.get_text(strip=True) if precoAntes else "")
-            price_after = self._parse_price_brl(precoDepois.get_text(strip=True) if precoDepois else "")
-            disc_txt = (desconto.get_text(strip=True) if desconto else "").replace("%", "").replace("OFF", "")
-            product_image = imagem.get("data-src", "") or ""
-            try:
-                disc_pct = float(re.sub(r"[^0-9,\.]", "", disc_txt).replace(",", "."))
-            except Exception:
-                disc_pct = 0.0
-            mlb = self._extrair_codigo(href) or "N/A"
-            results.append({
-                #"id_product": None,
-                "product_id_loja": None,
-                "product_id_loja_alt": mlb,
-                "nome_produto": name,
-                "preco_original": price_before if price_before > 0 else None,
-                "preco_oferta": price_after,
-                "desconto": disc_pct,
-                "url_base": href,
-                "imagem_url": product_image,
-                "data_validade": None,
-            })
-        return results
-
     # --------------- Execução Global ---------------
-    def run_collection(self):
-        print("[collector] Iniciando coleta global de ofertas do Mercado Livre...")
-        all_offers: List[dict] = []
-        for page in range(1, self.max_pages + 1):
-            try:
-                html = self._fetch_ml_ofertas_page(page)
-                offers = self._parse_ml_offers(html)
-                if not offers:
-                    print("[collector] Sem resultados adicionais.")
+    def _produzir(self, fonte, checkpoint, fila: "queue.Queue", totais: dict):
+        """
+        Thread da fonte: baixa página a página, resolve o vendedor de cada card (a parte cara, em HTTP)
+        e entrega (fonte, checkpoint, índice, card, store_info) para a gravação na thread do Collector.
+        Numa retomada, primeiro termina os itens já extraídos, depois segue da próxima página.
+        """
+        cards: List[dict] = list(checkpoint.ofertas) if checkpoint else []
+        try:
+            proximo = checkpoint.item + 1 if checkpoint else 0
+            pagina = checkpoint.pagina if checkpoint else 0
+            paginas_ok = checkpoint.feito("paginas") if checkpoint else False
+            if checkpoint and checkpoint.retomando:
+                print(f"[collector] {fonte.nome}: retomando da página {pagina + 1}, item {proximo + 1}/{len(cards)}.")
+            while True:
+                while proximo < len(cards):
+                    if prazo.esgotado():
+                        prazo.adiar("coleta", f"{fonte.nome}: {len(cards) - proximo} itens extraídos não processados")
+                        return
+                    store_info = fonte.resolver_vendedor(cards[proximo]["url_base"])
+                    fila.put((fonte, checkpoint, proximo, cards[proximo], store_info))
+                    proximo += 1
+                if paginas_ok or pagina >= fonte.max_paginas:
                     break
-                all_offers.extend(offers)
-                time.sleep(self.delay_sec)
-            except Exception as e:
-                print(f"[collector] Erro página {page}: {e}")
-                break
+                if prazo.esgotado():
+                    prazo.adiar("coleta", f"{fonte.nome}: páginas {pagina + 1}-{fonte.max_paginas} da listagem não baixadas")
+                    return
+                try:
+                    html = fonte.buscar_listagem(pagina + 1)
+                    with telemetria.parse():
+                        novos = fonte.extrair_cards(html)
+                except Exception as e:
+                    print(f"[collector] {fonte.nome}: erro página {pagina + 1}: {e}")
+                    break
+                if not novos:
+                    print(f"[collector] {fonte.nome}: sem resultados adicionais.")
+                    break
+                pagina += 1
+                cards.extend(novos)
+                if checkpoint:
+                    checkpoint.pagina_ok(pagina, novos)
+            if checkpoint:
+                checkpoint.estagio_ok("paginas")
+        except prazo.PrazoEsgotado:
+            prazo.adiar("coleta", f"{fonte.nome}: prazo acabou resolvendo vendedores")
+        except Exception as e:
+            print(f"[collector] {fonte.nome}: erro na coleta: {e}")
+        finally:
+            totais[fonte.nome] = len(cards)
+            fila.put(None)   # fim desta fonte
+
+    def run_collection(self, checkpoint=None):
+        """
+        Coleta todas as fontes ativas em paralelo (uma thread por fonte) e grava os itens aqui, em
+        sequência, numa sessão só. Com `checkpoint` (utils/checkpoint.py), cada fonte grava o próprio
+        progresso por página/item e, numa retomada, não baixa de novo o que já foi feito.
+        """
+        print(f"[collector] Iniciando coleta global de ofertas: {', '.join(f.nome for f in self.fontes)}...")
+        fila: "queue.Queue" = queue.Queue(maxsize=self.fila_max)
+        totais: Dict[str, int] = {}
+        threads = []
+        for fonte in self.fontes:
+            cp = checkpoint.filho(fonte.nome) if checkpoint else None
+            # propagar: HTTP/parsing das threads contam no estágio corrente e respeitam o mesmo prazo
+            alvo = telemetria.propagar(self._produzir)
+            t = threading.Thread(target=alvo, args=(fonte, cp, fila, totais), name=f"fonte-{fonte.nome}", daemon=True)
+            t.start()
+            threads.append(t)
 
         created_offers = 0
-        for o in all_offers:
+        ativas = len(threads)
+        while ativas:
+            msg = fila.get()
+            if msg is None:
+                ativas -= 1
+                continue
+            fonte, cp, indice, card, store_info = msg
             try:
-                if self._save_product_and_offer(o):
+                if self._save_product_and_offer(card, store_info=store_info, fonte=fonte):
                     created_offers += 1
             except Exception as e:
+                self.db.rollback()
                 print(f"[collector] Erro ao processar item: {e}")
-
-        print(f"[collector] Coleta concluída. Produtos processados: {len(all_offers)} | Ofertas criadas: {created_offers}")
+            if cp:
+                cp.item_ok(indice)
+        for t in threads:
+            t.join()
+
+        total = sum(totais.values())
+        telemetria.itens(entrada=total, saida=created_offers)
+        print(f"[collector] Coleta concluída. Produtos processados: {total} | Ofertas criadas: {created_offers}")
         return created_offers
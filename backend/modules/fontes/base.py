@@ -0,0 +1,135 @@
+# backend/modules/fontes/base.py
+"""
+Interface de uma fonte (marketplace) para o Collector.
+
+Uma fonte sabe: baixar uma página de listagem, extrair os cards (dicts no formato abaixo),
+resolver o vendedor de um produto e raspar uma página de produto isolada. O Collector cuida
+do resto (tags, lojas, produtos, histórico, ofertas) igual para todas as fontes.
+
+Card:
+    {"product_id_loja", "product_id_loja_alt", "nome_produto", "preco_original", "preco_oferta",
+     "desconto", "url_base", "imagem_url", "data_validade"}
+
+Vendedor (resolver_vendedor):
+    {"seller_id", "item_id_alt", "store_name", "id_product"}
+
+Fonte é uma ABC: os métodos marcados com @abstractmethod são obrigatórios, e uma subclasse que
+esqueça algum falha ao ser registrada (registrar_fonte), não no meio da coleta.
+
+Cada fonte tem um limitador de taxa próprio (compartilhado por todas as threads do processo),
+então fontes diferentes rodam em paralelo sem uma atrasar a outra.
+"""
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from backend.utils import prazo
+from backend.utils.config import get_config
+
+
+def parse_preco_brl(txt: str) -> float:
+    """'R$ 1.234,56' -> 1234.56 (0.0 se não der para ler)."""
+    if not txt:
+        return 0.0
+    txt = re.sub(r"[^\d,\.]", "", txt.strip()).replace(".", "").replace(",", ".")
+    try:
+        return float(txt)
+    except Exception:
+        return 0.0
+
+
+class LimitadorTaxa:
+    """Intervalo mínimo entre requisições; a espera respeita o prazo da execução."""
+
+    def __init__(self, intervalo_seg: float):
+        self.intervalo_seg = intervalo_seg
+        self._lock = threading.Lock()
+        self._proxima = 0.0
+
+    def esperar(self):
+        with self._lock:
+            agora = time.monotonic()
+            espera = max(0.0, self._proxima - agora)
+            self._proxima = max(agora, self._proxima) + self.intervalo_seg
+        if espera:
+            prazo.dormir(espera)
+
+
+_limitadores: Dict[str, LimitadorTaxa] = {}
+_limitadores_lock = threading.Lock()
+
+
+def limitador(nome: str, intervalo_seg: float) -> LimitadorTaxa:
+    """Limitador único por fonte no processo (jobs da API e coleta dividem o mesmo ritmo)."""
+    with _limitadores_lock:
+        lim = _limitadores.get(nome)
+        if lim is None:
+            lim = _limitadores[nome] = LimitadorTaxa(intervalo_seg)
+        lim.intervalo_seg = intervalo_seg   # config pode ter mudado
+        return lim
+
+
+class Fonte(ABC):
+    nome = ""          # chave em COLETA_FONTES
+    plataforma = ""    # valor gravado em LojaConfiavel.plataforma
+    prefixo = ""       # prefixo das configs da fonte (ex.: "ML" -> ML_MAX_PAGES)
+    base_url = ""      # raiz do site; <PREFIXO>_BASE_URL troca (ex.: servidor local do benchmark)
+
+    headers = {
+        "User-Agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/139.0.0.0 Safari/537.36"
+        )
+    }
+
+    def __init__(self, http):
+        self.http = http
+        self.max_paginas = int(get_config(f"{self.prefixo}_MAX_PAGES", "2"))
+        self.limitador = limitador(self.nome, float(get_config(f"{self.prefixo}_REQUEST_DELAY_SEC", "0.6")))
+        self.affiliate_template = (get_config(f"{self.prefixo}_AFFILIATE_TEMPLATE", "") or "").strip()
+        self.base_url = (get_config(f"{self.prefixo}_BASE_URL", "") or self.base_url).rstrip("/")
+
+    def _get(self, url: str, timeout: float = 10):
+        self.limitador.esperar()
+        return self.http.get(url, headers=self.headers, timeout=timeout)
+
+    # ---------- identificação ----------
+    @abstractmethod
+    def aceita_url(self, url: str) -> bool:
+        ...
+
+    def extrair_codigo(self, url: str) -> Optional[str]:
+        """Código do anúncio no link (usado como id alternativo da loja/produto)."""
+        return None
+
+    def normalizar_codigo(self, codigo: Optional[str]) -> Optional[str]:
+        return codigo
+
+    def url_afiliado(self, raw_url: str) -> str:
+        if self.affiliate_template:
+            try:
+                from urllib.parse import quote
+                return self.affiliate_template.format(url=quote(raw_url, safe=""))
+            except Exception:
+                return raw_url
+        return raw_url
+
+    # ---------- coleta ----------
+    @abstractmethod
+    def buscar_listagem(self, pagina: int) -> str:
+        ...
+
+    @abstractmethod
+    def extrair_cards(self, html: str) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def resolver_vendedor(self, product_url: str) -> Dict[str, Optional[str]]:
+        ...
+
+    @abstractmethod
+    def raspar_produto(self, product_url: str) -> dict:
+        """Uma página de produto -> card + "store_info" (evita um segundo download)."""
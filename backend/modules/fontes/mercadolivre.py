@@ -0,0 +1,208 @@
+# backend/modules/fontes/mercadolivre.py
+"""Fonte Mercado Livre: listagem /ofertas, códigos MLB e vendedor pela página do produto."""
+import re
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlparse, parse_qs
+
+from bs4 import BeautifulSoup
+
+from backend.modules.fontes.base import Fonte, parse_preco_brl
+from backend.utils.prazo import PrazoEsgotado
+from backend.utils.telemetry import telemetria
+
+
+class MercadoLivreFonte(Fonte):
+    nome = "mercadolivre"
+    plataforma = "Mercado Livre"
+    prefixo = "ML"
+    base_url = "https://www.mercadolivre.com.br"
+
+    def aceita_url(self, url: str) -> bool:
+        host = urlparse(url or "").netloc.lower()
+        return "mercadolivre.com" in host or "mercadolibre.com" in host
+
+    def extrair_codigo(self, url: str) -> Optional[str]:
+        if not url:
+            return None
+        padroes = [r"MLB-\d{10}", r"MLB\d{8,}"]
+        if "click1.mercadolivre.com.br" in url:
+            parsed = urlparse(url)
+            destino = parse_qs(parsed.query).get("url", [None])[0]
+            if destino:
+                destino_dec = unquote(destino)
+                for p in padroes:
+                    m = re.search(p, destino_dec)
+                    if m:
+                        return m.group()
+        for p in padroes:
+            m = re.search(p, url)
+            if m:
+                codigo = m.group()
+                return codigo.replace("MLB-", "MLB")  # remove o hífen se existir
+        return None
+
+    def normalizar_codigo(self, codigo: Optional[str]) -> Optional[str]:
+        return codigo.replace("MLB-", "MLB") if codigo and "MLB-" in codigo else codigo
+
+    # --------------- Listagem ---------------
+    def buscar_listagem(self, pagina: int) -> str:
+        r = self._get(f"{self.base_url}/ofertas?page={pagina}")
+        r.raise_for_status()
+        print(f"[collector] Página {pagina} OK")
+        return r.text
+
+    def extrair_cards(self, html: str) -> List[dict]:
+        site = BeautifulSoup(html, "html.parser")
+        descricoes = site.find_all("h3", class_="poly-component__title-wrapper")
+        precosAntes = site.find_all("s", class_="andes-money-amount andes-money-amount--previous andes-money-amount--cents-comma")
+        precosDepois = site.find_all("span", class_="andes-money-amount andes-money-amount--cents-superscript")
+        links = site.find_all("a", class_="poly-component__title")
+        descontos = site.find_all("span", class_="andes-money-amount__discount")
+        imagens = site.find_all("img", class_="poly-component__picture")
+
+        results: List[dict] = []
+        for descricao, precoAntes, precoDepois, link, desconto, imagem in zip(descricoes, precosAntes, precosDepois, links, descontos, imagens):
+            href = link.get("href", "") or ""
+            name = (descricao.get_text(strip=True) or "").strip()
+            price_before = parse_preco_brl(precoAntes.get_text(strip=True) if precoAntes else "")
+            price_after = parse_preco_brl(precoDepois.get_text(strip=True) if precoDepois else "")
+            disc_txt = (desconto.get_text(strip=True) if desconto else "").replace("%", "").replace("OFF", "")
+            product_image = imagem.get("data-src", "") or ""
+            try:
+                disc_pct = float(re.sub(r"[^0-9,\.]", "", disc_txt).replace(",", "."))
+            except Exception:
+                disc_pct = 0.0
+            mlb = self.extrair_codigo(href) or "N/A"
+            results.append({
+                #"id_product": None,
+                "product_id_loja": None,
+                "product_id_loja_alt": mlb,
+                "nome_produto": name,
+                "preco_original": price_before if price_before > 0 else None,
+                "preco_oferta": price_after,
+                "desconto": disc_pct,
+                "url_base": href,
+                "imagem_url": product_image,
+                "data_validade": None,
+            })
+        return results
+
+    # --------------- Página do produto / vendedor ---------------
+    def _buscar_pagina_produto(self, product_url: str) -> Optional[BeautifulSoup]:
+        r = self._get(product_url)
+        if not r.ok:
+            return None
+        with telemetria.parse():
+            return BeautifulSoup(r.text, "html.parser")
+
+    def resolver_vendedor(self, product_url: str) -> Dict[str, Optional[str]]:
+        """
+        Baixa a página do produto e extrai:
+          seller_id        -> id_loja_api (seller_id ou official_store_id)
+          item_id_alt      -> id_loja_api_alt (item_id)
+          store_name       -> nome da loja (sem 'Vendido por')
+          id_product       -> código principal do produto (parent_url -> /p/MLBxxxx)
+        """
+        out = {"seller_id": None, "item_id_alt": None, "store_name": None, "id_product": None}
+        if not product_url:
+            return out
+        try:
+            soup = self._buscar_pagina_produto(product_url)
+            if soup is not None:
+                out = self._extrair_vendedor(soup)
+        except PrazoEsgotado:
+            raise
+        except Exception:
+            pass
+        return out
+
+    def _extrair_vendedor(self, soup: BeautifulSoup) -> Dict[str, Optional[str]]:
+        out = {"seller_id": None, "item_id_alt": None, "store_name": None, "id_product": None}
+        # --- seller / item alt (link com parâmetros) ---
+        link = soup.select_one("a.andes-button.andes-button--medium.andes-button--quiet.andes-button--full-width[href]")
+        if not link:
+            link = soup.select_one('a[href*="item_id="][href*="seller_id="]') or \
+                   soup.select_one('a[href*="item_id="][href*="official_store_id="]')
+        if link:
+            q = parse_qs(urlparse(link.get("href")).query)
+            out["item_id_alt"] = (q.get("item_id", [None])[0] or "").strip() or None
+            out["seller_id"] = (
+                (q.get("seller_id", [None])[0] or "").strip()
+                or (q.get("official_store_id", [None])[0] or "").strip()
+                or None
+            )
+
+        # --- nome da loja ---
+        h2 = soup.select_one("h2.ui-seller-data-header__title") or soup.select_one(
+            "h2.ui-pdp-color--BLACK.ui-pdp-size--MEDIUM.ui-pdp-family--SEMIBOLD.ui-seller-data-header__title.non-selectable"
+        )
+        if h2:
+            name = h2.get_text(strip=True)
+            if name.lower().startswith("vendido por"):
+                name = name[len("vendido por"):].strip()
+            out["store_name"] = name
+
+        # --- id_product (parent_url hidden input) ---
+        parent_input = soup.find("input", {"type": "hidden", "name": "parent_url"})
+        if parent_input:
+            val = parent_input.get("value") or ""
+            # Suporta dois formatos:
+            # 1) /p/MLB47519001
+            # 2) https://produto.mercadolivre.com.br/MLB-5421177204-conjunto-...
+            def _extract_id_product(parent_val: str) -> Optional[str]:
+                if not parent_val:
+                    return None
+                # Formato /p/MLBxxxxx
+                m = re.search(r"/p/(MLB\d+)", parent_val, re.IGNORECASE)
+                if m:
+                    return m.group(1).upper()
+                # Formato URL ou slug com MLB-########## (listing) -> normaliza removendo hífen
+                m = re.search(r"(MLB-\d+)", parent_val, re.IGNORECASE)
+                if m:
+                    return m.group(1).upper().replace("MLB-", "MLB")
+                # Fallback: qualquer MLB#########
+                m = re.search(r"(MLB\d+)", parent_val, re.IGNORECASE)
+                if m:
+                    return m.group(1).upper()
+                return None
+
+            extracted = _extract_id_product(val)
+            if extracted:
+                out["id_product"] = extracted
+
+        return out
+
+    def raspar_produto(self, product_url: str) -> dict:
+        """
+        Baixa UMA página de produto e devolve os dados no mesmo formato de extrair_cards,
+        já com "store_info" (da mesma página) para evitar um segundo download ao salvar.
+        """
+        soup = self._buscar_pagina_produto(product_url)
+        if soup is None:
+            raise ValueError(f"Não foi possível abrir a página do produto: {product_url}")
+
+        title = soup.select_one("h1.ui-pdp-title")
+        price_meta = soup.select_one('meta[itemprop="price"]')
+        before = soup.select_one("s.andes-money-amount--previous")
+        image = soup.select_one('meta[property="og:image"]')
+
+        price_after = 0.0
+        if price_meta and price_meta.get("content"):
+            try:
+                price_after = float(price_meta["content"])
+            except ValueError:
+                price_after = 0.0
+        price_before = parse_preco_brl(before.get_text(strip=True)) if before else 0.0
+
+        return {
+            "product_id_loja": None,
+            "product_id_loja_alt": self.extrair_codigo(product_url),
+            "nome_produto": title.get_text(strip=True) if title else "",
+            "preco_original": price_before if price_before > 0 else None,
+            "preco_oferta": price_after,
+            "desconto": 0.0,
+            "url_base": product_url,
+            "imagem_url": image.get("content") if image else None,
+            "data_validade": None,
+            "store_info": self._extrair_vendedor(soup),
+        }
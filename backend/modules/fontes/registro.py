@@ -0,0 +1,40 @@
+# backend/modules/fontes/registro.py
+"""
+Fontes de ofertas (marketplaces) plugáveis do Collector.
+
+COLETA_FONTES (config) lista as fontes ativas, separadas por vírgula (padrão: "mercadolivre").
+Para um novo marketplace: subclasse de Fonte (fontes/base.py) num módulo próprio e
+registrar_fonte(MinhaFonte) aqui. Cada fonte ativa roda numa thread própria durante a coleta.
+"""
+from typing import List
+
+from backend.modules.fontes.base import Fonte
+from backend.modules.fontes.mercadolivre import MercadoLivreFonte
+from backend.utils.config import get_config
+
+FONTES = {}
+
+
+def registrar_fonte(cls):
+    """Registra a fonte; falha já aqui se faltar algum método obrigatório de Fonte."""
+    faltando = sorted(getattr(cls, "__abstractmethods__", ()))
+    if faltando:
+        raise TypeError(f"Fonte {cls.__name__} não implementa: {', '.join(faltando)}")
+    FONTES[cls.nome] = cls
+    return cls
+
+
+registrar_fonte(MercadoLivreFonte)
+
+
+def carregar_fontes(http) -> List[Fonte]:
+    nomes = [n.strip().lower() for n in (get_config("COLETA_FONTES", "mercadolivre") or "").split(",") if n.strip()]
+    fontes = []
+    for nome in nomes:
+        cls = FONTES.get(nome)
+        if cls is None:
+            print(f"[collector] Fonte desconhecida em COLETA_FONTES: {nome} (disponíveis: {', '.join(FONTES)})")
+            continue
+        fontes.append(cls(http))
+    return fontes or [MercadoLivreFonte(http)]
+
@@ -1,28 +1,49 @@
 
 import requests
-from datetime import datetime
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from sqlalchemy import func, insert, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import random # Para simular vendas
 
-from ..models.models import Oferta, MetricaOferta
-from ..db.database import DATABASE_URL, Base
+from ..models.models import Oferta, MetricaOferta, MetricaSnapshot, MetricaRollup
+from ..db.database import SessionLocal
 from backend.utils.config import get_config
-
-# Configuração do banco de dados
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Configurações de API (Substitua pelos seus tokens reais)
-#BITLY_ACCESS_TOKEN = "SEU_BITLY_ACCESS_TOKEN"
-BITLY_ACCESS_TOKEN = get_config("BITLY_ACCESS_TOKEN")  # era string fixa
+from backend.utils.telemetry import telemetria, instrument_http
+from backend.utils import prazo
+from backend.utils.prazo import PrazoEsgotado
 
 class MetricsAnalyzer:
-    def __init__(self, db_session):
+    def __init__(self, db_session, http=None):
         self.db = db_session
+        # Lido na instância (antes era lido no import do módulo)
+        self.bitly_access_token = get_config("BITLY_ACCESS_TOKEN")
+        self.bitly_api_url = (get_config("BITLY_API_URL", "") or "https://api-ssl.bitly.com/v4").rstrip("/")
+        # Pool limitado de consultas simultâneas ao Bitly
+        self.max_workers = max(1, int(get_config("METRICS_MAX_WORKERS", "8")))
+        self.http_timeout = float(get_config("BITLY_TIMEOUT_SEC", "10"))
+        # TTL mínimo entre duas atualizações da mesma oferta
+        self.ttl = timedelta(minutes=float(get_config("METRICS_TTL_MIN", "60")))
+        # Intervalo cresce com a idade: idade * fator (ex.: 0.1 -> oferta de 10 dias atualiza 1x/dia)
+        self.age_factor = float(get_config("METRICS_AGE_FACTOR", "0.1"))
+        # Ofertas publicadas há mais que isso não são mais consultadas
+        self.max_age = timedelta(days=float(get_config("METRICS_MAX_AGE_DAYS", "90")))
+        # Retenção da série (dias; 0 = manter para sempre)
+        self.raw_retention_days = float(get_config("METRICS_RAW_RETENTION_DAYS", "14"))
+        self.hourly_retention_days = float(get_config("METRICS_HOURLY_RETENTION_DAYS", "90"))
+        self.daily_retention_days = float(get_config("METRICS_DAILY_RETENTION_DAYS", "0"))
+
+        # Sessão recebida (ex.: daemon, mantida entre ciclos) ou uma nova com pool do tamanho do executor
+        if http is None:
+            http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            http.mount("https://", adapter)
+            http.mount("http://", adapter)
+        self.http = instrument_http(http)
 
     def _get_bitly_clicks(self, bitly_link):
-        if not BITLY_ACCESS_TOKEN or BITLY_ACCESS_TOKEN == "SEU_BITLY_ACCESS_TOKEN":
+        if not self.bitly_access_token or self.bitly_access_token == "SEU_BITLY_ACCESS_TOKEN":
             print("ATENÇÃO: Token do Bitly não configurado. Não será possível obter cliques reais.")
             return random.randint(50, 500) # Simula cliques
 
@@ -36,18 +57,25 @@ class MetricsAnalyzer:
         bitlink_id = bitly_link.split("/")[-1]
 
         headers = {
-            "Authorization": f"Bearer {BITLY_ACCESS_TOKEN}"
+            "Authorization": f"Bearer {self.bitly_access_token}"
         }
         try:
-            response = requests.get(f"https://api-ssl.bitly.com/v4/bitlinks/{bitlink_id}/clicks", headers=headers)
+            response = self.http.get(
+                f"{self.bitly_api_url}/bitlinks/{bitlink_id}/clicks",
+                headers=headers,
+                timeout=self.http_timeout,
+            )
             response.raise_for_status()
             data = response.json()
             # A estrutura da resposta pode variar, geralmente \'link_clicks\' é o total
             total_clicks = data.get("link_clicks", 0)
             return total_clicks
+        except PrazoEsgotado:
+            raise   # contado como adiado em analyze_metrics
         except requests.exceptions.RequestException as e:
+            # Sem valor inventado: a oferta continua "vencida" e é tentada de novo na próxima execução
             print(f"Erro ao obter cliques do Bitly para {bitly_link}: {e}")
-            return random.randint(50, 500) # Simula cliques em caso de erro
+            return None
 
     def _get_affiliate_sales(self, oferta_id, tracking_id=None):
         # Esta é uma função mock para simular a obtenção de vendas de plataformas de afiliados.
@@ -58,43 +86,176 @@ class MetricsAnalyzer:
         print(f"Simulando vendas para oferta {oferta_id}...")
         return random.randint(0, 5) # Simula entre 0 e 5 vendas por oferta
 
-    def analyze_metrics(self):
-        print("Iniciando análise de métricas de ofertas publicadas...")
-        ofertas_publicadas = self.db.query(Oferta).filter(Oferta.status == "PUBLICADO").all()
+    def _refresh_interval(self, publicada_em, now):
+        """Intervalo mínimo entre atualizações: TTL para ofertas novas, crescendo com a idade."""
+        if not publicada_em:
+            return self.ttl
+        idade = max(now - publicada_em, timedelta(0))
+        return max(self.ttl, idade * self.age_factor)
 
-        for oferta in ofertas_publicadas:
-            # Pega o link curto do Bitly
-            bitly_link = oferta.url_afiliado_curta
-            if not bitly_link:
-                print(f"Oferta {oferta.id} não possui link Bitly. Pulando métricas.")
+    def _select_due_offers(self, now):
+        """
+        Retorna as ofertas PUBLICADAS cuja última métrica já venceu.
+        A última atualização de cada oferta vem de um único GROUP BY (sem 1 query por oferta).
+        """
+        ultima = (
+            self.db.query(
+                MetricaOferta.oferta_id.label("oferta_id"),
+                func.max(MetricaOferta.data_atualizacao).label("ultima_atualizacao"),
+            )
+            .group_by(MetricaOferta.oferta_id)
+            .subquery()
+        )
+        rows = (
+            self.db.query(Oferta, ultima.c.ultima_atualizacao)
+            .outerjoin(ultima, ultima.c.oferta_id == Oferta.id)
+            .filter(Oferta.status == "PUBLICADO")
+            .filter(Oferta.url_afiliado_curta.isnot(None))
+            .filter((Oferta.data_publicacao.is_(None)) | (Oferta.data_publicacao >= now - self.max_age))
+            .all()
+        )
+
+        due = []
+        for oferta, ultima_atualizacao in rows:
+            if ultima_atualizacao and now - ultima_atualizacao < self._refresh_interval(oferta.data_publicacao, now):
                 continue
+            due.append(oferta)
+        print(f"Métricas: {len(due)} de {len(rows)} ofertas publicadas precisam de atualização.")
+        return due
+
+    def _write_snapshots(self, amostras, now):
+        """
+        Grava o resultado de uma execução em lote:
+          - snapshots append-only (executemany)
+          - rollups hora/dia (upsert por bucket)
+          - visão "último valor por oferta" em metricas_ofertas
+        Nada é commitado aqui: a execução inteira vira uma única transação.
+        """
+        if not amostras:
+            return
+
+        self.db.execute(insert(MetricaSnapshot), [
+            {"oferta_id": oid, "cliques": c, "vendas": v, "data_coleta": now}
+            for oid, c, v in amostras
+        ])
+
+        buckets = (
+            ("hora", now.replace(minute=0, second=0, microsecond=0)),
+            ("dia", now.replace(hour=0, minute=0, second=0, microsecond=0)),
+        )
+        stmt = sqlite_insert(MetricaRollup)
+        # os totais do Bitly são acumulados: o valor mais recente do bucket é o que vale
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["oferta_id", "granularidade", "inicio"],
+            set_={
+                "cliques": stmt.excluded.cliques,
+                "vendas": stmt.excluded.vendas,
+                "amostras": MetricaRollup.amostras + 1,
+            },
+        )
+        self.db.execute(stmt, [
+            {"oferta_id": oid, "granularidade": g, "inicio": inicio, "cliques": c, "vendas": v, "amostras": 1}
+            for oid, c, v in amostras
+            for g, inicio in buckets
+        ])
 
-            # Coleta cliques
-            cliques = self._get_bitly_clicks(bitly_link)
-
-            # Coleta vendas (simulado)
-            # Em uma implementação real, você passaria o subId/tracking_id da URL de afiliado
-            vendas = self._get_affiliate_sales(oferta.id, tracking_id="algum_sub_id_da_oferta")
-
-            # Atualiza ou cria o registro de métricas
-            metrica = self.db.query(MetricaOferta).filter_by(oferta_id=oferta.id).first()
-            if not metrica:
-                metrica = MetricaOferta(
-                    oferta_id=oferta.id,
-                    cliques=cliques,
-                    vendas=vendas,
-                    data_atualizacao=datetime.now()
+        ids = [oid for oid, _, _ in amostras]
+        existentes = dict(
+            self.db.query(MetricaOferta.oferta_id, func.max(MetricaOferta.id))
+            .filter(MetricaOferta.oferta_id.in_(ids))
+            .group_by(MetricaOferta.oferta_id)
+            .all()
+        )
+        atualizar = [
+            {"id": existentes[oid], "cliques": c, "vendas": v, "data_atualizacao": now}
+            for oid, c, v in amostras if oid in existentes
+        ]
+        criar = [
+            {"oferta_id": oid, "cliques": c, "vendas": v, "data_atualizacao": now}
+            for oid, c, v in amostras if oid not in existentes
+        ]
+        if atualizar:
+            self.db.execute(update(MetricaOferta), atualizar)
+        if criar:
+            self.db.execute(insert(MetricaOferta), criar)
+
+    def _apply_retention(self, now):
+        """Remove snapshots/rollups fora da janela de retenção (um DELETE por nível)."""
+        if self.raw_retention_days > 0:
+            self.db.execute(
+                delete(MetricaSnapshot)
+                .where(MetricaSnapshot.data_coleta < now - timedelta(days=self.raw_retention_days))
+            )
+        for granularidade, dias in (("hora", self.hourly_retention_days), ("dia", self.daily_retention_days)):
+            if dias > 0:
+                self.db.execute(
+                    delete(MetricaRollup)
+                    .where(MetricaRollup.granularidade == granularidade)
+                    .where(MetricaRollup.inicio < now - timedelta(days=dias))
                 )
-                self.db.add(metrica)
-            else:
-                metrica.cliques = cliques
-                metrica.vendas = vendas
-                metrica.data_atualizacao = datetime.now()
-            
+
+    def click_series(self, oferta_id: int, granularidade: str = "hora"):
+        """Curva de cliques de uma oferta: "bruto" (snapshots), "hora" ou "dia" (rollups)."""
+        if granularidade == "bruto":
+            rows = (
+                self.db.query(MetricaSnapshot.data_coleta, MetricaSnapshot.cliques, MetricaSnapshot.vendas)
+                .filter(MetricaSnapshot.oferta_id == oferta_id)
+                .order_by(MetricaSnapshot.data_coleta.asc())
+                .all()
+            )
+        else:
+            rows = (
+                self.db.query(MetricaRollup.inicio, MetricaRollup.cliques, MetricaRollup.vendas)
+                .filter(MetricaRollup.oferta_id == oferta_id, MetricaRollup.granularidade == granularidade)
+                .order_by(MetricaRollup.inicio.asc())
+                .all()
+            )
+        return [{"data": d.isoformat(), "cliques": c, "vendas": v} for d, c, v in rows]
+
+    def analyze_metrics(self):
+        print("Iniciando análise de métricas de ofertas publicadas...")
+        now = datetime.now()
+        ofertas = self._select_due_offers(now)
+
+        # Rede em paralelo (pool limitado); o banco só é tocado na thread principal, em lote
+        amostras = []
+        sem_prazo = 0
+        if ofertas:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                # propagar: as requisições das threads do pool contam no estágio corrente
+                buscar = telemetria.propagar(self._get_bitly_clicks)
+                futures = {pool.submit(buscar, o.url_afiliado_curta): o for o in ofertas}
+                for fut in as_completed(futures):
+                    oferta = futures[fut]
+                    try:
+                        cliques = fut.result()
+                    except PrazoEsgotado:
+                        sem_prazo += 1
+                        continue
+                    except Exception as e:
+                        print(f"Erro ao obter cliques da oferta {oferta.id}: {e}")
+                        continue
+                    if cliques is None:
+                        continue
+
+                    # Coleta vendas (simulado)
+                    # Em uma implementação real, você passaria o subId/tracking_id da URL de afiliado
+                    vendas = self._get_affiliate_sales(oferta.id, tracking_id="algum_sub_id_da_oferta")
+                    amostras.append((oferta.id, cliques, vendas))
+
+        try:
+            self._write_snapshots(amostras, now)
+            self._apply_retention(now)
             self.db.commit()
-            print(f"Métricas atualizadas para oferta {oferta.id}: Cliques={cliques}, Vendas={vendas}")
+        except Exception:
+            self.db.rollback()
+            raise
 
-        print("Análise de métricas concluída.")
+        if sem_prazo:
+            # continuam "vencidas": entram na seleção da próxima execução
+            prazo.adiar("metricas", f"{sem_prazo} ofertas sem consulta ao Bitly")
+        telemetria.itens(entrada=len(ofertas), saida=len(amostras))
+        print(f"Análise de métricas concluída. Ofertas atualizadas: {len(amostras)}")
 
 if __name__ == "__main__":
     db_session = SessionLocal()
@@ -1,13 +1,17 @@
 import requests
 import os
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from backend.models.models import Oferta, CanalTelegram, Produto, LojaConfiavel, MetricaOferta
 from backend.utils.config import get_config
+from backend.utils.telemetry import telemetria, instrument_http
+from backend.utils import prazo
+from backend.utils.prazo import PrazoEsgotado
 
 class Publisher:
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, http: requests.Session = None):
         self.db_session = db_session
         #self.telegram_bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
         #self.telegram_bot_token = "SEU_TELEGRAM_BOT_TOKEN" # Substitua pelo seu token real
@@ -15,6 +19,13 @@ class Publisher:
         self.telegram_bot_token = get_config("TELEGRAM_BOT_TOKEN")
         # Unificado: Bitly agora usa SEMPRE o Access Token (GAT/OAuth)
         self.bitly_access_token = get_config("BITLY_ACCESS_TOKEN")
+        # Raiz das APIs (trocadas por servidores locais no benchmark)
+        self.telegram_api_url = (get_config("TELEGRAM_API_URL", "") or "https://api.telegram.org").rstrip("/")
+        self.bitly_api_url = (get_config("BITLY_API_URL", "") or "https://api-ssl.bitly.com/v4").rstrip("/")
+        # Sessão HTTP única (keep-alive com Telegram/Bitly) e instrumentada; pode vir de fora (daemon)
+        self.http = instrument_http(http or requests.Session())
+        # Só começa uma oferta se sobrar pelo menos isso do prazo da execução (Bitly + Telegram)
+        self.reserva_oferta_seg = float(get_config("PUBLICACAO_RESERVA_SEG", "15"))
 
     def _shorten_url(self, long_url):
         """Encurta uma URL usando a API do Bitly."""
@@ -32,7 +43,7 @@ class Publisher:
             "long_url": long_url
         }
         try:
-            response = requests.post("https://api-ssl.bitly.com/v4/shorten", headers=headers, json=payload, timeout=5)
+            response = self.http.post(f"{self.bitly_api_url}/shorten", headers=headers, json=payload, timeout=5)
             response.raise_for_status()
             data = response.json()
             return data["link"]
@@ -46,7 +57,7 @@ class Publisher:
             print("Telegram Bot Token não configurado. Mensagem não enviada.")
             return False
 
-        url = f"https://api.telegram.org/bot{self.telegram_bot_token}/sendMessage"
+        url = f"{self.telegram_api_url}/bot{self.telegram_bot_token}/sendMessage"
         payload = {
             "chat_id": chat_id,
             "text": message_text,
@@ -54,97 +65,164 @@ class Publisher:
             "disable_web_page_preview": False # Permite pré-visualização do link
         }
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = self.http.post(url, json=payload, timeout=10)
             response.raise_for_status()
             return True
+        except PrazoEsgotado:
+            raise
         except requests.exceptions.RequestException as e:
             print(f"Erro ao enviar mensagem para o Telegram ({chat_id}): {e}")
             return False
 
+    def _reservar(self, oferta_id) -> bool:
+        """
+        Troca APROVADO -> PUBLICANDO numa única instrução. Só quem consegue a troca publica:
+        a API (publicação ao aprovar) e o daemon/cron podem disputar a mesma oferta.
+        """
+        res = self.db_session.execute(
+            update(Oferta)
+            .where(Oferta.id == oferta_id, Oferta.status == "APROVADO")
+            .values(status="PUBLICANDO", data_publicacao=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+        self.db_session.commit()
+        return res.rowcount == 1
+
+    def _liberar_presas(self):
+        """Volta para APROVADO reservas antigas (processo que caiu no meio da publicação)."""
+        # reserva (PUBLICANDO) mais velha que PUBLICANDO_TIMEOUT_MIN é considerada abandonada
+        limite = datetime.now() - timedelta(minutes=float(get_config("PUBLICANDO_TIMEOUT_MIN", "15")))
+        self.db_session.execute(
+            update(Oferta)
+            .where(Oferta.status == "PUBLICANDO", Oferta.data_publicacao < limite)
+            .values(status="APROVADO", data_publicacao=None)
+            .execution_options(synchronize_session=False)
+        )
+        self.db_session.commit()
+
     def run_publication(self):
         """Publica ofertas aprovadas para curadoria nos canais do Telegram."""
+        return self.publicar_ofertas()
+
+    def publicar_ofertas(self, oferta_ids=None) -> int:
+        """
+        Publica as ofertas APROVADO informadas (ou todas, se oferta_ids for None).
+        Cada oferta é reservada antes do envio, então chamadas concorrentes não publicam duas vezes.
+        """
+        self._liberar_presas()
         # Se você aprova com "APROVADO" na API, use esse status:
-        ofertas_para_publicar = (
-            self.db_session.query(Oferta)
-            .filter(Oferta.status == "APROVADO")  # antes: "APROVADA_PARA_CURADORIA"
-            .all()
-        )
-
-        for oferta in ofertas_para_publicar:
-            produto = self.db_session.get(Produto, oferta.produto_id)
-            loja = self.db_session.get(LojaConfiavel, oferta.loja_id)
-
-            if not produto or not loja:
-                print(f"Produto ou Loja não encontrados para oferta {oferta.id}. Pulando.")
-                oferta.status = "REJEITADA_ERRO_DADOS"
-                continue
-
-            short_url = self._shorten_url(oferta.url_afiliado_longa)
-
-            def escape_markdown_v2(text):
-                if text is None:
-                    return ""
-                chars_to_escape = ["_", "*", "[", "]", "(", ")", "~", "`", ">", "#", "+", "-", "=", "|", "{", "}", ".", "!"]
-                for char in chars_to_escape:
-                    text = text.replace(char, f"\\{char}")
-                return text
-
-            produto_nome_escaped = escape_markdown_v2(produto.nome_produto)
-            loja_nome_escaped = escape_markdown_v2(loja.nome_loja)
-            preco_oferta_escaped = escape_markdown_v2(f"{oferta.preco_oferta:.2f}".replace(".", ","))
-            preco_original_escaped = escape_markdown_v2(f"{oferta.preco_original:.2f}".replace(".", ",")) if oferta.preco_original else ""
-            desconto_escaped = escape_markdown_v2(f"{oferta.desconto_real:.0f}%") if oferta.desconto_real else ""
-
-            message = "*🔥 OFERTA IMPERDÍVEL 🔥*\n\n"
-            message += f"*Produto:* {produto_nome_escaped}\n"
-            message += f"*Loja:* {loja_nome_escaped}\n"
-            message += f"*Preço:* R$ {preco_oferta_escaped}\n"
-            if oferta.preco_original and oferta.preco_original > oferta.preco_oferta:
-                message += f"_De: R$ {preco_original_escaped}_ \n"
-            if oferta.desconto_real:
-                message += f"*Desconto:* {desconto_escaped}\n"
-            message += f"\n[🛒 Compre aqui]({escape_markdown_v2(short_url)})\n"
-
-            # --- FIX do SyntaxWarning: use "\\#" em vez de "\#" ---
-            tags_do_produto = [tag.nome_tag for tag in produto.tags]
-            if tags_do_produto:
-                hashtags = " ".join(["\\#" + escape_markdown_v2(t) for t in tags_do_produto])
-                message += "\n" + hashtags
-
-            # Publicar nos canais relevantes
-            canais_publicados = []
-            for tag_produto in produto.tags:
-                canais_por_tag = (
-                    self.db_session.query(CanalTelegram)
-                    .filter(CanalTelegram.tags.any(id=tag_produto.id))
-                    .filter(CanalTelegram.ativo == True)
-                    .all()
-                )
-
-                for canal in canais_por_tag:
-                    # Use campos do seu modelo: id_canal_api (chat_id) e nome_amigavel
-                    chat_id = canal.id_canal_api
-                    nome_canal = canal.nome_amigavel
-                    if chat_id not in canais_publicados:
-                        print(f"Tentando publicar oferta {oferta.id} no canal {nome_canal} ({chat_id})...")
-                        if self._send_telegram_message(chat_id, message):
-                            canais_publicados.append(chat_id)
-                            print(f"Oferta {oferta.id} publicada com sucesso no canal {nome_canal}.")
-                        else:
-                            print(f"Falha ao publicar oferta {oferta.id} no canal {nome_canal}.")
-
-            if canais_publicados:
-                oferta.status = "PUBLICADO"
-                oferta.data_publicacao = datetime.now()
-                oferta.url_afiliado_curta = short_url  # antes: url_publicada (campo não existe)
-                # MetricaOferta não tem 'conversao' no modelo
-                metrica = MetricaOferta(oferta_id=oferta.id, cliques=0, vendas=0)
-                self.db_session.add(metrica)
-            else:
-                oferta.status = "REJEITADA_SEM_CANAL"
-                print(f"Oferta {oferta.id} não publicada: nenhum canal relevante encontrado ou falha no envio.")
+        q = self.db_session.query(Oferta.id).filter(Oferta.status == "APROVADO")  # antes: "APROVADA_PARA_CURADORIA"
+        if oferta_ids is not None:
+            q = q.filter(Oferta.id.in_(list(oferta_ids)))
+        candidatas = [i for (i,) in q.order_by(Oferta.id).all()]
+
+        publicadas = 0
+        for n, oferta_id in enumerate(candidatas):
+            if prazo.esgotado(self.reserva_oferta_seg):
+                # continuam APROVADO: a próxima execução publica
+                prazo.adiar("publicacao", f"{len(candidatas) - n} ofertas aprovadas não publicadas")
+                break
+            if not self._reservar(oferta_id):
+                continue   # outro processo pegou (ou a oferta mudou de status)
+            oferta = self.db_session.get(Oferta, oferta_id)
+            if self._publicar(oferta):
+                publicadas += 1
+            self.db_session.commit()
+
+        telemetria.itens(entrada=len(candidatas), saida=publicadas)
+        return publicadas
+
+    def _publicar(self, oferta) -> bool:
+        """Monta a mensagem e envia para os canais das tags do produto (oferta já reservada)."""
+        produto = self.db_session.get(Produto, oferta.produto_id)
+        loja = self.db_session.get(LojaConfiavel, oferta.loja_id)
+
+        if not produto or not loja:
+            print(f"Produto ou Loja não encontrados para oferta {oferta.id}. Pulando.")
+            oferta.status = "REJEITADA_ERRO_DADOS"
+            oferta.data_publicacao = None
+            return False
 
-        self.db_session.commit()
+        short_url = self._shorten_url(oferta.url_afiliado_longa)
+
+        def escape_markdown_v2(text):
+            if text is None:
+                return ""
+            chars_to_escape = ["_", "*", "[", "]", "(", ")", "~", "`", ">", "#", "+", "-", "=", "|", "{", "}", ".", "!"]
+            for char in chars_to_escape:
+                text = text.replace(char, f"\\{char}")
+            return text
+
+        produto_nome_escaped = escape_markdown_v2(produto.nome_produto)
+        loja_nome_escaped = escape_markdown_v2(loja.nome_loja)
+        preco_oferta_escaped = escape_markdown_v2(f"{oferta.preco_oferta:.2f}".replace(".", ","))
+        preco_original_escaped = escape_markdown_v2(f"{oferta.preco_original:.2f}".replace(".", ",")) if oferta.preco_original else ""
+        desconto_escaped = escape_markdown_v2(f"{oferta.desconto_real:.0f}%") if oferta.desconto_real else ""
+
+        message = "*🔥 OFERTA IMPERDÍVEL 🔥*\n\n"
+        message += f"*Produto:* {produto_nome_escaped}\n"
+        message += f"*Loja:* {loja_nome_escaped}\n"
+        message += f"*Preço:* R$ {preco_oferta_escaped}\n"
+        if oferta.preco_original and oferta.preco_original > oferta.preco_oferta:
+            message += f"_De: R$ {preco_original_escaped}_ \n"
+        if oferta.desconto_real:
+            message += f"*Desconto:* {desconto_escaped}\n"
+        message += f"\n[🛒 Compre aqui]({escape_markdown_v2(short_url)})\n"
+
+        # --- FIX do SyntaxWarning: use "\\#" em vez de "\#" ---
+        tags_do_produto = [tag.nome_tag for tag in produto.tags]
+        if tags_do_produto:
+            hashtags = " ".join(["\\#" + escape_markdown_v2(t) for t in tags_do_produto])
+            message += "\n" + hashtags
+
+        # Publicar nos canais relevantes
+        canais_publicados = []
+        cortado = False   # prazo acabou no meio do envio
+        for tag_produto in produto.tags:
+            if cortado:
+                break
+            canais_por_tag = (
+                self.db_session.query(CanalTelegram)
+                .filter(CanalTelegram.tags.any(id=tag_produto.id))
+                .filter(CanalTelegram.ativo == True)
+                .all()
+            )
+
+            for canal in canais_por_tag:
+                # Use campos do seu modelo: id_canal_api (chat_id) e nome_amigavel
+                chat_id = canal.id_canal_api
+                nome_canal = canal.nome_amigavel
+                if chat_id not in canais_publicados:
+                    print(f"Tentando publicar oferta {oferta.id} no canal {nome_canal} ({chat_id})...")
+                    try:
+                        enviada = self._send_telegram_message(chat_id, message)
+                    except PrazoEsgotado:
+                        cortado = True
+                        break
+                    if enviada:
+                        canais_publicados.append(chat_id)
+                        print(f"Oferta {oferta.id} publicada com sucesso no canal {nome_canal}.")
+                    else:
+                        print(f"Falha ao publicar oferta {oferta.id} no canal {nome_canal}.")
+
+        if canais_publicados:
+            oferta.status = "PUBLICADO"
+            oferta.data_publicacao = datetime.now()
+            oferta.url_afiliado_curta = short_url  # antes: url_publicada (campo não existe)
+            # MetricaOferta não tem 'conversao' no modelo
+            metrica = MetricaOferta(oferta_id=oferta.id, cliques=0, vendas=0)
+            self.db_session.add(metrica)
+            return True
+        elif cortado:
+            oferta.status = "APROVADO"
+            oferta.data_publicacao = None
+            prazo.adiar("publicacao", f"oferta {oferta.id} (prazo acabou antes do envio)")
+            return False
+        else:
+            oferta.status = "REJEITADA_SEM_CANAL"
+            oferta.data_publicacao = None
+            print(f"Oferta {oferta.id} não publicada: nenhum canal relevante encontrado ou falha no envio.")
+            return False
 
 if __name__ == "__main__":
     from curadoria_ofertas.backend.db.database import SessionLocal
@@ -1,9 +1,10 @@
 import os
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, text
 
 from backend.models.models import Oferta, HistoricoPreco, Produto
+from backend.utils.telemetry import telemetria
 
 class Validator:
     def __init__(self, db_session: Session):
@@ -20,6 +21,36 @@ class Validator:
             scalar()
         return avg_price if avg_price else 0.0
 
+    def _anotar(self, oferta):
+        """Calcula desconto_real e motivo_validacao de uma oferta pendente (não aprova/rejeita)."""
+        produto = self.db_session.get(Produto, oferta.produto_id)
+        if not produto:
+            oferta.motivo_validacao = "Produto não encontrado no banco."
+            # Mantém PENDENTE_APROVACAO para revisão manual
+            return
+
+        # 1) Tenta usar a média dos últimos 3 meses do nosso histórico
+        avg_price = self._get_average_price_last_months(produto.id, months=3)
+        if avg_price and avg_price > 0:
+            calculated_discount = ((avg_price - oferta.preco_oferta) / avg_price) * 100
+            oferta.desconto_real = calculated_discount
+            oferta.motivo_validacao = (
+                f"Média 3m R$ {avg_price:.2f} · Preço atual R$ {oferta.preco_oferta:.2f} "
+                f"· Δ vs média {calculated_discount:.1f}%"
+            )
+        else:
+            # 2) Sem histórico: registra desconto vs preço original (se houver)
+            if oferta.preco_original and oferta.preco_original > 0:
+                desconto_informado = ((oferta.preco_original - oferta.preco_oferta) / oferta.preco_original) * 100
+                oferta.desconto_real = desconto_informado
+                oferta.motivo_validacao = (
+                    f"Sem histórico · De R$ {oferta.preco_original:.2f} por R$ {oferta.preco_oferta:.2f} "
+                    f"· Desconto informado {desconto_informado:.1f}%"
+                )
+            else:
+                oferta.desconto_real = None
+                oferta.motivo_validacao = "Sem histórico e sem preço original · análise manual necessária"
+
     def run_validation(self):
         """
         Anota evidências de desconto para ofertas pendentes,
@@ -34,36 +65,50 @@ class Validator:
         )
 
         for oferta in ofertas_pendentes:
-            produto = self.db_session.get(Produto, oferta.produto_id)
-            if not produto:
-                oferta.motivo_validacao = "Produto não encontrado no banco."
-                # Mantém PENDENTE_APROVACAO para revisão manual
-                continue
-
-            # 1) Tenta usar a média dos últimos 3 meses do nosso histórico
-            avg_price = self._get_average_price_last_months(produto.id, months=3)
-            if avg_price and avg_price > 0:
-                calculated_discount = ((avg_price - oferta.preco_oferta) / avg_price) * 100
-                oferta.desconto_real = calculated_discount
-                oferta.motivo_validacao = (
-                    f"Média 3m R$ {avg_price:.2f} · Preço atual R$ {oferta.preco_oferta:.2f} "
-                    f"· Δ vs média {calculated_discount:.1f}%"
-                )
-            else:
-                # 2) Sem histórico: registra desconto vs preço original (se houver)
-                if oferta.preco_original and oferta.preco_original > 0:
-                    desconto_informado = ((oferta.preco_original - oferta.preco_oferta) / oferta.preco_original) * 100
-                    oferta.desconto_real = desconto_informado
-                    oferta.motivo_validacao = (
-                        f"Sem histórico · De R$ {oferta.preco_original:.2f} por R$ {oferta.preco_oferta:.2f} "
-                        f"· Desconto informado {desconto_informado:.1f}%"
-                    )
-                else:
-                    oferta.desconto_real = None
-                    oferta.motivo_validacao = "Sem histórico e sem preço original · análise manual necessária"
+            self._anotar(oferta)
 
+        telemetria.itens(entrada=len(ofertas_pendentes), saida=len(ofertas_pendentes))
         self.db_session.commit()
 
+    def validar_ofertas(self, oferta_ids) -> int:
+        """
+        Validação incremental: só as ofertas informadas (ex.: eventos OFERTA_CRIADA do Collector),
+        sem varrer a fila inteira. Ofertas que já saíram de PENDENTE_APROVACAO são ignoradas.
+        """
+        ids = list(set(oferta_ids))
+        if not ids:
+            return 0
+        ofertas = (
+            self.db_session.query(Oferta)
+            .filter(Oferta.id.in_(ids), Oferta.status == "PENDENTE_APROVACAO")
+            .all()
+        )
+        for oferta in ofertas:
+            self._anotar(oferta)
+
+        telemetria.itens(entrada=len(ids), saida=len(ofertas))
+        self.db_session.commit()
+        return len(ofertas)
+
+    def validar_nao_anotadas(self, limite: int = 500) -> int:
+        """
+        Rede de segurança do modo incremental: pendentes que nunca foram anotadas (eventos perdidos
+        numa queda, validação que falhou, ofertas de antes do modo incremental), no máximo `limite`
+        por chamada. O filtro vai literal para o SQLite usar o índice parcial ix_ofertas_nao_anotadas.
+        """
+        ofertas = (
+            self.db_session.query(Oferta)
+            .filter(text("ofertas.status = 'PENDENTE_APROVACAO' AND ofertas.motivo_validacao IS NULL"))
+            .order_by(Oferta.id)
+            .limit(limite)
+            .all()
+        )
+        for oferta in ofertas:
+            self._anotar(oferta)
+
+        telemetria.itens(entrada=len(ofertas), saida=len(ofertas))
+        self.db_session.commit()
+        return len(ofertas)
 
 if __name__ == "__main__":
     from curadoria_ofertas.backend.db.database import SessionLocal
@@ -4,8 +4,10 @@ from sqlalchemy import create_engine
 from datetime import datetime
 
 from ..db.database import DATABASE_URL, Base, SessionLocal
-from ..models.models import Oferta, LojaConfiavel, Tag, CanalTelegram, Produto, MetricaOferta, OfertaPublicada, HistoricoPreco, ConfigVar
-from backend.utils.config import get_config, set_config, list_configs
+from ..models.models import Oferta, LojaConfiavel, Tag, CanalTelegram, Produto, MetricaOferta, OfertaPublicada, HistoricoPreco, IntervaloPreco, ConfigVar, MetricaSnapshot, MetricaRollup, FilaEvento
+from backend.utils.config import get_config, set_config, list_configs, bump_config_version, invalidate_config_cache
+from backend.utils.cache import cached_json, bump_data_version, invalidate_data_versions
+from backend.utils.bus import bus, OFERTA_APROVADA, OFERTA_CRIADA
 
 api_bp = Blueprint("api", __name__)
 
@@ -45,12 +47,17 @@ def _resolve_tags_by_names(db, names):
     by_name = {t.nome_tag: t for t in existentes}
 
     # cria as que faltam
+    criou = False
     for nome in norm_unique:
         if nome not in by_name:
             t = Tag(nome_tag=nome)
             db.add(t)
             db.flush()  # garante id para a N:N
             by_name[nome] = t
+            criou = True
+
+    if criou:
+        bump_data_version(db, "tags")  # o commit (e invalidate_data_versions) fica com o chamador
 
     # mantém a ordem normalizada
     for nome in norm_unique:
@@ -75,32 +82,97 @@ def get_canais_destino():
     # normaliza lista de nomes
     tags_list = [_normalize_tag_name(t) for t in tags_str.split(",") if _normalize_tag_name(t)]
 
-    db = SessionLocal()
-    canais_encontrados = []
-    if tags_list:
-        # Busca tags por nome normalizado
-        tags_obj = db.query(Tag).filter(Tag.nome_tag.in_(tags_list)).all()
-        tag_ids = [tag.id for tag in tags_obj]
-
-        if tag_ids:
-            # Canais ativos que tenham ALGUMA das tags (distinct p/ evitar duplicados)
-            canais_encontrados = (
-                db.query(CanalTelegram)
-                  .join(CanalTelegram.tags)
-                  .filter(CanalTelegram.ativo == True, Tag.id.in_(tag_ids))
-                  .distinct()
-                  .all()
-            )
+    def _build():
+        canais_encontrados = []
+        with SessionLocal() as db:
+            if tags_list:
+                # Busca tags por nome normalizado
+                tags_obj = db.query(Tag).filter(Tag.nome_tag.in_(tags_list)).all()
+                tag_ids = [tag.id for tag in tags_obj]
+
+                if tag_ids:
+                    # Canais ativos que tenham ALGUMA das tags (distinct p/ evitar duplicados)
+                    canais_encontrados = (
+                        db.query(CanalTelegram)
+                          .join(CanalTelegram.tags)
+                          .filter(CanalTelegram.ativo == True, Tag.id.in_(tag_ids))
+                          .distinct()
+                          .all()
+                    )
+
+            canais_data = [{
+                "id": canal.id,
+                "nome_amigavel": canal.nome_amigavel,
+                "id_canal_api": canal.id_canal_api
+            } for canal in canais_encontrados]
+        return {"status": "success", "canais": canais_data}
+
+    # Memorizado por conjunto de tags + versão de tags/canais; repetições viram 304
+    return cached_json(("tags", "canais"), "canais_destino:" + ",".join(sorted(set(tags_list))), _build)
 
-    db.close()
+# ---------------------------
+# Fila de aprovação (keyset)
+# ---------------------------
+@api_bp.route("/fila", methods=["GET"])
+def api_fila():
+    """
+    Página da fila de aprovação.
+    query: cursor, limit, tag, loja_id, min_desconto, q
+    resposta: {"items": [...], "next_cursor": "<iso>|<id>" | null}
+    """
+    from backend.utils.fila import parse_filtros, page_size, query_fila, serialize_oferta
+    filtros = parse_filtros(request.args)
+    with SessionLocal() as db:
+        ofertas, next_cursor = query_fila(db, filtros, request.args.get("cursor"), page_size(request.args))
+        items = [serialize_oferta(of) for of in ofertas]
+    return jsonify({"status": "success", "items": items, "next_cursor": next_cursor}), 200
 
-    canais_data = [{
-        "id": canal.id,
-        "nome_amigavel": canal.nome_amigavel,
-        "id_canal_api": canal.id_canal_api
-    } for canal in canais_encontrados]
+@api_bp.route("/fila/eventos", methods=["GET"])
+def api_fila_eventos():
+    """
+    Deltas da fila de aprovação (novo/alterado/removido) a partir de um cursor.
+    - padrão: stream SSE (event "fila" com {"total", "eventos"}; "resync" se o cursor ficou velho demais).
+      O cursor vem de Last-Event-ID (reconexão do EventSource) ou de ?since=.
+    - ?modo=poll&since=&timeout=: long-poll JSON {"resync", "seq", "total", "eventos"}.
+    """
+    import json
+    import time
+    from flask import Response, stream_with_context
+    from backend.utils.feed import change_feed, FEED_KEEPALIVE_SEC, FEED_STREAM_MAX_SEC
 
-    return jsonify({"status": "success", "canais": canais_data}), 200
+    try:
+        since = int(request.headers.get("Last-Event-ID") or request.args.get("since") or -1)
+    except ValueError:
+        since = -1
+    since = since if since >= 0 else None
+
+    if request.args.get("modo") == "poll":
+        try:
+            timeout = max(0.0, min(float(request.args.get("timeout") or 25), 55))
+        except ValueError:
+            timeout = 25
+        deltas, seq, total = change_feed.wait(since, timeout)
+        return jsonify({"status": "success", "resync": deltas is None, "seq": seq,
+                        "total": total, "eventos": deltas or []}), 200
+
+    def stream(since):
+        # conexão com vida limitada: o EventSource reconecta sozinho retomando do Last-Event-ID
+        fim = time.monotonic() + FEED_STREAM_MAX_SEC
+        yield "retry: 3000\n\n"
+        while time.monotonic() < fim:
+            deltas, seq, total = change_feed.wait(since, FEED_KEEPALIVE_SEC)
+            if deltas is None:
+                since = seq
+                yield f"id: {seq}\nevent: resync\ndata: {json.dumps({'seq': seq})}\n\n"
+            elif deltas:
+                since = deltas[-1]["seq"]
+                payload = json.dumps({"total": total, "eventos": deltas}, ensure_ascii=False)
+                yield f"id: {since}\nevent: fila\ndata: {payload}\n\n"
+            else:
+                yield ": ping\n\n"
+
+    return Response(stream_with_context(stream(since)), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # ---------------------------
 # Aprovar / Rejeitar / Agendar oferta
@@ -123,6 +195,8 @@ def api_aprovar_oferta(oferta_id):
 
         oferta.status = "APROVADO"
         db.commit()
+        invalidate_data_versions()
+        bus.publish(OFERTA_APROVADA, oferta_id=oferta_id)
         return jsonify({"status": "success", "message": "Oferta aprovada com sucesso!"}), 200
     except Exception as e:
         db.rollback()
@@ -178,6 +252,118 @@ def api_agendar_oferta(oferta_id):
     finally:
         db.close()
 
+# ---------------------------
+# Métricas (série de cliques)
+# ---------------------------
+@api_bp.route("/ofertas/<int:oferta_id>/metricas", methods=["GET"])
+def api_metricas_oferta(oferta_id):
+    """Curva de cliques/vendas da oferta. ?granularidade=hora|dia|bruto (padrão: hora)."""
+    from backend.modules.metrics_analyzer import MetricsAnalyzer
+    granularidade = request.args.get("granularidade", "hora")
+    if granularidade not in {"hora", "dia", "bruto"}:
+        return jsonify({"status": "error", "message": "granularidade deve ser hora, dia ou bruto."}), 400
+
+    with SessionLocal() as db:
+        if not db.get(Oferta, oferta_id):
+            return jsonify({"status": "error", "message": "Oferta não encontrada."}), 404
+        serie = MetricsAnalyzer(db).click_series(oferta_id, granularidade)
+    return jsonify({"status": "success", "granularidade": granularidade, "serie": serie}), 200
+
+@api_bp.route("/ofertas/lote", methods=["POST"])
+def api_ofertas_lote():
+    """
+    Aplica várias ações da fila em UMA transação.
+    body: {"acoes": [{"id": 1, "acao": "aprovar", "tags": ["gamer"]},
+                     {"id": 2, "acao": "rejeitar"},
+                     {"id": 3, "acao": "agendar", "data_agendamento": "2025-01-01T10:00:00"}]}
+    resposta: {"status": "success", "resultados": [{"id": 1, "status": "success"}, ...]}
+    Erros de um item (não encontrado, ação/data inválida) não impedem os demais.
+    """
+    from sqlalchemy.orm import selectinload
+    acoes = (request.json or {}).get("acoes") or []
+    if not isinstance(acoes, list) or not acoes:
+        return jsonify({"status": "error", "message": "acoes deve ser uma lista não vazia."}), 400
+
+    def _id(a):
+        oid = a.get("id") if isinstance(a, dict) else None
+        return oid if isinstance(oid, int) and not isinstance(oid, bool) else None
+
+    def _tags_ok(tags):
+        return tags is None or (isinstance(tags, list) and all(isinstance(n, str) for n in tags))
+
+    db = SessionLocal()
+    try:
+        ids = [oid for oid in map(_id, acoes) if oid is not None]
+        ofertas = {
+            o.id: o for o in (
+                db.query(Oferta)
+                  .options(selectinload(Oferta.produto).selectinload(Produto.tags))
+                  .filter(Oferta.id.in_(ids))
+                  .all()
+            )
+        } if ids else {}
+
+        # Todas as tags do lote resolvidas de uma vez
+        nomes = [n for a in acoes if isinstance(a, dict) and a.get("acao") == "aprovar" and _tags_ok(a.get("tags"))
+                 for n in (a.get("tags") or [])]
+        tags_by_name = {t.nome_tag: t for t in _resolve_tags_by_names(db, nomes)}
+
+        resultados = []
+        vistos = set()
+        for a in acoes:
+            oid = _id(a)
+            acao = a.get("acao") if isinstance(a, dict) else None
+            oferta = ofertas.get(oid)
+            if not oferta:
+                resultados.append({"id": oid, "status": "error", "message": "Oferta não encontrada."})
+                continue
+            if oid in vistos:
+                resultados.append({"id": oid, "status": "error", "message": "Oferta repetida no lote."})
+                continue
+            vistos.add(oid)
+
+            if acao == "aprovar":
+                tags = a.get("tags")
+                if not _tags_ok(tags):
+                    resultados.append({"id": oid, "status": "error", "message": "tags deve ser uma lista de nomes."})
+                    continue
+                if tags is not None and oferta.produto is not None:  # permite [] para remover todas
+                    novas = []
+                    for n in tags:
+                        t = tags_by_name.get(_normalize_tag_name(n))
+                        if t is not None and t not in novas:
+                            novas.append(t)
+                    oferta.produto.tags[:] = novas
+                oferta.status = "APROVADO"
+            elif acao == "rejeitar":
+                oferta.status = "REJEITADO"
+            elif acao == "agendar":
+                try:
+                    data_agendamento = datetime.fromisoformat(a.get("data_agendamento") or "")
+                except (TypeError, ValueError):
+                    resultados.append({"id": oid, "status": "error", "message": "Data de agendamento inválida."})
+                    continue
+                oferta.status = "AGENDADO"
+                oferta.data_publicacao = data_agendamento
+            else:
+                resultados.append({"id": oid, "status": "error", "message": "Ação inválida."})
+                continue
+            resultados.append({"id": oid, "status": "success", "acao": acao})
+
+        # só as que terminam o lote aprovadas (lidas antes do commit, que expira os objetos)
+        aprovadas = [r["id"] for r in resultados
+                     if r.get("acao") == "aprovar" and ofertas[r["id"]].status == "APROVADO"]
+        db.commit()
+        invalidate_data_versions()
+        for oid in aprovadas:
+            bus.publish(OFERTA_APROVADA, oferta_id=oid)
+        return jsonify({"status": "success", "resultados": resultados}), 200
+    except Exception as e:
+        db.rollback()
+        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        db.close()
+
 # ---------------------------
 # Lojas Confiáveis (CRUD)
 # ---------------------------
@@ -199,7 +385,9 @@ def api_add_loja():
             return jsonify({"status": "error", "message": "nome_loja e plataforma são obrigatórios."}), 400
 
         db.add(loja)
+        bump_data_version(db, "lojas")
         db.commit()
+        invalidate_data_versions()
         return jsonify({"status": "success", "message": "Loja adicionada com sucesso!", "id": loja.id}), 201
     except Exception as e:
         db.rollback()
@@ -222,7 +410,9 @@ def api_update_loja(loja_id):
         loja.id_loja_api = data.get("id_loja_api", loja.id_loja_api)
         loja.pontuacao_confianca = data.get("pontuacao_confianca", loja.pontuacao_confianca)
         loja.ativa = data.get("ativa", loja.ativa)
+        bump_data_version(db, "lojas")
         db.commit()
+        invalidate_data_versions()
         return jsonify({"status": "success", "message": "Loja atualizada com sucesso!"}), 200
     except Exception as e:
         db.rollback()
@@ -240,7 +430,9 @@ def api_delete_loja(loja_id):
 
     try:
         db.delete(loja)
+        bump_data_version(db, "lojas", "historico")   # histórico da loja perde o vínculo
         db.commit()
+        invalidate_data_versions()
         return jsonify({"status": "success", "message": "Loja removida com sucesso!"}), 200
     except Exception as e:
         db.rollback()
@@ -266,7 +458,9 @@ def api_add_tag():
 
         tag = Tag(nome_tag=tag_name)
         db.add(tag)
+        bump_data_version(db, "tags")
         db.commit()
+        invalidate_data_versions()
         return jsonify({"status": "success", "message": "Tag adicionada com sucesso!", "id": tag.id}), 201
     except Exception as e:
         db.rollback()
@@ -284,7 +478,9 @@ def api_delete_tag(tag_id):
 
     try:
         db.delete(tag)
+        bump_data_version(db, "tags", "canais")
         db.commit()
+        invalidate_data_versions()
         return jsonify({"status": "success", "message": "Tag removida com sucesso!"}), 200
     except Exception as e:
         db.rollback()
@@ -316,7 +512,9 @@ def api_add_canal():
         tags_associadas = data.get("tags_associadas", [])
         canal.tags = _resolve_tags_by_names(db, tags_associadas)
 
+        bump_data_version(db, "canais")
         db.commit()
+        invalidate_data_versions()
         return jsonify({"status": "success", "message": "Canal adicionado com sucesso!", "id": canal.id}), 201
     except Exception as e:
         db.rollback()
@@ -352,7 +550,9 @@ def api_update_canal(canal_id):
         if "tags_associadas" in data:
             canal.tags = _resolve_tags_by_names(db, data.get("tags_associadas"))
 
+        bump_data_version(db, "canais")
         db.commit()
+        invalidate_data_versions()
         return jsonify({"status": "success", "message": "Canal atualizado com sucesso!"}), 200
     except Exception as e:
         db.rollback()
@@ -370,7 +570,9 @@ def api_delete_canal(canal_id):
 
     try:
         db.delete(canal)
+        bump_data_version(db, "canais")
         db.commit()
+        invalidate_data_versions()
         return jsonify({"status": "success", "message": "Canal removido com sucesso!"}), 200
     except Exception as e:
         db.rollback()
@@ -378,8 +580,283 @@ def api_delete_canal(canal_id):
     finally:
         db.close()
 
+# ---------------------------
+# Produtos (listagem leve)
+# ---------------------------
+def _produtos_summary_query(db):
+    """
+    Colunas-resumo por produto calculadas no SQL (subconsultas correlacionadas, uma por linha
+    da página): último preço, mínimo, média, nº de registros de histórico, nº de ofertas e loja.
+    Mínimo/média/nº de registros vêm de intervalos_precos (observacoes por intervalo), que cobre
+    o histórico inteiro: o arquivamento não muda o resumo.
+    """
+    from sqlalchemy import func, select, or_
+    hp, iv = HistoricoPreco, IntervaloPreco
+    ultimo = (select(hp.preco).where(hp.produto_id == Produto.id)
+              .order_by(hp.data_verificacao.desc()).limit(1).scalar_subquery())
+    minimo = select(func.min(iv.preco)).where(iv.produto_id == Produto.id).scalar_subquery()
+    media = (select(func.sum(iv.preco * iv.observacoes) / func.sum(iv.observacoes))
+             .where(iv.produto_id == Produto.id).scalar_subquery())
+    n_hist = (select(func.coalesce(func.sum(iv.observacoes), 0))
+              .where(iv.produto_id == Produto.id).scalar_subquery())
+    n_ofertas = select(func.count(Oferta.id)).where(Oferta.produto_id == Produto.id).scalar_subquery()
+    nome_loja = (select(LojaConfiavel.nome_loja)
+                 .where(or_(LojaConfiavel.id_loja_api == Produto.product_id_loja,
+                            LojaConfiavel.id_loja_api_alt == Produto.product_id_loja_alt))
+                 .limit(1).scalar_subquery())
+    return db.query(
+        Produto.id, Produto.id_product, Produto.nome_produto, Produto.url_base, Produto.imagem_url,
+        Produto.product_id_loja, Produto.product_id_loja_alt,
+        ultimo.label("ultimo_preco"), minimo.label("preco_minimo"), media.label("preco_medio"),
+        n_hist.label("n_historico"), n_ofertas.label("n_ofertas"), nome_loja.label("nome_loja"),
+    )
+
+@api_bp.route("/produtos", methods=["GET"])
+def api_list_produtos():
+    """
+    Lista paginada (keyset por id DESC) só com colunas-resumo.
+    query: cursor (último id recebido), limit (padrão 50, máx. 200), q (busca FTS no nome)
+    """
+    from sqlalchemy import func
+    from sqlalchemy.orm import selectinload
+    from backend.db.fts import fts_ids_select
+    try:
+        limit = max(1, min(int(request.args.get("limit") or 50), 200))
+        cursor = int(request.args["cursor"]) if request.args.get("cursor") else None
+    except ValueError:
+        return jsonify({"status": "error", "message": "cursor/limit inválidos."}), 400
+
+    busca = fts_ids_select(request.args.get("q") or "")
+    with SessionLocal() as db:
+        q = _produtos_summary_query(db)
+        if busca is not None:
+            q = q.filter(Produto.id.in_(busca))
+        if cursor:
+            q = q.filter(Produto.id < cursor)
+        rows = q.order_by(Produto.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # tags só dos produtos desta página
+        tags_by_id = {}
+        if rows:
+            for p in (db.query(Produto).options(selectinload(Produto.tags))
+                        .filter(Produto.id.in_([r.id for r in rows])).all()):
+                tags_by_id[p.id] = [t.nome_tag for t in p.tags]
+
+        total = None
+        if not cursor:
+            tq = db.query(func.count(Produto.id))
+            if busca is not None:
+                tq = tq.filter(Produto.id.in_(busca))
+            total = tq.scalar()
+
+    items = [{
+        "id": r.id,
+        "id_product": r.id_product,
+        "nome_produto": r.nome_produto,
+        "url_base": r.url_base,
+        "imagem_url": r.imagem_url,
+        "product_id_loja": r.product_id_loja,
+        "product_id_loja_alt": r.product_id_loja_alt,
+        "nome_loja": r.nome_loja,
+        "ultimo_preco": r.ultimo_preco,
+        "preco_minimo": r.preco_minimo,
+        "preco_medio": round(r.preco_medio, 2) if r.preco_medio is not None else None,
+        "n_historico": r.n_historico,
+        "n_ofertas": r.n_ofertas,
+        "tags": tags_by_id.get(r.id, []),
+    } for r in rows]
+    return jsonify({
+        "status": "success",
+        "items": items,
+        "next_cursor": rows[-1].id if has_more and rows else None,
+        "total": total,
+    }), 200
+
+@api_bp.route("/produtos/busca", methods=["GET"])
+def api_busca_produtos():
+    """
+    Busca textual ranqueada (FTS5/bm25) no nome normalizado dos produtos.
+    query: q (termos; cada um casa por prefixo, sem acento/maiúsculas), limit (padrão 20, máx. 100)
+    """
+    from backend.db.fts import search_ids
+    q = request.args.get("q") or ""
+    try:
+        limit = max(1, min(int(request.args.get("limit") or 20), 100))
+    except ValueError:
+        limit = 20
+
+    with SessionLocal() as db:
+        hits = search_ids(db.connection(), q, limit)
+        ids = [pid for pid, _ in hits]
+        produtos = {p.id: p for p in db.query(Produto).filter(Produto.id.in_(ids)).all()} if ids else {}
+        items = [{
+            "id": pid,
+            "nome_produto": produtos[pid].nome_produto,
+            "imagem_url": produtos[pid].imagem_url,
+            "url_base": produtos[pid].url_base,
+            "score": score,
+        } for pid, score in hits if pid in produtos]
+    return jsonify({"status": "success", "items": items}), 200
+
+@api_bp.route("/produtos/<int:produto_id>/serie", methods=["GET"])
+def api_produto_serie(produto_id: int):
+    """
+    Série de preços reduzida a um número fixo de pontos (para gráficos/sparklines).
+    query: dias (padrão 90) ou desde/ate (ISO), pontos (padrão 120, máx. 1000),
+           metodo=lttb|minmax (padrão lttb), loja_id (opcional)
+    O custo não depende de quantas observações o produto tem: as linhas são lidas em
+    streaming e reduzidas por faixa de tempo (memória O(pontos)). A resposta fica em cache
+    por (produto, intervalo, maior id do histórico do produto, versão "historico") e sai com ETag:
+    inserções mudam o maior id; arquivamento e exclusões incrementam a versão.
+    """
+    import heapq
+    from datetime import timedelta
+    from sqlalchemy import func, select
+    from backend.db.database import engine
+    from backend.utils import historico_arquivo
+    from backend.utils.export import parse_data
+    from backend.utils.series import lttb, minmax_buckets
+
+    metodo = (request.args.get("metodo") or "lttb").lower()
+    if metodo not in {"lttb", "minmax"}:
+        return jsonify({"status": "error", "message": "metodo deve ser lttb ou minmax."}), 400
+    try:
+        pontos = max(3, min(int(request.args.get("pontos") or 120), 1000))
+        loja_id = int(request.args["loja_id"]) if request.args.get("loja_id") else None
+        if request.args.get("desde"):
+            desde = parse_data(request.args.get("desde"))
+            ate = parse_data(request.args.get("ate"), fim_do_dia=True) or datetime.now()
+            janela = f"{desde.isoformat()}_{ate.isoformat()}"
+        else:
+            dias = max(1, min(int(request.args.get("dias") or 90), 3650))
+            ate = datetime.now()
+            desde = ate - timedelta(days=dias)
+            janela = f"{dias}d_{ate:%Y%m%d}"   # janela relativa: renova a cada dia
+    except ValueError:
+        return jsonify({"status": "error", "message": "Parâmetros inválidos."}), 400
+
+    filtro = [HistoricoPreco.produto_id == produto_id]
+    if loja_id:
+        filtro.append(HistoricoPreco.loja_id == loja_id)
+
+    # inserções: maior id do histórico do produto (uma busca no índice, sem contar as linhas);
+    # arquivamento e exclusões tiram linhas e incrementam versoes_dados["historico"]
+    with engine.connect() as conn:
+        ultimo_id = conn.execute(select(func.max(HistoricoPreco.id)).where(*filtro)).scalar()
+    if ultimo_id is None:
+        with SessionLocal() as db:
+            if not db.get(Produto, produto_id):
+                return jsonify({"status": "error", "message": "Produto não encontrado"}), 404
+
+    def build():
+        t0, t1 = desde.timestamp(), ate.timestamp()
+        # camada fria (Parquet): linhas antigas saem da tabela; a série junta as duas
+        arquivadas = [(r[4], r[3]) for r in historico_arquivo.ler(
+            produto_id, loja_id, desde, ate + timedelta(microseconds=1))]
+        with engine.connect() as conn:
+            # preço vigente no início da janela (o histórico só registra mudanças)
+            anterior = conn.execute(
+                select(HistoricoPreco.data_verificacao, HistoricoPreco.preco)
+                .where(*filtro, HistoricoPreco.data_verificacao < desde)
+                .order_by(HistoricoPreco.data_verificacao.desc()).limit(1)
+            ).first()
+            anterior_arquivo = historico_arquivo.ultimo_antes(produto_id, loja_id, desde)
+            if anterior_arquivo and (anterior is None or anterior_arquivo[0] > anterior[0]):
+                anterior = anterior_arquivo
+            result = conn.execution_options(yield_per=5000).execute(
+                select(HistoricoPreco.data_verificacao, HistoricoPreco.preco)
+                .where(*filtro, HistoricoPreco.data_verificacao >= desde, HistoricoPreco.data_verificacao <= ate)
+                .order_by(HistoricoPreco.data_verificacao)
+            )
+            n_original = 0
+
+            def linhas():
+                nonlocal n_original
+                if anterior is not None:
+                    yield t0, float(anterior[1])
+                for d, preco in heapq.merge(arquivadas, result, key=lambda r: r[0]):
+                    n_original += 1
+                    yield d.timestamp(), float(preco)
+
+            if metodo == "minmax":
+                serie = minmax_buckets(linhas(), t0, t1, pontos // 2)
+            else:
+                # pré-redução por faixas (memória limitada) e LTTB no resultado
+                serie = lttb(minmax_buckets(linhas(), t0, t1, pontos * 4), pontos)
+
+        return {
+            "status": "success",
+            "produto_id": produto_id,
+            "metodo": metodo,
+            "desde": desde.isoformat(),
+            "ate": ate.isoformat(),
+            "n_original": n_original,
+            "pontos": [{"t": datetime.fromtimestamp(t).isoformat(), "preco": y} for t, y in serie],
+        }
+
+    return cached_json(("historico",), f"serie:{produto_id}:{loja_id}:{janela}:{pontos}:{metodo}:{ultimo_id}", build)
+
+@api_bp.route("/produtos/<int:produto_id>/estatisticas", methods=["GET"])
+def api_produto_estatisticas(produto_id: int):
+    """
+    Mínimo, máximo e média ponderada pelo tempo do preço numa janela, a partir dos intervalos
+    de preço (custo pelo nº de mudanças de preço na janela, não pelo de observações).
+    query: dias (padrão 90) ou desde/ate (ISO), loja_id (opcional)
+    """
+    from datetime import timedelta
+    from backend.db.database import engine
+    from backend.db.intervalos import estatisticas
+    from backend.utils.export import parse_data
+
+    try:
+        loja_id = int(request.args["loja_id"]) if request.args.get("loja_id") else None
+        if request.args.get("desde"):
+            desde = parse_data(request.args.get("desde"))
+            ate = parse_data(request.args.get("ate"), fim_do_dia=True) or datetime.now()
+        else:
+            ate = datetime.now()
+            desde = ate - timedelta(days=max(1, min(int(request.args.get("dias") or 90), 3650)))
+    except ValueError:
+        return jsonify({"status": "error", "message": "Parâmetros inválidos."}), 400
+
+    with SessionLocal() as db:
+        if not db.get(Produto, produto_id):
+            return jsonify({"status": "error", "message": "Produto não encontrado."}), 404
+    with engine.connect() as conn:
+        stats = estatisticas(conn, IntervaloPreco.__table__, produto_id, desde, ate, loja_id)
+    return jsonify({"status": "success", "produto_id": produto_id, "desde": desde.isoformat(),
+                    "ate": ate.isoformat(), **stats}), 200
+
+@api_bp.route("/produtos/<int:produto_id>/historico", methods=["GET"])
+def api_historico_produto(produto_id: int):
+    """Histórico completo de preços de UM produto (carregado sob demanda pela página), incluindo o arquivado."""
+    from backend.utils import historico_arquivo
+    with SessionLocal() as db:
+        if not db.get(Produto, produto_id):
+            return jsonify({"status": "error", "message": "Produto não encontrado."}), 404
+        rows = (
+            db.query(HistoricoPreco.data_verificacao, HistoricoPreco.preco, LojaConfiavel.nome_loja)
+              .join(LojaConfiavel, LojaConfiavel.id == HistoricoPreco.loja_id)
+              .filter(HistoricoPreco.produto_id == produto_id)
+              .order_by(HistoricoPreco.data_verificacao.desc())
+              .all()
+        )
+        # linhas antigas que foram para a camada fria (Parquet)
+        arquivadas = historico_arquivo.ler(produto_id)
+        if arquivadas:
+            lojas = dict(db.query(LojaConfiavel.id, LojaConfiavel.nome_loja)
+                           .filter(LojaConfiavel.id.in_({r[2] for r in arquivadas})).all())
+            rows += [(r[4], r[3], lojas[r[2]]) for r in arquivadas if r[2] in lojas]
+            rows.sort(key=lambda r: r[0], reverse=True)
+    return jsonify({"status": "success", "historico": [
+        {"data": d.isoformat(), "preco": preco, "loja": loja} for d, preco, loja in rows
+    ]}), 200
+
 @api_bp.delete("/produtos/<int:produto_id>")
 def api_delete_produto(produto_id: int):
+    from backend.utils import historico_arquivo
     db = SessionLocal()
     try:
         produto = db.get(Produto, produto_id)
@@ -391,12 +868,20 @@ def api_delete_produto(produto_id: int):
         if ofertas:
             oferta_ids = [o.id for o in ofertas]
             db.query(MetricaOferta).filter(MetricaOferta.oferta_id.in_(oferta_ids)).delete(synchronize_session=False)
+            db.query(MetricaSnapshot).filter(MetricaSnapshot.oferta_id.in_(oferta_ids)).delete(synchronize_session=False)
+            db.query(MetricaRollup).filter(MetricaRollup.oferta_id.in_(oferta_ids)).delete(synchronize_session=False)
             db.query(OfertaPublicada).filter(OfertaPublicada.oferta_id.in_(oferta_ids)).delete(synchronize_session=False)
+            # delete em massa não passa pelos eventos do ORM: avisa a fila à mão
+            db.add_all(FilaEvento(oferta_id=o.id, tipo="removido")
+                       for o in ofertas if o.status == "PENDENTE_APROVACAO")
             # 2) Apaga as ofertas
             db.query(Oferta).filter(Oferta.id.in_(oferta_ids)).delete(synchronize_session=False)
 
-        # 3) Apaga histórico de preços
+        # 3) Apaga histórico de preços (e os intervalos derivados dele); o arquivado ganha uma lápide
         db.query(HistoricoPreco).filter(HistoricoPreco.produto_id == produto_id).delete(synchronize_session=False)
+        db.query(IntervaloPreco).filter(IntervaloPreco.produto_id == produto_id).delete(synchronize_session=False)
+        historico_arquivo.registrar_exclusao(db.connection(), produto_id)
+        bump_data_version(db, "historico")
 
         # 4) Limpa vínculo N:N com tags e apaga o produto
         produto.tags.clear()
@@ -404,6 +889,7 @@ def api_delete_produto(produto_id: int):
         db.delete(produto)
 
         db.commit()
+        invalidate_data_versions()
         return jsonify({"status": "success"})
     except Exception as e:
         db.rollback()
@@ -458,7 +944,9 @@ def api_update_env(cfg_id: int):
         if "description" in payload:
             row.description = payload.get("description")
         row.updated_at = datetime.now()
+        bump_config_version(db)
         db.commit()
+    invalidate_config_cache()
     return jsonify({"status":"success"})
 
 @api_bp.delete("/env/<int:cfg_id>")
@@ -469,57 +957,168 @@ def api_delete_env(cfg_id: int):
         if not row:
             return jsonify({"status":"error","message":"Config não encontrada"}), 404
         db.delete(row)
+        bump_config_version(db)
         db.commit()
+    invalidate_config_cache()
     return jsonify({"status":"success"})
 
-@api_bp.route("/lojas/auto_from_produto/<int:produto_id>", methods=["POST"])
-def api_auto_create_loja_from_produto(produto_id):
-    """
-    Dado um produto (com url_base), resolve MLB-XXXX, tenta achar loja por id alternativo
-    e, se não existir, abre a página e cria a LojaConfiavel automaticamente.
-    """
-    from backend.modules.collector import Collector  # reusar lógica
-    db = SessionLocal()
+# ---------------------------
+# Jobs em background (scraping)
+# ---------------------------
+_jobs_http = None
+JOBS_COLLECTOR_MAX_AGE_SEC = 300  # recria o Collector quente periodicamente (config/tags novas)
+
+def _shared_jobs_http():
+    """Sessão HTTP única (pool de conexões) compartilhada pelos Collectors dos workers."""
+    global _jobs_http
+    if _jobs_http is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from backend.utils.jobs import job_queue
+        _jobs_http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=job_queue.workers, pool_maxsize=job_queue.workers)
+        _jobs_http.mount("https://", adapter)
+        _jobs_http.mount("http://", adapter)
+    return _jobs_http
+
+def _warm_collector(ctx):
+    """Collector reaproveitado entre jobs do mesmo worker (tags recarregadas só quando mudam)."""
+    import time
+    from backend.modules.collector import Collector
+    from backend.utils.cache import data_versions
+    col = ctx.get("collector")
+    if col is not None and time.monotonic() - ctx["created_at"] > JOBS_COLLECTOR_MAX_AGE_SEC:
+        col.db.close()
+        col = None
+    if col is None:
+        col = Collector(SessionLocal(), http=_shared_jobs_http())
+        ctx.update(collector=col, created_at=time.monotonic(), tags_versao=data_versions("tags"))
+    elif ctx.get("tags_versao") != data_versions("tags"):
+        col._load_db_tags_as_keywords()
+        ctx["tags_versao"] = data_versions("tags")
+    return col
+
+def _job_auto_loja(ctx, produto_id: int):
+    col = _warm_collector(ctx)
+    db = col.db
     try:
         produto = db.get(Produto, produto_id)
         if not produto:
-            return jsonify({"status": "error", "message": "Produto não encontrado."}), 404
+            raise ValueError("Produto não encontrado.")
 
-        col = Collector(db)  # usa o mesmo BrowserManager/cookies
         loja, alt = col._resolve_store_by_alt_or_scrape(produto.url_base)
-        col.browser.close()
-
         if not loja:
-            return jsonify({"status": "error", "message": "Não foi possível identificar a loja pelo link do produto."}), 422
+            raise ValueError("Não foi possível identificar a loja pelo link do produto.")
 
         # grava alt no produto se ainda não tem
         if alt and not produto.product_id_loja_alt:
             produto.product_id_loja_alt = alt
-            db.commit()
-
-        data = {
-            "id": loja.id,
-            "nome_loja": loja.nome_loja,
-            "plataforma": loja.plataforma,
-            "id_loja_api": loja.id_loja_api,
-            "id_loja_api_alt": loja.id_loja_api_alt
+        bump_data_version(db, "lojas")
+        db.commit()
+        invalidate_data_versions()
+
+        return {
+            "message": "Loja resolvida/registrada com sucesso.",
+            "loja": {
+                "id": loja.id,
+                "nome_loja": loja.nome_loja,
+                "plataforma": loja.plataforma,
+                "id_loja_api": loja.id_loja_api,
+                "id_loja_api_alt": loja.id_loja_api_alt
+            }
         }
-        return jsonify({"status": "success", "message": "Loja resolvida/registrada com sucesso.", "loja": data}), 200
+    finally:
+        db.rollback()  # encerra a transação e expira o identity map para o próximo job
 
-    except Exception as e:
-        db.rollback()
-        return jsonify({"status": "error", "message": str(e)}), 500
+def _job_reprocessar_produto(ctx, produto_id: int):
+    col = _warm_collector(ctx)
+    db = col.db
+    try:
+        produto = db.get(Produto, produto_id)
+        if not produto:
+            raise ValueError("Produto não encontrado.")
+
+        # re-scrape do produto (uma única página: dados + loja)
+        pdata = col._scrape_product(produto.url_base)
+        # força os IDs do produto conhecidos (product_id_loja) dentro de pdata
+        pdata["product_id_loja"] = produto.product_id_loja
+        pdata["url_base"] = produto.url_base
+        if not pdata.get("nome_produto"):
+            pdata["nome_produto"] = produto.nome_produto
+
+        created = col._save_product_and_offer(pdata, store_info=pdata.pop("store_info"))
+        msg = "Produto reprocessado; oferta criada." if created else "Produto reprocessado; sem oferta elegível."
+        return {"message": msg, "oferta_criada": bool(created)}
     finally:
-        db.close()
+        db.rollback()
+
+def _enqueue_reprocess(produto_id: int) -> str:
+    from backend.utils.jobs import job_queue
+    return job_queue.submit("reprocessar_produto", _job_reprocessar_produto, produto_id,
+                            dedup_key=("reprocessar", produto_id))
+
+def _job_validar_oferta(ctx, oferta_id: int):
+    from backend.modules.validator import Validator
+    with SessionLocal() as db:
+        n = Validator(db).validar_ofertas([oferta_id])
+    if n:
+        invalidate_data_versions()
+    return {"message": "Oferta validada." if n else "Oferta não está mais pendente.", "validadas": n}
+
+def _job_publicar_oferta(ctx, oferta_id: int):
+    from backend.modules.publisher import Publisher
+    with SessionLocal() as db:
+        n = Publisher(db, http=_shared_jobs_http()).publicar_ofertas([oferta_id])
+    invalidate_data_versions()
+    return {"message": "Oferta publicada." if n else "Oferta não publicada (sem canal, já publicada ou em publicação).",
+            "publicadas": n}
+
+def _ao_criar_oferta(dados):
+    """Oferta nova neste processo (ex.: reprocessamento): valida já, sem esperar a varredura."""
+    from backend.utils.jobs import job_queue
+    job_queue.submit("validar_oferta", _job_validar_oferta, dados["oferta_id"],
+                     dedup_key=("validar", dados["oferta_id"]))
+
+def _ao_aprovar_oferta(dados):
+    """Oferta aprovada na fila: publica em background (desligável com PUBLICAR_AO_APROVAR=false)."""
+    if (get_config("PUBLICAR_AO_APROVAR", "true") or "true").lower() not in {"1", "true", "yes", "y"}:
+        return
+    from backend.utils.jobs import job_queue
+    job_queue.submit("publicar_oferta", _job_publicar_oferta, dados["oferta_id"],
+                     dedup_key=("publicar", dados["oferta_id"]))
+
+bus.subscribe(OFERTA_CRIADA, _ao_criar_oferta)
+bus.subscribe(OFERTA_APROVADA, _ao_aprovar_oferta)
+
+@api_bp.route("/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    from backend.utils.jobs import job_queue
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": "Job não encontrado."}), 404
+    return jsonify({"status": "success", "job": job}), 200
+
+@api_bp.route("/lojas/auto_from_produto/<int:produto_id>", methods=["POST"])
+def api_auto_create_loja_from_produto(produto_id):
+    """
+    Dado um produto (com url_base), resolve MLB-XXXX, tenta achar loja por id alternativo
+    e, se não existir, abre a página e cria a LojaConfiavel automaticamente.
+    Roda em background: responde 202 com job_id (acompanhar em /api/jobs/<job_id>).
+    """
+    from backend.utils.jobs import job_queue
+    with SessionLocal() as db:
+        if not db.get(Produto, produto_id):
+            return jsonify({"status": "error", "message": "Produto não encontrado."}), 404
+    job_id = job_queue.submit("auto_loja", _job_auto_loja, produto_id, dedup_key=("auto_loja", produto_id))
+    return jsonify({"status": "success", "message": "Resolução da loja enfileirada.", "job_id": job_id}), 202
 
 @api_bp.route("/tags", methods=["GET"])
 def api_list_tags():
-    db = SessionLocal()
-    try:
-        tags = db.query(Tag).order_by(Tag.nome_tag.asc()).all()
-        return jsonify({"status": "success", "tags": [t.nome_tag for t in tags]}), 200
-    finally:
-        db.close()
+    def _build():
+        with SessionLocal() as db:
+            nomes = [n for (n,) in db.query(Tag.nome_tag).order_by(Tag.nome_tag.asc()).all()]
+        return {"status": "success", "tags": nomes}
+    return cached_json(("tags",), "tags", _build)
 
 @api_bp.route("/produtos/<int:produto_id>/tags", methods=["POST"])
 def api_add_tags_to_product(produto_id):
@@ -545,8 +1144,9 @@ def api_add_tags_to_product(produto_id):
                 produto.tags.append(t)
         db.commit()
 
-        # reprocessa para verificar elegibilidade de oferta
-        return _api_reprocess_single_product(produto_id)
+        # reprocessa (em background) para verificar elegibilidade de oferta
+        job_id = _enqueue_reprocess(produto_id)
+        return jsonify({"status": "success", "message": "Tags associadas; reprocessamento enfileirado.", "job_id": job_id}), 202
 
     except Exception as e:
         db.rollback()
@@ -554,46 +1154,14 @@ def api_add_tags_to_product(produto_id):
     finally:
         db.close()
 
-# helper reaproveitável
-def _api_reprocess_single_product(produto_id: int):
-    from backend.modules.collector import Collector
-    db2 = SessionLocal()
-    try:
-        produto2 = db2.get(Produto, produto_id)
-        if not produto2:
-            return jsonify({"status": "error", "message": "Produto não encontrado."}), 404
-
-        col = Collector(db2)
-
-        # tenta resolver a loja via MLB do link ou fallback (método que você já tem)
-        loja, _ = None, None
-        # se você já tiver _resolve_store_by_alt_or_scrape no Collector, use:
-        try:
-            loja, _ = col._resolve_store_by_alt_or_scrape(produto2.url_base)  # usa sua lógica de MLB/seller
-        except Exception:
-            loja = None
-
-        # re-scrape do produto para obter preço/descrição atualizados
-        pdata = col._scrape_mercadolivre_product(produto2.url_base)
-        # força os IDs do produto conhecidos (product_id_loja) dentro de pdata
-        pdata['product_id_loja'] = produto2.product_id_loja
-        pdata['url_base'] = produto2.url_base
-
-        created = col._save_product_and_offer(pdata, loja)
-        col.browser.close()
-
-        msg = "Produto reprocessado; oferta criada." if created else "Produto reprocessado; sem oferta elegível."
-        return jsonify({"status": "success", "message": msg}), 200
-
-    except Exception as e:
-        db2.rollback()
-        return jsonify({"status": "error", "message": str(e)}), 500
-    finally:
-        db2.close()
-
 @api_bp.route("/produtos/<int:produto_id>/reprocessar", methods=["POST"])
 def api_reprocess_product(produto_id):
-    return _api_reprocess_single_product(produto_id)
+    """Enfileira o re-scrape do produto; responde 202 com job_id (acompanhar em /api/jobs/<job_id>)."""
+    with SessionLocal() as db:
+        if not db.get(Produto, produto_id):
+            return jsonify({"status": "error", "message": "Produto não encontrado."}), 404
+    job_id = _enqueue_reprocess(produto_id)
+    return jsonify({"status": "success", "message": "Reprocessamento enfileirado.", "job_id": job_id}), 202
 
 @api_bp.route("/lojas/ativar_by_produto/<int:produto_id>", methods=["POST"])
 def api_ativar_loja_por_produto(produto_id: int):
@@ -631,7 +1199,9 @@ def api_ativar_loja_por_produto(produto_id: int):
         if hasattr(loja, "lojaconfiavel") and loja.lojaconfiavel is False:
             loja.lojaconfiavel = True
 
+        bump_data_version(db, "lojas")
         db.commit()
+        invalidate_data_versions()
         return jsonify({
             "status": "success",
             "message": "Loja ativada com sucesso.",
@@ -647,4 +1217,36 @@ def api_ativar_loja_por_produto(produto_id: int):
         db.rollback()
         return jsonify({"status": "error", "message": str(e)}), 500
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+# ---------------------------
+# Exportação (streaming)
+# ---------------------------
+@api_bp.route("/export/<dataset>", methods=["GET"])
+def api_export(dataset):
+    """
+    Exporta historico | ofertas | metricas em streaming (memória constante).
+    query: formato=csv|ndjson, desde, ate (YYYY-MM-DD ou ISO), loja_id, tag
+    """
+    from flask import Response, stream_with_context
+    from backend.utils.export import DATASETS, FORMATOS, build_query, iter_export, lotes_arquivados, parse_data
+
+    formato = (request.args.get("formato") or "csv").lower()
+    if dataset not in DATASETS:
+        return jsonify({"status": "error", "message": f"Dataset inválido (use {', '.join(DATASETS)})."}), 404
+    if formato not in FORMATOS:
+        return jsonify({"status": "error", "message": "Formato inválido (use csv ou ndjson)."}), 400
+    try:
+        desde = parse_data(request.args.get("desde"))
+        ate = parse_data(request.args.get("ate"), fim_do_dia=True)
+        loja_id = int(request.args["loja_id"]) if request.args.get("loja_id") else None
+    except ValueError:
+        return jsonify({"status": "error", "message": "Parâmetros de data/loja inválidos."}), 400
+
+    stmt = build_query(dataset, desde, ate, loja_id, request.args.get("tag"))
+    arquivados = lotes_arquivados(dataset, desde, ate, loja_id, request.args.get("tag"))
+    nome = f"{dataset}_{datetime.now():%Y%m%d_%H%M%S}.{formato}"
+    return Response(
+        stream_with_context(iter_export(stmt, formato, arquivados=arquivados)),
+        mimetype=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
@@ -0,0 +1,90 @@
+# backend/utils/bus.py
+"""
+Barramento de eventos em processo entre os estágios do pipeline.
+
+- publish(tipo, **dados): entrega a cada assinante (handler síncrono ou fila).
+- subscribe(tipo, handler): handler(dados) roda na thread de quem publicou; erros são logados.
+- queue(tipo): fila (queue.Queue) para um consumidor em thread própria (ex.: validação no daemon).
+- unsubscribe(tipo, handler_ou_fila): quem assina por uma execução só (ex.: RunPipeline.run) cancela ao fim.
+
+Eventos:
+- OFERTA_CRIADA   {"oferta_id"}  — Collector, após o commit da oferta
+- OFERTA_APROVADA {"oferta_id"}  — API (aprovar/lote), após o commit
+
+Os eventos vivem só no processo que os publicou; o que atravessa processos continua
+sendo o banco (status das ofertas, fila_eventos).
+"""
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+OFERTA_CRIADA = "oferta_criada"
+OFERTA_APROVADA = "oferta_aprovada"
+
+logger = logging.getLogger("curadoria.bus")
+
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = defaultdict(list)
+        self._filas = defaultdict(list)
+
+    def subscribe(self, tipo: str, handler) -> None:
+        with self._lock:
+            self._handlers[tipo].append(handler)
+
+    def unsubscribe(self, tipo: str, handler) -> None:
+        """Cancela um handler ou uma fila criada por queue()."""
+        with self._lock:
+            for assinantes in (self._handlers[tipo], self._filas[tipo]):
+                if handler in assinantes:
+                    assinantes.remove(handler)
+
+    def queue(self, tipo: str, maxsize: int = 0) -> "queue.Queue":
+        """Cria (e assina) uma fila que recebe os dados de cada evento `tipo`."""
+        q: "queue.Queue" = queue.Queue(maxsize)
+        with self._lock:
+            self._filas[tipo].append(q)
+        return q
+
+    def publish(self, tipo: str, **dados) -> None:
+        with self._lock:
+            handlers = list(self._handlers[tipo])
+            filas = list(self._filas[tipo])
+        for q in filas:
+            try:
+                q.put_nowait(dados)
+            except queue.Full:
+                # consumidor atrasado: a varredura periódica do estágio cobre o que ficar de fora
+                logger.warning(f"Fila do evento {tipo} cheia; evento descartado: {dados}")
+        for h in handlers:
+            try:
+                h(dados)
+            except Exception as e:
+                logger.exception(f"Erro no assinante de {tipo}: {e}")
+
+
+def drain(q: "queue.Queue", timeout: float, limite: int = 500, janela: float = 0.0) -> list:
+    """
+    Espera até `timeout` pelo primeiro item e devolve o que chegar até `janela` segundos
+    depois dele (0 = só o que já está na fila), no máximo `limite` itens.
+    """
+    try:
+        itens = [q.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    fim = time.monotonic() + janela
+    while len(itens) < limite:
+        resta = fim - time.monotonic()
+        try:
+            itens.append(q.get(timeout=resta) if resta > 0 else q.get_nowait())
+        except queue.Empty:
+            break
+    return itens
+
+
+# Barramento único do processo
+bus = EventBus()
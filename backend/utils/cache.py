@@ -0,0 +1,94 @@
+# backend/utils/cache.py
+"""
+Cache versionado de respostas de leitura do painel.
+
+Cada conjunto de dados ("tags", "canais", "lojas", "historico") tem um contador em versoes_dados,
+incrementado por quem escreve (endpoints, arquivamento) na mesma transação da alteração.
+As respostas são memorizadas por (chave da consulta, versões) e servidas com ETag;
+se o navegador mandar If-None-Match com a ETag atual, responde 304 sem tocar no banco.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+from sqlalchemy import text
+
+from backend.db.database import SessionLocal
+from backend.models.models import VersaoDados
+
+# Intervalo máximo para perceber alterações feitas por OUTRO processo
+DATA_VERSION_CHECK_SEC = float(os.getenv("DATA_VERSION_CHECK_SEC", "2"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+
+_lock = threading.Lock()
+_versoes: dict[str, int] = {}
+_checked_at = 0.0
+_respostas: "OrderedDict[tuple, tuple[str, dict]]" = OrderedDict()
+
+
+def bump_data_version(db, *chaves: str) -> None:
+    """
+    Incrementa as versões dentro da sessão (ou conexão) recebida; commit e
+    invalidate_data_versions ficam com o chamador.
+    """
+    for chave in chaves:
+        db.execute(text("INSERT INTO versoes_dados (chave, versao) VALUES (:chave, 1) "
+                        "ON CONFLICT(chave) DO UPDATE SET versao = versao + 1"), {"chave": chave})
+
+
+def invalidate_data_versions() -> None:
+    """Força a próxima leitura a conferir as versões no banco."""
+    global _checked_at
+    _checked_at = 0.0
+
+
+def data_versions(*chaves: str) -> tuple:
+    """Versões atuais (conferidas no banco no máximo a cada DATA_VERSION_CHECK_SEC)."""
+    global _versoes, _checked_at
+    if time.monotonic() - _checked_at >= DATA_VERSION_CHECK_SEC:
+        with _lock:
+            if time.monotonic() - _checked_at >= DATA_VERSION_CHECK_SEC:
+                try:
+                    with SessionLocal() as db:
+                        _versoes = {c: v for c, v in db.query(VersaoDados.chave, VersaoDados.versao).all()}
+                    _checked_at = time.monotonic()
+                except Exception:
+                    # tabela ainda não criada: sem cache confiável, força recálculo
+                    return (time.monotonic(),)
+    return tuple(_versoes.get(c, 0) for c in chaves)
+
+
+def cached_json(deps: tuple, cache_key: str, builder):
+    """
+    Resposta JSON memorizada por (cache_key, versões de deps), com ETag/If-None-Match.
+    builder() só é chamado quando não há entrada válida; deve devolver um dict serializável.
+    """
+    versoes = data_versions(*deps)
+    key = (cache_key, deps, versoes)
+    with _lock:
+        hit = _respostas.get(key)
+        if hit:
+            _respostas.move_to_end(key)
+
+    if hit:
+        etag, payload = hit
+    else:
+        payload = builder()
+        etag = hashlib.sha1(json.dumps([cache_key, versoes], default=str).encode("utf-8")).hexdigest()[:16]
+        with _lock:
+            _respostas[key] = (etag, payload)
+            while len(_respostas) > RESPONSE_CACHE_SIZE:
+                _respostas.popitem(last=False)
+
+    if request.if_none_match.contains_weak(etag):
+        resp = current_app.response_class(status=304)
+    else:
+        resp = jsonify(payload)
+    resp.set_etag(etag)
+    # o navegador guarda a resposta, mas revalida sempre (-> 304 barato)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
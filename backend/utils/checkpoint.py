@@ -0,0 +1,118 @@
+# backend/utils/checkpoint.py
+"""
+Checkpoint da execução do pipeline em pipeline_checkpoints, para uma execução interrompida
+(queda, kill, deploy) continuar de onde parou em vez de recomeçar da página 1.
+
+Guarda: estágios concluídos, última página de listagem baixada, itens já extraídos dessas páginas
+(uma linha por página em pipeline_checkpoint_paginas; a retomada não baixa de novo) e o índice do
+último item processado. O índice é gravado a cada PIPELINE_CHECKPOINT_ITENS itens: numa retomada
+os poucos itens depois do último índice salvo são gravados de novo (a gravação é idempotente).
+
+Na coleta, cada fonte tem um checkpoint filho (filho("mercadolivre") -> linha "nome:mercadolivre")
+com a sua página/itens, já que as fontes avançam em paralelo.
+
+Cada gravação usa sessão própria: o progresso fica salvo mesmo se a sessão do estágio fizer rollback.
+Checkpoint mais velho que PIPELINE_CHECKPOINT_MAX_HORAS é descartado (ofertas já desatualizadas).
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+
+from backend.db.database import SessionLocal
+from backend.models.models import PipelineCheckpoint, PipelineCheckpointPagina
+from backend.utils.config import get_config
+
+logger = logging.getLogger("curadoria.checkpoint")
+
+
+class Checkpoint:
+    def __init__(self, nome: str, max_idade_horas: float = None, novo: bool = False):
+        self.nome = nome
+        self.max_idade = timedelta(hours=float(max_idade_horas if max_idade_horas is not None
+                                               else get_config("PIPELINE_CHECKPOINT_MAX_HORAS", "6")))
+        self.lote_itens = max(1, int(get_config("PIPELINE_CHECKPOINT_ITENS", "25")))
+        self.retomando = False
+        self.estagios: list[str] = []
+        self.pagina = 0
+        self.item = -1
+        self.ofertas: list[dict] = []
+        self._item_salvo = -1
+        self._filhos: list["Checkpoint"] = []
+        self._carregar(novo)
+
+    def _carregar(self, novo: bool):
+        agora = datetime.now()
+        with SessionLocal() as db:
+            row = db.get(PipelineCheckpoint, self.nome)
+            if not novo and row is not None and not row.concluido and row.atualizado_em >= agora - self.max_idade:
+                self.retomando = True
+                self.estagios = json.loads(row.estagios or "[]")
+                self.pagina = row.pagina
+                self.item = self._item_salvo = row.item
+                paginas = db.query(PipelineCheckpointPagina.ofertas).filter(
+                    PipelineCheckpointPagina.nome == self.nome).order_by(PipelineCheckpointPagina.pagina).all()
+                if paginas:
+                    for (ofertas,) in paginas:
+                        self.ofertas.extend(json.loads(ofertas))
+                else:   # checkpoint gravado antes das linhas por página
+                    self.ofertas = json.loads(row.ofertas or "[]")
+                logger.info(f"Retomando '{self.nome}' de {row.iniciado_em:%Y-%m-%d %H:%M}: estágios {self.estagios}, "
+                            f"página {self.pagina}, item {self.item + 1}/{len(self.ofertas)}")
+                return
+            if row is None:
+                row = PipelineCheckpoint(nome=self.nome)
+                db.add(row)
+            row.iniciado_em = row.atualizado_em = agora
+            row.estagios, row.pagina, row.item, row.ofertas, row.concluido = "[]", 0, -1, "[]", False
+            db.query(PipelineCheckpointPagina).filter(PipelineCheckpointPagina.nome == self.nome).delete()
+            db.commit()
+
+    def _salvar(self, pagina_nova: PipelineCheckpointPagina = None, **campos):
+        with SessionLocal() as db:
+            if pagina_nova is not None:
+                db.merge(pagina_nova)
+            row = db.get(PipelineCheckpoint, self.nome)
+            for k, v in campos.items():
+                setattr(row, k, v)
+            row.atualizado_em = datetime.now()
+            db.commit()
+
+    # ---------- estágios ----------
+    def feito(self, estagio: str) -> bool:
+        return estagio in self.estagios
+
+    def estagio_ok(self, estagio: str):
+        if estagio not in self.estagios:
+            self.estagios.append(estagio)
+            self._salvar(estagios=json.dumps(self.estagios))
+
+    # ---------- coleta ----------
+    def pagina_ok(self, pagina: int, ofertas: list):
+        """Página baixada e extraída: grava só os itens dela para a retomada não baixar de novo."""
+        self.pagina = pagina
+        self.ofertas.extend(ofertas)
+        linha = PipelineCheckpointPagina(nome=self.nome, pagina=pagina,
+                                         ofertas=json.dumps(ofertas, ensure_ascii=False, default=str))
+        self._salvar(pagina_nova=linha, pagina=pagina)
+
+    def item_ok(self, indice: int):
+        """Item processado; o índice vai para o banco a cada `lote_itens` itens."""
+        self.item = indice
+        if indice - self._item_salvo >= self.lote_itens:
+            self._item_salvo = indice
+            self._salvar(item=indice)
+
+    def filho(self, sufixo: str) -> "Checkpoint":
+        """Checkpoint de uma parte (ex.: fonte da coleta); só retoma se o pai estiver retomando."""
+        cp = Checkpoint(f"{self.nome}:{sufixo}", self.max_idade.total_seconds() / 3600, novo=not self.retomando)
+        self._filhos.append(cp)
+        return cp
+
+    def concluir(self):
+        """Execução terminou: a próxima começa do zero (e os itens das páginas não ficam ocupando espaço)."""
+        for cp in self._filhos:
+            cp.concluir()
+        with SessionLocal() as db:
+            db.query(PipelineCheckpointPagina).filter(PipelineCheckpointPagina.nome == self.nome).delete()
+            db.commit()
+        self._salvar(concluido=True, ofertas="[]")
@@ -1,14 +1,69 @@
 # backend/utils/config.py
 import os
+import threading
+import time
 from datetime import datetime
+from sqlalchemy import text
 from backend.db.database import SessionLocal
-from backend.models.models import ConfigVar
+from backend.models.models import ConfigVar, ConfigVersao
+
+# Cache em processo de TODA a tabela config_vars (1 query por recarga).
+# A validade é conferida contra config_versao no máximo a cada CONFIG_CACHE_CHECK_SEC;
+# set_config e os endpoints /api/env incrementam a versão na mesma transação da alteração.
+CONFIG_CACHE_CHECK_SEC = float(os.getenv("CONFIG_CACHE_CHECK_SEC", "5"))
+
+_lock = threading.Lock()
+_cache: dict[str, str | None] = {}
+_cache_versao: int | None = None
+_checked_at = 0.0
+
+
+def _read_versao(db) -> int:
+    try:
+        row = db.get(ConfigVersao, 1)
+        return row.versao if row else 0
+    except Exception:
+        # tabela ainda não criada (create_db_tables não rodou): recarrega a cada checagem
+        db.rollback()
+        return -1
+
+
+def bump_config_version(db) -> None:
+    """
+    Incrementa a versão dentro da sessão recebida (commit e invalidate_config_cache ficam com o chamador).
+    Upsert atômico no banco: gravações concorrentes não perdem incremento nem colidem no id=1.
+    """
+    db.execute(text("INSERT INTO config_versao (id, versao) VALUES (1, 1) "
+                    "ON CONFLICT(id) DO UPDATE SET versao = versao + 1"))
+
+
+def invalidate_config_cache() -> None:
+    """Força a próxima leitura a conferir a versão no banco."""
+    global _checked_at
+    _checked_at = 0.0
+
+
+def _ensure_loaded() -> None:
+    global _cache, _cache_versao, _checked_at
+    now = time.monotonic()
+    if _cache_versao is not None and now - _checked_at < CONFIG_CACHE_CHECK_SEC:
+        return
+    with _lock:
+        if _cache_versao is not None and time.monotonic() - _checked_at < CONFIG_CACHE_CHECK_SEC:
+            return
+        with SessionLocal() as db:
+            versao = _read_versao(db)
+            if versao != _cache_versao or versao < 0:
+                _cache = {k: v for k, v in db.query(ConfigVar.key, ConfigVar.value).all()}
+                _cache_versao = versao
+        _checked_at = time.monotonic()
+
 
 def get_config(key: str, default: str | None = None) -> str | None:
-    with SessionLocal() as db:
-        row = db.query(ConfigVar).filter(ConfigVar.key == key).first()
-        if row and row.value is not None:
-            return row.value
+    _ensure_loaded()
+    value = _cache.get(key)
+    if value is not None:
+        return value
     return os.getenv(key, default)
 
 def set_config(key: str, value: str | None, is_secret: bool = True, description: str | None = None):
@@ -22,8 +77,10 @@ def set_config(key: str, value: str | None, is_secret: bool = True, description:
         if description is not None:
             row.description = description
         row.updated_at = datetime.now()
+        bump_config_version(db)
         db.commit()
         db.refresh(row)
+        invalidate_config_cache()
         return row
 
 def list_configs():
@@ -0,0 +1,182 @@
+# backend/utils/export.py
+"""
+Exportação em streaming de histórico de preços, ofertas e métricas (CSV ou NDJSON).
+
+As linhas saem do banco em lotes (yield_per / cursor do driver) e são escritas em blocos,
+então a memória fica constante mesmo com dezenas de milhões de linhas. No histórico, as linhas
+da camada fria (utils/historico_arquivo.py) saem antes das da tabela, também em lotes.
+Usado por /api/export/<dataset> e pela linha de comando:
+
+    python -m backend.utils.export historico --formato csv --desde 2024-01-01 --loja-id 3 --tag fone -o hist.csv
+"""
+import argparse
+import csv
+import io
+import itertools
+import json
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from backend.db.database import engine
+from backend.models.models import (
+    HistoricoPreco, LojaConfiavel, MetricaSnapshot, Oferta, Produto, Tag, produto_tags,
+)
+from backend.utils import historico_arquivo
+
+EXPORT_YIELD_PER = 5000
+FORMATOS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _datasets():
+    """dataset -> (select com as colunas exportadas, coluna de data, coluna de loja, coluna de produto)."""
+    historico = (
+        select(HistoricoPreco.id, HistoricoPreco.produto_id, Produto.nome_produto,
+               HistoricoPreco.loja_id, LojaConfiavel.nome_loja,
+               HistoricoPreco.preco, HistoricoPreco.data_verificacao)
+        .join(Produto, Produto.id == HistoricoPreco.produto_id)
+        .join(LojaConfiavel, LojaConfiavel.id == HistoricoPreco.loja_id)
+        .order_by(HistoricoPreco.id)
+    )
+    ofertas = (
+        select(Oferta.id, Oferta.produto_id, Produto.nome_produto, Oferta.loja_id, LojaConfiavel.nome_loja,
+               Oferta.status, Oferta.preco_original, Oferta.preco_oferta, Oferta.desconto_real,
+               Oferta.data_encontrado, Oferta.data_publicacao, Oferta.url_afiliado_curta)
+        .join(Produto, Produto.id == Oferta.produto_id)
+        .join(LojaConfiavel, LojaConfiavel.id == Oferta.loja_id)
+        .order_by(Oferta.id)
+    )
+    metricas = (
+        select(MetricaSnapshot.id, MetricaSnapshot.oferta_id, Oferta.produto_id, Produto.nome_produto,
+               Oferta.loja_id, MetricaSnapshot.cliques, MetricaSnapshot.vendas, MetricaSnapshot.data_coleta)
+        .join(Oferta, Oferta.id == MetricaSnapshot.oferta_id)
+        .join(Produto, Produto.id == Oferta.produto_id)
+        .order_by(MetricaSnapshot.id)
+    )
+    return {
+        "historico": (historico, HistoricoPreco.data_verificacao, HistoricoPreco.loja_id, HistoricoPreco.produto_id),
+        "ofertas": (ofertas, Oferta.data_encontrado, Oferta.loja_id, Oferta.produto_id),
+        "metricas": (metricas, MetricaSnapshot.data_coleta, Oferta.loja_id, Oferta.produto_id),
+    }
+
+
+DATASETS = ("historico", "ofertas", "metricas")
+
+
+def parse_data(valor, fim_do_dia: bool = False):
+    """'YYYY-MM-DD' ou ISO completo -> datetime; só a data em `ate` inclui o dia inteiro."""
+    if not valor:
+        return None
+    dt = datetime.fromisoformat(valor)
+    if fim_do_dia and len(valor) <= 10:
+        dt += timedelta(days=1)
+    return dt
+
+
+def build_query(dataset: str, desde=None, ate=None, loja_id=None, tag=None):
+    """Monta o SELECT filtrado. Levanta KeyError para dataset desconhecido."""
+    stmt, col_data, col_loja, col_produto = _datasets()[dataset]
+    if desde:
+        stmt = stmt.where(col_data >= desde)
+    if ate:
+        stmt = stmt.where(col_data < ate)
+    if loja_id:
+        stmt = stmt.where(col_loja == loja_id)
+    if tag:
+        stmt = stmt.where(col_produto.in_(_tag_produto_ids(tag)))
+    return stmt
+
+
+def _tag_produto_ids(tag: str):
+    return (
+        select(produto_tags.c.produto_id)
+        .join(Tag, Tag.id == produto_tags.c.tag_id)
+        .where(Tag.nome_tag == tag.replace("#", "").strip().lower())
+    )
+
+
+def _nomes(conn, col_id, col_nome, ids) -> dict:
+    ids, nomes = list(ids), {}
+    for i in range(0, len(ids), 500):   # limite de parâmetros do SQLite
+        nomes.update(conn.execute(select(col_id, col_nome).where(col_id.in_(ids[i:i + 500]))).all())
+    return nomes
+
+
+def lotes_arquivados(dataset: str, desde=None, ate=None, loja_id=None, tag=None):
+    """Lotes da camada fria no formato do SELECT do dataset (só "historico"; produto/loja apagados ficam de fora)."""
+    if dataset != "historico":
+        return
+    with engine.connect() as conn:
+        produto_ids = set(conn.execute(_tag_produto_ids(tag)).scalars()) if tag else None
+        if produto_ids is not None and not produto_ids:
+            return
+        for lote in historico_arquivo.ler_lotes(produto_ids=produto_ids, loja_id=loja_id, desde=desde, ate=ate):
+            produtos = _nomes(conn, Produto.id, Produto.nome_produto, {r[1] for r in lote})
+            lojas = _nomes(conn, LojaConfiavel.id, LojaConfiavel.nome_loja, {r[2] for r in lote})
+            yield [(id_, pid, produtos[pid], lid, lojas[lid], preco, data)
+                   for id_, pid, lid, preco, data in lote if pid in produtos and lid in lojas]
+
+
+def _valor(v):
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+def iter_export(stmt, formato: str = "csv", yield_per: int = EXPORT_YIELD_PER, arquivados=()):
+    """
+    Gera o arquivo em blocos de texto (um bloco por lote do cursor).
+    `arquivados`: lotes extras com as mesmas colunas (lotes_arquivados), escritos antes das linhas do banco.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"formato inválido: {formato}")
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=yield_per).execute(stmt)
+        colunas = list(result.keys())
+        lotes = itertools.chain(arquivados, result.partitions())
+        if formato == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(colunas)
+            for lote in lotes:
+                writer.writerows([[_valor(v) for v in row] for row in lote])
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            yield buf.getvalue()
+        else:
+            for lote in lotes:
+                yield "".join(
+                    json.dumps({c: _valor(v) for c, v in zip(colunas, row)}, ensure_ascii=False) + "\n"
+                    for row in lote
+                )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta histórico de preços, ofertas ou métricas.")
+    parser.add_argument("dataset", choices=DATASETS)
+    parser.add_argument("--formato", choices=sorted(FORMATOS), default="csv")
+    parser.add_argument("--desde", help="data inicial (YYYY-MM-DD ou ISO)")
+    parser.add_argument("--ate", help="data final, inclusiva se só a data (YYYY-MM-DD ou ISO)")
+    parser.add_argument("--loja-id", type=int)
+    parser.add_argument("--tag")
+    parser.add_argument("-o", "--saida", help="arquivo de saída (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        desde, ate = parse_data(args.desde), parse_data(args.ate, fim_do_dia=True)
+    except ValueError as e:
+        parser.error(f"data inválida: {e}")
+
+    stmt = build_query(args.dataset, desde, ate, args.loja_id, args.tag)
+    arquivados = lotes_arquivados(args.dataset, desde, ate, args.loja_id, args.tag)
+    out = open(args.saida, "w", encoding="utf-8", newline="") if args.saida else sys.stdout
+    try:
+        for bloco in iter_export(stmt, args.formato, arquivados=arquivados):
+            out.write(bloco)
+    finally:
+        if args.saida:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
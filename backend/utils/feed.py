@@ -0,0 +1,157 @@
+# backend/utils/feed.py
+"""
+Feed de mudanças da fila de aprovação para o painel (SSE / long-poll em /api/fila/eventos).
+
+Uma única thread por processo web lê fila_eventos (gravada pelo pipeline e pela API, ver
+backend/db/fila_eventos.py) a cada FEED_POLL_SEC, monta os deltas UMA vez (com o card já
+serializado) e acorda todos os curadores conectados. Assim N abas abertas custam uma query
+por intervalo, não N recargas da fila inteira.
+
+- Os deltas recentes ficam num buffer em memória (FEED_BUFFER); quem ficou para trás além
+  do buffer recebe "resync" e recarrega a primeira página.
+- A thread só consulta o banco enquanto houver alguém ouvindo (FEED_IDLE_SEC).
+- A retenção (FEED_RETENTION_HOURS) roda no pipeline/daemon; a thread também limpa, de brinde,
+  enquanto há alguém ouvindo.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
+
+from backend.db.database import SessionLocal
+from backend.db.fila_eventos import limpar_eventos
+from backend.models.models import FilaEvento, Oferta, Produto
+from backend.utils.fila import count_fila, serialize_oferta
+
+FEED_POLL_SEC = float(os.getenv("FEED_POLL_SEC", "1"))
+FEED_BUFFER = int(os.getenv("FEED_BUFFER", "2000"))
+FEED_BATCH = int(os.getenv("FEED_BATCH", "500"))
+FEED_IDLE_SEC = float(os.getenv("FEED_IDLE_SEC", "60"))
+FEED_RETENTION_HOURS = float(os.getenv("FEED_RETENTION_HOURS", "24"))
+FEED_KEEPALIVE_SEC = float(os.getenv("FEED_KEEPALIVE_SEC", "15"))
+FEED_STREAM_MAX_SEC = float(os.getenv("FEED_STREAM_MAX_SEC", "300"))
+
+
+class ChangeFeed:
+    def __init__(self, poll_sec: float = FEED_POLL_SEC, buffer: int = FEED_BUFFER):
+        self.poll_sec = poll_sec
+        self._cond = threading.Condition()
+        self._buf: deque = deque(maxlen=max(1, buffer))
+        self._base = 0        # todo evento com seq > _base está no buffer
+        self._seq = None      # último id de fila_eventos já lido
+        self._total = None    # tamanho da fila no último lote
+        self._thread = None
+        self._last_listen = 0.0
+        self._pruned_at = 0.0
+
+    # ---------- leitura do banco (thread única) ----------
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is not None:
+                return
+            with SessionLocal() as db:
+                self._seq = db.query(func.max(FilaEvento.id)).scalar() or 0
+                self._total = count_fila(db)
+            self._base = self._seq
+            self._thread = threading.Thread(target=self._loop, name="fila-feed", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            if time.monotonic() - self._last_listen > FEED_IDLE_SEC:
+                time.sleep(self.poll_sec)
+                continue
+            try:
+                mais = self._poll_once()
+            except Exception as e:
+                print(f"[feed] erro lendo fila_eventos: {e}")
+                mais = False
+            if not mais:
+                time.sleep(self.poll_sec)
+
+    def _poll_once(self) -> bool:
+        """Lê um lote de eventos novos; True se pode haver mais à espera."""
+        with SessionLocal() as db:
+            rows = (
+                db.query(FilaEvento.id, FilaEvento.oferta_id, FilaEvento.tipo)
+                  .filter(FilaEvento.id > self._seq)
+                  .order_by(FilaEvento.id)
+                  .limit(FEED_BATCH)
+                  .all()
+            )
+            if not rows:
+                self._prune()
+                return False
+
+            # estado ATUAL das ofertas citadas (eventos antigos do lote já saem corretos)
+            ids = {oid for _, oid, tipo in rows if tipo != "removido"}
+            cards = {}
+            if ids:
+                ofertas = (
+                    db.query(Oferta)
+                      .options(joinedload(Oferta.produto).selectinload(Produto.tags), joinedload(Oferta.loja))
+                      .filter(Oferta.id.in_(ids), Oferta.status == "PENDENTE_APROVACAO")
+                      .all()
+                )
+                cards = {of.id: serialize_oferta(of) for of in ofertas}
+            total = count_fila(db)
+
+        deltas = []
+        for seq, oid, tipo in rows:
+            card = cards.get(oid)
+            if tipo != "removido" and card is None:
+                tipo = "removido"   # já saiu da fila depois do evento
+            deltas.append({"seq": seq, "tipo": tipo, "id": oid, "oferta": card if tipo != "removido" else None})
+
+        with self._cond:
+            for d in deltas:
+                if len(self._buf) == self._buf.maxlen:
+                    self._base = self._buf[0]["seq"]
+                self._buf.append(d)
+            self._seq = rows[-1][0]
+            self._total = total
+            self._cond.notify_all()
+        return len(rows) == FEED_BATCH
+
+    def _prune(self):
+        """Apaga eventos mais velhos que FEED_RETENTION_HOURS (no máximo 1x por hora)."""
+        if time.monotonic() - self._pruned_at < 3600:
+            return
+        self._pruned_at = time.monotonic()
+        limpar_eventos(FEED_RETENTION_HOURS)
+
+    # ---------- lado dos clientes ----------
+    def current_seq(self) -> int:
+        """Cursor a embutir na página renderizada (pegar ANTES de montar a primeira página)."""
+        self._ensure_started()
+        return self._seq
+
+    def wait(self, since, timeout: float):
+        """
+        Espera até `timeout` por deltas com seq > since.
+        Retorna (deltas, seq, total); deltas=None pede resync (cursor anterior ao buffer).
+        """
+        self._last_listen = time.monotonic()
+        self._ensure_started()
+        fim = time.monotonic() + timeout
+        with self._cond:
+            if since is None or since > self._seq:
+                since = self._seq
+            while True:
+                if since < self._base:
+                    return None, self._seq, self._total
+                novos = [d for d in self._buf if d["seq"] > since]
+                restante = fim - time.monotonic()
+                if novos or restante <= 0:
+                    return novos, self._seq, self._total
+                self._cond.wait(restante)
+                self._last_listen = time.monotonic()
+
+
+# Feed único do processo web
+change_feed = ChangeFeed()
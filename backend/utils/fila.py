@@ -0,0 +1,136 @@
+# backend/utils/fila.py
+"""
+Fila de aprovação paginada por keyset (data_encontrado DESC, id DESC).
+Usada tanto pela página /dashboard (primeira página) quanto por /api/fila (scroll incremental),
+para que o custo de cada página dependa só do tamanho da página, não da fila inteira.
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import joinedload, selectinload
+
+from backend.models.models import Oferta, Produto, Tag
+from backend.db.fts import fts_ids_select
+
+PAGE_SIZE_DEFAULT = 50
+PAGE_SIZE_MAX = 200
+CONTAGEM_MAX = 1000   # acima disso o contador da fila mostra "1000+"
+
+
+def encode_cursor(oferta: Oferta) -> str:
+    return f"{oferta.data_encontrado.isoformat()}|{oferta.id}"
+
+
+def decode_cursor(cursor: Optional[str]):
+    """'<iso>|<id>' -> (datetime, id). Cursor inválido é tratado como início da fila."""
+    if not cursor:
+        return None
+    try:
+        iso, oid = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(iso), int(oid)
+    except ValueError:
+        return None
+
+
+def parse_filtros(args) -> dict:
+    """Extrai os filtros aceitos de request.args (valores vazios são ignorados)."""
+    filtros = {}
+    tag = (args.get("tag") or "").replace("#", "").strip().lower()
+    if tag:
+        filtros["tag"] = tag
+    try:
+        if args.get("loja_id"):
+            filtros["loja_id"] = int(args.get("loja_id"))
+    except ValueError:
+        pass
+    try:
+        if args.get("min_desconto"):
+            filtros["min_desconto"] = float(args.get("min_desconto"))
+    except ValueError:
+        pass
+    q = (args.get("q") or "").strip()
+    if q:
+        filtros["q"] = q
+    return filtros
+
+
+def page_size(args) -> int:
+    try:
+        n = int(args.get("limit") or PAGE_SIZE_DEFAULT)
+    except ValueError:
+        n = PAGE_SIZE_DEFAULT
+    return max(1, min(n, PAGE_SIZE_MAX))
+
+
+def query_fila(db, filtros: dict, cursor: Optional[str] = None, limit: int = PAGE_SIZE_DEFAULT):
+    """
+    Retorna (ofertas, next_cursor). Busca limit+1 linhas para saber se há próxima página.
+    """
+    q = (
+        db.query(Oferta)
+          .join(Oferta.produto)
+          .options(
+              joinedload(Oferta.produto).selectinload(Produto.tags),
+              joinedload(Oferta.loja),
+          )
+          .filter(Oferta.status == "PENDENTE_APROVACAO")
+    )
+
+    if filtros.get("loja_id"):
+        q = q.filter(Oferta.loja_id == filtros["loja_id"])
+    if filtros.get("min_desconto") is not None:
+        q = q.filter(Oferta.desconto_real >= filtros["min_desconto"])
+    if filtros.get("tag"):
+        # só tags associadas ao produto: LIKE '%tag%' no nome varria a fila inteira
+        q = q.filter(Produto.tags.any(Tag.nome_tag == filtros["tag"]))
+    if filtros.get("q"):
+        # busca pelo índice FTS (produtos_fts) em vez de LIKE '%x%'
+        busca = fts_ids_select(filtros["q"])
+        if busca is not None:
+            q = q.filter(Produto.id.in_(busca))
+
+    after = decode_cursor(cursor)
+    if after:
+        dt, oid = after
+        q = q.filter(or_(
+            Oferta.data_encontrado < dt,
+            and_(Oferta.data_encontrado == dt, Oferta.id < oid),
+        ))
+
+    rows = q.order_by(Oferta.data_encontrado.desc(), Oferta.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]) if has_more and rows else None
+    return rows, next_cursor
+
+
+def count_fila(db, limite: int = CONTAGEM_MAX) -> str:
+    """Tamanho da fila para o contador: conta até limite+1 linhas e devolve "1000+" acima do limite."""
+    sub = db.query(Oferta.id).filter(Oferta.status == "PENDENTE_APROVACAO").limit(limite + 1).subquery()
+    n = db.query(func.count()).select_from(sub).scalar() or 0
+    return f"{limite}+" if n > limite else str(n)
+
+
+def serialize_oferta(of: Oferta) -> dict:
+    """Forma JSON de um card da fila; 'tags' = tags associadas ao produto (as mesmas do filtro por tag)."""
+    tags = [t.nome_tag for t in of.produto.tags]
+
+    return {
+        "id": of.id,
+        "produto": {
+            "id": of.produto.id,
+            "nome": of.produto.nome_produto,
+            "imagem_url": of.produto.imagem_url,
+        },
+        "loja": {
+            "id": of.loja.id if of.loja else None,
+            "nome": of.loja.nome_loja if of.loja else None,
+        },
+        "preco_oferta": of.preco_oferta,
+        "preco_original": of.preco_original,
+        "desconto_real": of.desconto_real,
+        "motivo_validacao": of.motivo_validacao,
+        "data_encontrado": of.data_encontrado.isoformat() if of.data_encontrado else None,
+        "tags": tags,
+    }
@@ -0,0 +1,328 @@
+# backend/utils/historico_arquivo.py
+"""
+Camada fria do histórico de preços: linhas de historico_precos mais velhas que
+HISTORICO_ARQUIVO_DIAS (mínimo de 90, a janela da média do validador) saem do SQLite para arquivos
+Parquet (zstd), um diretório por mês:
+
+    HISTORICO_ARQUIVO_DIR/ano=2024/mes=03/parte-<id_min>-<id_max>.parquet
+
+- arquivar(): move um lote por vez. O arquivo é escrito em .tmp, sincronizado e renomeado; depois,
+  numa transação só, entra no manifesto (historico_arquivos) e as linhas saem da tabela. Uma queda
+  entre os dois passos deixa só um arquivo fora do manifesto (ignorado e apagado na próxima rodada).
+- A última linha de cada (produto, loja) nunca é arquivada: Collector._last_price depende dela.
+- ler_lotes() / ler() / ler_por_mes() / ultimo_antes(): leem só os arquivos do manifesto que cruzam o intervalo pedido
+  (e, dentro deles, os row groups do produto, já que cada arquivo é ordenado por produto/loja/data).
+  Usados pela série e pelo histórico do produto e pela exportação, que juntam arquivo + tabela quente.
+- Os arquivos são imutáveis: excluir um produto grava uma lápide (registrar_exclusao) e as leituras
+  descartam as linhas arquivadas dele anteriores à exclusão (um id reusado não herda o histórico).
+
+Com HISTORICO_ARQUIVO_ATIVO (padrão true), arquivar() exige o pyarrow (requirements.txt) e falha sem ele;
+com o arquivamento desligado, a leitura só precisa dele se já houver arquivo.
+
+    python -m backend.utils.historico_arquivo            # arquiva o que passou da idade
+    python -m backend.utils.historico_arquivo --status   # arquivos/linhas por mês
+"""
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, delete, exists, func, insert, select
+
+from backend.db.database import create_db_tables, engine
+from backend.models.models import HistoricoArquivo, HistoricoArquivoExclusao, HistoricoPreco
+from backend.utils import prazo
+from backend.utils.cache import bump_data_version
+from backend.utils.config import get_config
+from backend.utils.run_lock import RunLock
+
+logger = logging.getLogger("curadoria.historico_arquivo")
+
+COLUNAS = ("id", "produto_id", "loja_id", "preco", "data_verificacao")
+ROW_GROUP = 64 * 1024
+LOTE_LEITURA = 5000
+# Validator._get_average_price_last_months (3 meses de 30 dias) lê só a tabela quente: nada mais
+# novo que isso pode ser arquivado, ou o desconto_real passa a ser calculado sobre meia janela
+DIAS_MINIMOS = 90
+
+_manifesto = HistoricoArquivo.__table__
+_historico = HistoricoPreco.__table__
+_exclusoes = HistoricoArquivoExclusao.__table__
+
+
+def _pyarrow(obrigatorio: bool = False, motivo: str = "Há histórico arquivado em Parquet"):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        if obrigatorio:
+            raise RuntimeError(f"{motivo}, mas o pyarrow não está instalado (pip install -r requirements.txt).")
+        return None, None
+    return pa, pq
+
+
+def ativo() -> bool:
+    return (get_config("HISTORICO_ARQUIVO_ATIVO", "true") or "true").lower() in {"1", "true", "yes", "y"}
+
+
+def diretorio() -> str:
+    return os.path.abspath(get_config("HISTORICO_ARQUIVO_DIR", "./backend/db/historico_arquivo"))
+
+
+# ---------------------------
+# Arquivamento
+# ---------------------------
+def _selecionar(conn, corte: datetime, apos_id: int, lote: int) -> list:
+    """Linhas antes do corte que já têm uma mais nova do mesmo (produto, loja), em ordem de id."""
+    h = _historico
+    n = _historico.alias("n")
+    mais_nova = exists().where(
+        n.c.produto_id == h.c.produto_id, n.c.loja_id == h.c.loja_id,
+        n.c.data_verificacao > h.c.data_verificacao,
+    )
+    return conn.execute(
+        select(*(h.c[c] for c in COLUNAS))
+        .where(h.c.data_verificacao < corte, h.c.id > apos_id, mais_nova)
+        .order_by(h.c.id).limit(lote)
+    ).all()
+
+
+def _gravar(pa, pq, base: str, ano_mes: tuple, linhas: list) -> dict:
+    ano, mes = ano_mes
+    ids = [r[0] for r in linhas]
+    datas = [r[4] for r in linhas]
+    relativo = f"ano={ano:04d}/mes={mes:02d}/parte-{min(ids)}-{max(ids)}.parquet"
+    final = os.path.join(base, *relativo.split("/"))
+    os.makedirs(os.path.dirname(final), exist_ok=True)
+
+    tabela = pa.table({c: [r[i] for r in linhas] for i, c in enumerate(COLUNAS)}, schema=pa.schema([
+        ("id", pa.int64()), ("produto_id", pa.int64()), ("loja_id", pa.int64()),
+        ("preco", pa.float64()), ("data_verificacao", pa.timestamp("us")),
+    ])).sort_by([("produto_id", "ascending"), ("loja_id", "ascending"), ("data_verificacao", "ascending")])
+    tmp = final + ".tmp"
+    with open(tmp, "wb") as f:
+        pq.write_table(tabela, f, compression="zstd", row_group_size=ROW_GROUP)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, final)
+    return dict(caminho=relativo, ano_mes=f"{ano:04d}-{mes:02d}", linhas=len(linhas), id_min=min(ids),
+                id_max=max(ids), data_min=min(datas), data_max=max(datas), criado_em=datetime.now())
+
+
+def _limpar_orfaos(base: str):
+    """Remove .tmp e arquivos que não chegaram ao manifesto (queda entre gravar e apagar as linhas)."""
+    if not os.path.isdir(base):
+        return
+    with engine.connect() as conn:
+        conhecidos = set(conn.execute(select(_manifesto.c.caminho)).scalars())
+    for raiz, _dirs, arquivos in os.walk(base):
+        for nome in arquivos:
+            relativo = os.path.relpath(os.path.join(raiz, nome), base).replace(os.sep, "/")
+            if nome.endswith(".tmp") or (nome.endswith(".parquet") and relativo not in conhecidos):
+                os.remove(os.path.join(raiz, nome))
+                logger.info(f"Arquivo órfão removido: {relativo}")
+
+
+def arquivar(dias: float = None, lote: int = None) -> int:
+    """Move para Parquet as linhas mais velhas que `dias`. Respeita o prazo da thread. Retorna as linhas movidas."""
+    if not ativo():
+        return 0
+    pa, pq = _pyarrow(obrigatorio=True, motivo="Arquivamento do histórico ligado (HISTORICO_ARQUIVO_ATIVO)")
+    dias = float(dias if dias is not None else get_config("HISTORICO_ARQUIVO_DIAS", "180"))
+    if dias < DIAS_MINIMOS:
+        logger.warning(f"HISTORICO_ARQUIVO_DIAS={dias:g} abaixo da janela do validador; usando {DIAS_MINIMOS}.")
+        dias = DIAS_MINIMOS
+    lote = int(lote or get_config("HISTORICO_ARQUIVO_LOTE", "100000"))
+    corte = datetime.now() - timedelta(days=dias)
+    base = diretorio()
+
+    trava = RunLock("historico_arquivo")
+    if not trava.adquirir():
+        logger.info(f"Arquivamento já em andamento ({trava.dono_atual}).")
+        return 0
+    movidas = 0
+    try:
+        _limpar_orfaos(base)
+        apos_id = 0
+        while not prazo.esgotado():
+            with engine.connect() as conn:
+                linhas = _selecionar(conn, corte, apos_id, lote)
+            if not linhas:
+                break
+            apos_id = linhas[-1][0]
+
+            por_mes: dict[tuple, list] = {}
+            for r in linhas:
+                por_mes.setdefault((r[4].year, r[4].month), []).append(r)
+            manifesto = [_gravar(pa, pq, base, chave, grupo) for chave, grupo in sorted(por_mes.items())]
+
+            with engine.begin() as conn:
+                conn.execute(insert(_manifesto), manifesto)
+                conn.execute(delete(_historico).where(_historico.c.id == bindparam("b_id")),
+                             [{"b_id": r[0]} for r in linhas])
+                bump_data_version(conn, "historico")   # séries em cache deixam de valer
+            movidas += len(linhas)
+            logger.info(f"Histórico arquivado: {len(linhas)} linhas em {len(manifesto)} arquivo(s) "
+                        f"(até id {apos_id}).")
+        else:   # saiu pelo prazo, não por falta de linhas
+            prazo.adiar("arquivamento", "histórico antigo restante fica para a próxima rodada")
+    finally:
+        trava.liberar()
+    return movidas
+
+
+# ---------------------------
+# Leitura
+# ---------------------------
+def _arquivos(desde: datetime = None, ate: datetime = None, ano_mes: str = None) -> list:
+    """Arquivos do manifesto que cruzam [desde, ate) (ou de um mês), em ordem cronológica."""
+    m = _manifesto
+    cond = [m.c.ano_mes == ano_mes] if ano_mes else []
+    if desde:
+        cond.append(m.c.data_max >= desde)
+    if ate:
+        cond.append(m.c.data_min < ate)
+    with engine.connect() as conn:
+        return conn.execute(select(m).where(*cond).order_by(m.c.data_min, m.c.id)).all()
+
+
+def registrar_exclusao(conn, produto_id: int) -> None:
+    """Lápide do produto, na transação de quem o exclui (só se houver algo arquivado)."""
+    if conn.execute(select(_manifesto.c.id).limit(1)).first() is not None:
+        conn.execute(insert(_exclusoes).values(produto_id=produto_id, excluido_em=datetime.now()))
+
+
+def _lapides(produto_id=None) -> dict:
+    """{produto_id: última exclusão}."""
+    e = _exclusoes
+    stmt = select(e.c.produto_id, func.max(e.c.excluido_em)).group_by(e.c.produto_id)
+    if produto_id is not None:
+        stmt = stmt.where(e.c.produto_id == produto_id)
+    with engine.connect() as conn:
+        return dict(conn.execute(stmt).all())
+
+
+def _vivas(linhas: list, lapides: dict) -> list:
+    if not lapides:
+        return linhas
+    return [r for r in linhas if r[1] not in lapides or r[4] >= lapides[r[1]]]
+
+
+def _filtros(produto_id=None, produto_ids=None, loja_id=None, desde=None, ate=None):
+    filtros = []
+    if produto_id is not None:
+        filtros.append(("produto_id", "=", produto_id))
+    if produto_ids is not None:
+        filtros.append(("produto_id", "in", list(produto_ids)))
+    if loja_id is not None:
+        filtros.append(("loja_id", "=", loja_id))
+    if desde is not None:
+        filtros.append(("data_verificacao", ">=", desde))
+    if ate is not None:
+        filtros.append(("data_verificacao", "<", ate))
+    return filtros or None
+
+
+def _ler_arquivo(pq, arquivo, filtros):
+    return pq.read_table(os.path.join(diretorio(), *arquivo.caminho.split("/")),
+                         columns=list(COLUNAS), filters=filtros, partitioning=None)
+
+
+def ler_lotes(produto_id: int = None, produto_ids=None, loja_id: int = None,
+              desde: datetime = None, ate: datetime = None):
+    """
+    Linhas arquivadas (tuplas id, produto_id, loja_id, preco, data_verificacao) em lotes,
+    arquivo a arquivo. `desde` inclusivo, `ate` exclusivo (igual à exportação).
+    """
+    arquivos = _arquivos(desde, ate)
+    if not arquivos:
+        return
+    _pa, pq = _pyarrow(obrigatorio=True)
+    filtros = _filtros(produto_id, produto_ids, loja_id, desde, ate)
+    lapides = _lapides(produto_id)
+    for arquivo in arquivos:
+        for lote in _ler_arquivo(pq, arquivo, filtros).to_batches(LOTE_LEITURA):
+            linhas = _vivas(list(zip(*(lote.column(c).to_pylist() for c in COLUNAS))), lapides)
+            if linhas:
+                yield linhas
+
+
+def ler(produto_id: int = None, loja_id: int = None, desde: datetime = None, ate: datetime = None) -> list:
+    """Linhas arquivadas do filtro, ordenadas por data (consultas de um produto: cabem em memória)."""
+    linhas = [r for lote in ler_lotes(produto_id=produto_id, loja_id=loja_id, desde=desde, ate=ate) for r in lote]
+    linhas.sort(key=lambda r: (r[4], r[0]))
+    return linhas
+
+
+def ler_por_mes(produto_id: int = None, loja_id: int = None):
+    """
+    Linhas arquivadas em lotes, mês a mês, cada mês ordenado por (produto, loja, data): para cada
+    par sai tudo em ordem cronológica, com memória de um mês (colunar) e não do arquivo inteiro.
+    """
+    meses = [ano_mes for ano_mes, _arquivos_mes, _linhas in status()]
+    if not meses:
+        return
+    pa, pq = _pyarrow(obrigatorio=True)
+    filtros = _filtros(produto_id, None, loja_id)
+    lapides = _lapides(produto_id)
+    for ano_mes in meses:
+        tabela = pa.concat_tables([_ler_arquivo(pq, a, filtros) for a in _arquivos(ano_mes=ano_mes)])
+        tabela = tabela.sort_by([("produto_id", "ascending"), ("loja_id", "ascending"),
+                                 ("data_verificacao", "ascending"), ("id", "ascending")])
+        for lote in tabela.to_batches(LOTE_LEITURA):
+            linhas = _vivas(list(zip(*(lote.column(c).to_pylist() for c in COLUNAS))), lapides)
+            if linhas:
+                yield linhas
+
+
+def ultimo_antes(produto_id: int, loja_id: int = None, antes: datetime = None):
+    """(data, preço) da última linha arquivada antes de `antes`, ou None."""
+    arquivos = sorted(_arquivos(ate=antes), key=lambda a: a.data_max, reverse=True)
+    if not arquivos:
+        return None
+    _pa, pq = _pyarrow(obrigatorio=True)
+    filtros = _filtros(produto_id, None, loja_id, None, antes)
+    excluido_em = _lapides(produto_id).get(produto_id)
+    melhor = None
+    for arquivo in arquivos:
+        if melhor is not None and arquivo.data_max < melhor[0]:
+            break   # os demais arquivos terminam antes do que já achamos
+        tabela = _ler_arquivo(pq, arquivo, filtros)
+        for d, preco in zip(tabela.column("data_verificacao").to_pylist(), tabela.column("preco").to_pylist()):
+            if excluido_em is not None and d < excluido_em:
+                continue
+            if melhor is None or d > melhor[0]:
+                melhor = (d, preco)
+    return melhor
+
+
+def status() -> list:
+    """[(ano_mes, arquivos, linhas)] do manifesto."""
+    m = _manifesto
+    with engine.connect() as conn:
+        return conn.execute(
+            select(m.c.ano_mes, func.count(m.c.id), func.sum(m.c.linhas)).group_by(m.c.ano_mes).order_by(m.c.ano_mes)
+        ).all()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arquiva o histórico de preços antigo em Parquet.")
+    parser.add_argument("--status", action="store_true", help="só mostra arquivos/linhas por mês")
+    parser.add_argument("--dias", type=float, help="idade mínima das linhas (padrão: HISTORICO_ARQUIVO_DIAS)")
+    parser.add_argument("--lote", type=int, help="linhas por lote (padrão: HISTORICO_ARQUIVO_LOTE)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    create_db_tables()
+    if not args.status:
+        print(f"Linhas arquivadas: {arquivar(args.dias, args.lote)}")
+    with engine.connect() as conn:
+        quentes = conn.execute(select(func.count(_historico.c.id))).scalar()
+    print(f"Diretório: {diretorio()}")
+    for ano_mes, arquivos, linhas in status():
+        print(f"  {ano_mes}: {linhas} linhas em {arquivos} arquivo(s)")
+    print(f"Linhas na tabela quente: {quentes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# backend/utils/jobs.py
+"""
+Fila local de jobs em background para a API (scraping fora da thread da requisição).
+
+- Pool fixo de threads (JOBS_WORKERS); cada worker tem um contexto próprio (dict) que
+  persiste entre jobs, para manter recursos "quentes" (ex.: um Collector com sessão de banco).
+- Status guardado em memória por JOBS_TTL_SEC; a fila é local ao processo.
+- dedup_key evita enfileirar de novo um job igual que ainda está na fila/rodando.
+"""
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_TTL_SEC = float(os.getenv("JOBS_TTL_SEC", "3600"))
+
+
+class JobQueue:
+    def __init__(self, workers: int = JOBS_WORKERS, ttl_sec: float = JOBS_TTL_SEC):
+        self.workers = max(1, workers)
+        self.ttl_sec = ttl_sec
+        self._q: "queue.Queue[tuple]" = queue.Queue()
+        self._jobs: dict[str, dict] = {}
+        self._ativos: dict[object, str] = {}   # dedup_key -> job_id (na fila ou rodando)
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _prune(self):
+        limite = time.time() - self.ttl_sec
+        for jid in [j for j, job in self._jobs.items()
+                    if job["status"] in {"done", "error"} and (job["finished_at"] or 0) < limite]:
+            del self._jobs[jid]
+
+    def submit(self, tipo: str, fn, *args, dedup_key=None) -> str:
+        """Enfileira fn(ctx, *args) e devolve o job_id (ou o do job equivalente já ativo)."""
+        with self._lock:
+            self._ensure_workers()
+            self._prune()
+            if dedup_key is not None and dedup_key in self._ativos:
+                return self._ativos[dedup_key]
+            jid = uuid.uuid4().hex
+            self._jobs[jid] = {
+                "id": jid, "tipo": tipo, "status": "queued", "result": None, "error": None,
+                "created_at": time.time(), "started_at": None, "finished_at": None,
+            }
+            if dedup_key is not None:
+                self._ativos[dedup_key] = jid
+        self._q.put((jid, fn, args, dedup_key))
+        return jid
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _worker(self):
+        ctx: dict = {}
+        while True:
+            jid, fn, args, dedup_key = self._q.get()
+            with self._lock:
+                self._jobs[jid]["status"] = "running"
+                self._jobs[jid]["started_at"] = time.time()
+            try:
+                result = fn(ctx, *args)
+                status, error = "done", None
+            except Exception as e:
+                traceback.print_exc()
+                result, status, error = None, "error", str(e)
+            with self._lock:
+                job = self._jobs.get(jid)
+                if job is not None:
+                    job.update(status=status, result=result, error=error, finished_at=time.time())
+                if dedup_key is not None and self._ativos.get(dedup_key) == jid:
+                    del self._ativos[dedup_key]
+            self._q.task_done()
+
+
+# Fila única do processo web
+job_queue = JobQueue()
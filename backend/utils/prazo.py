@@ -0,0 +1,107 @@
+# backend/utils/prazo.py
+"""
+Prazo (deadline) da execução, respeitado por todos os estágios e chamadas de rede.
+
+- with usar(Prazo(segundos)): define o prazo da thread; Prazo(None) = sem limite.
+- prazo.reservando(seg): sub-prazo que termina `seg` antes (ex.: a coleta para a tempo de
+  sobrar orçamento para validação/publicação); compartilha a lista de adiados.
+- instrument_http (utils/telemetry.py) limita o timeout de cada requisição ao tempo restante e
+  levanta PrazoEsgotado (um requests Timeout) quando não sobra tempo; dormir() faz o mesmo com pausas.
+- adiar(estagio, descricao): registra o que ficou para a próxima execução (vai para o resumo em
+  execucoes_pipeline e para o log).
+"""
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+logger = logging.getLogger("curadoria.prazo")
+
+# Abaixo disso não vale a pena abrir uma requisição
+PRAZO_MINIMO_SEG = 0.5
+
+
+class PrazoEsgotado(requests.exceptions.Timeout):
+    """Sem orçamento para a operação; quem já trata Timeout/RequestException degrada normalmente."""
+
+
+class Prazo:
+    def __init__(self, segundos: float = None, _fim: float = None, _adiados: list = None):
+        if _fim is not None:
+            self.fim = _fim
+        else:
+            self.fim = time.monotonic() + segundos if segundos is not None else math.inf
+        self.adiados: list[dict] = _adiados if _adiados is not None else []
+
+    def restante(self) -> float:
+        return max(0.0, self.fim - time.monotonic())
+
+    def esgotado(self, reserva: float = 0.0) -> bool:
+        return self.restante() <= reserva
+
+    def reservando(self, segundos: float) -> "Prazo":
+        return Prazo(_fim=self.fim - segundos, _adiados=self.adiados)
+
+    def timeout(self, padrao=None):
+        """Timeout de requests (número ou tupla connect/read) limitado ao tempo restante."""
+        r = self.restante()
+        if r < PRAZO_MINIMO_SEG:
+            raise PrazoEsgotado("prazo da execução esgotado")
+        if math.isinf(r):
+            return padrao
+        if padrao is None:
+            return r
+        if isinstance(padrao, tuple):
+            return tuple(min(t, r) if t is not None else r for t in padrao)
+        return min(padrao, r)
+
+    def adiar(self, estagio: str, descricao: str):
+        self.adiados.append({"estagio": estagio, "descricao": descricao})
+        logger.warning(f"Prazo: {estagio} adiado — {descricao}")
+
+
+_local = threading.local()
+
+
+def atual():
+    """Prazo da thread corrente (None = sem limite)."""
+    return getattr(_local, "prazo", None)
+
+
+@contextmanager
+def usar(prazo: Prazo):
+    anterior = atual()
+    _local.prazo = prazo
+    try:
+        yield prazo
+    finally:
+        _local.prazo = anterior
+
+
+def restante() -> float:
+    p = atual()
+    return p.restante() if p is not None else math.inf
+
+
+def esgotado(reserva: float = 0.0) -> bool:
+    p = atual()
+    return p is not None and p.esgotado(reserva)
+
+
+def adiar(estagio: str, descricao: str):
+    p = atual()
+    if p is not None:
+        p.adiar(estagio, descricao)
+
+
+def dormir(segundos: float) -> bool:
+    """time.sleep limitado ao prazo; False se o prazo acabou."""
+    p = atual()
+    if p is None:
+        time.sleep(segundos)
+        return True
+    time.sleep(min(segundos, p.restante()))
+    return not p.esgotado()
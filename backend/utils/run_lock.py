@@ -0,0 +1,109 @@
+# backend/utils/run_lock.py
+"""
+Trava de execução única entre processos (cron, daemon, execuções manuais) no próprio banco.
+
+- adquirir(): insere a linha de pipeline_locks ou toma uma trava velha; devolve False se outro
+  processo vivo a detém.
+- Trava velha: heartbeat mais antigo que PIPELINE_LOCK_STALE_MIN, ou dono na mesma máquina com o
+  pid já morto (queda/kill -9 não deixa o pipeline travado até o timeout).
+- Enquanto detida, uma thread renova heartbeat_em; liberar() apaga a linha (só se ainda for o dono).
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from backend.db.database import engine
+from backend.models.models import PipelineLock
+from backend.utils.config import get_config
+
+logger = logging.getLogger("curadoria.lock")
+
+_tabela = PipelineLock.__table__
+
+
+def _pid_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True   # existe, só não é nosso
+    return True
+
+
+class RunLock:
+    def __init__(self, nome: str = "pipeline", stale_min: float = None):
+        self.nome = nome
+        self.stale = timedelta(minutes=float(stale_min if stale_min is not None
+                                             else get_config("PIPELINE_LOCK_STALE_MIN", "10")))
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        self.token = f"{self.host}:{self.pid}:{uuid.uuid4().hex[:8]}"
+        self._parar = threading.Event()
+        self._heartbeat = None
+        self.dono_atual = None   # token de quem detém a trava quando adquirir() falha
+
+    # ---------- aquisição ----------
+    def _velha(self, row, agora) -> bool:
+        if row.heartbeat_em < agora - self.stale:
+            return True
+        return row.host == self.host and row.pid != self.pid and not _pid_vivo(row.pid)
+
+    def adquirir(self) -> bool:
+        agora = datetime.now()
+        valores = dict(token=self.token, host=self.host, pid=self.pid, adquirido_em=agora, heartbeat_em=agora)
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(_tabela).values(nome=self.nome, **valores))
+        except IntegrityError:
+            with engine.begin() as conn:
+                row = conn.execute(select(_tabela).where(_tabela.c.nome == self.nome)).first()
+                if row is not None and not self._velha(row, agora):
+                    self.dono_atual = row.token
+                    return False
+                # troca condicional: se outro processo tomou a trava velha antes, rowcount = 0
+                cond = _tabela.c.nome == self.nome
+                if row is not None:
+                    cond = cond & (_tabela.c.token == row.token)
+                    logger.warning(f"Trava '{self.nome}' abandonada por {row.token} "
+                                   f"(heartbeat {row.heartbeat_em:%Y-%m-%d %H:%M:%S}); assumindo.")
+                if conn.execute(update(_tabela).where(cond).values(**valores)).rowcount != 1:
+                    return False
+
+        self._parar.clear()
+        self._heartbeat = threading.Thread(target=self._renovar, name=f"lock-{self.nome}", daemon=True)
+        self._heartbeat.start()
+        return True
+
+    def _renovar(self):
+        intervalo = max(1.0, self.stale.total_seconds() / 3)
+        while not self._parar.wait(intervalo):
+            try:
+                with engine.begin() as conn:
+                    ok = conn.execute(
+                        update(_tabela)
+                        .where(_tabela.c.nome == self.nome, _tabela.c.token == self.token)
+                        .values(heartbeat_em=datetime.now())
+                    ).rowcount
+                if not ok:
+                    logger.error(f"Trava '{self.nome}' foi tomada por outro processo.")
+                    return
+            except Exception as e:
+                logger.warning(f"Falha ao renovar a trava '{self.nome}': {e}")
+
+    def liberar(self):
+        self._parar.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(5)
+            self._heartbeat = None
+        try:
+            with engine.begin() as conn:
+                conn.execute(delete(_tabela).where(_tabela.c.nome == self.nome, _tabela.c.token == self.token))
+        except Exception as e:
+            logger.warning(f"Falha ao liberar a trava '{self.nome}': {e}")
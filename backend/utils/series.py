@@ -0,0 +1,74 @@
+# backend/utils/series.py
+"""
+Redução de séries temporais (preço x tempo) para um número fixo de pontos.
+
+- minmax_buckets: divide [t0, t1] em N faixas e guarda o mínimo e o máximo de cada uma
+  (na ordem do tempo). Consome um iterador: memória O(N), não O(observações).
+- lttb: Largest-Triangle-Three-Buckets, escolhe os pontos que preservam a forma da curva.
+
+Os pontos são tuplas (t, y) com t em segundos (float).
+"""
+
+
+def minmax_buckets(pontos, t0: float, t1: float, n_buckets: int):
+    """Min/max por faixa de tempo; pontos fora de [t0, t1] são ignorados."""
+    n_buckets = max(1, n_buckets)
+    largura = (t1 - t0) / n_buckets or 1.0
+    faixas: dict[int, list] = {}   # i -> [ponto_min, ponto_max]
+    for t, y in pontos:
+        if t < t0 or t > t1:
+            continue
+        i = min(int((t - t0) / largura), n_buckets - 1)
+        f = faixas.get(i)
+        if f is None:
+            faixas[i] = [(t, y), (t, y)]
+            continue
+        if y < f[0][1]:
+            f[0] = (t, y)
+        if y > f[1][1]:
+            f[1] = (t, y)
+
+    saida = []
+    for i in sorted(faixas):
+        p_min, p_max = faixas[i]
+        if p_min == p_max:
+            saida.append(p_min)
+        else:
+            saida.extend(sorted((p_min, p_max)))
+    return saida
+
+
+def lttb(pontos: list, n: int) -> list:
+    """Reduz `pontos` (ordenados por t) para `n` pontos mantendo o primeiro e o último."""
+    total = len(pontos)
+    if n >= total:
+        return list(pontos)
+    if n < 3:
+        return [pontos[0], pontos[-1]][:max(n, 0)]
+
+    saida = [pontos[0]]
+    tamanho = (total - 2) / (n - 2)
+    a = 0
+    for i in range(n - 2):
+        # média do próximo balde (o terceiro vértice do triângulo)
+        ini_prox = int((i + 1) * tamanho) + 1
+        fim_prox = min(int((i + 2) * tamanho) + 1, total)
+        prox = pontos[ini_prox:fim_prox] or [pontos[-1]]
+        mx = sum(p[0] for p in prox) / len(prox)
+        my = sum(p[1] for p in prox) / len(prox)
+
+        # no balde atual, o ponto que forma o maior triângulo com o anterior escolhido e a média
+        ini = int(i * tamanho) + 1
+        fim = int((i + 1) * tamanho) + 1
+        ax, ay = pontos[a]
+        melhor, maior_area = ini, -1.0
+        for j in range(ini, fim):
+            bx, by = pontos[j]
+            area = abs((ax - mx) * (by - ay) - (ax - bx) * (my - ay))
+            if area > maior_area:
+                melhor, maior_area = j, area
+        saida.append(pontos[melhor])
+        a = melhor
+
+    saida.append(pontos[-1])
+    return saida
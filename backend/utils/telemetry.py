@@ -0,0 +1,322 @@
+# backend/utils/telemetry.py
+"""
+Instrumentação por estágio do pipeline (coleta, validação, publicação, métricas).
+
+Por estágio: tempo de parede, itens de entrada/saída, requisições HTTP (contagem, erros,
+histograma de latência), queries e tempo de banco, commits e tempo de parsing.
+
+- Banco: eventos do engine (before/after_cursor_execute) e de Session (after_commit).
+- HTTP: instrument_http(session) envolve session.request (pega também timeouts/erros) e limita
+  o timeout de cada requisição ao prazo da execução (utils/prazo.py).
+- O estágio corrente é o da thread (with telemetria.stage(...)) ou, em threads auxiliares
+  (ex.: pool do Bitly), o último estágio aberto.
+
+Ao fim de cada estágio sai uma linha de log JSON; RunPipeline grava o resumo da execução em
+execucoes_pipeline e /metrics (app.py) o expõe no formato texto do Prometheus.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlparse
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.utils import prazo as _prazo
+
+logger = logging.getLogger("curadoria.telemetria")
+
+HTTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SEM_ESTAGIO = "fora_de_estagio"
+
+
+def _novo_estagio() -> dict:
+    return {
+        "duracao_seg": 0.0,
+        "itens_entrada": 0,
+        "itens_saida": 0,
+        "http_requisicoes": 0,
+        "http_erros": 0,
+        "http_seg": 0.0,
+        "http_buckets": [0] * len(HTTP_BUCKETS),
+        "http_por_host": {},
+        "db_queries": 0,
+        "db_seg": 0.0,
+        "db_commits": 0,
+        "parse_seg": 0.0,
+    }
+
+
+class Telemetria:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ultimo_estagio = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.estagios: dict[str, dict] = {}
+            self.iniciado_em = datetime.now()
+
+    # ---------- estágio corrente ----------
+    def _atual(self) -> str:
+        return getattr(self._local, "estagio", None) or self._ultimo_estagio or SEM_ESTAGIO
+
+    def _dados(self, nome: str) -> dict:
+        d = self.estagios.get(nome)
+        if d is None:
+            d = self.estagios[nome] = _novo_estagio()
+        return d
+
+    @contextmanager
+    def stage(self, nome: str):
+        anterior = getattr(self._local, "estagio", None)
+        self._local.estagio = nome
+        self._ultimo_estagio = nome
+        with self._lock:
+            self._dados(nome)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            dur = time.perf_counter() - inicio
+            with self._lock:
+                d = self._dados(nome)
+                d["duracao_seg"] += dur
+                linha = {"evento": "estagio", "estagio": nome, **{k: v for k, v in d.items() if k != "http_buckets"}}
+            self._local.estagio = anterior
+            logger.info(json.dumps(linha, ensure_ascii=False, default=str))
+
+    # ---------- contadores ----------
+    def itens(self, entrada: int = 0, saida: int = 0):
+        with self._lock:
+            d = self._dados(self._atual())
+            d["itens_entrada"] += entrada
+            d["itens_saida"] += saida
+
+    def propagar(self, fn):
+        """Envolve fn para rodar (em outra thread) contando no estágio corrente desta thread (e no mesmo prazo)."""
+        estagio = self._atual()
+        prazo = _prazo.atual()
+
+        def wrapper(*args, **kwargs):
+            anterior = getattr(self._local, "estagio", None)
+            self._local.estagio = estagio
+            try:
+                with _prazo.usar(prazo):
+                    return fn(*args, **kwargs)
+            finally:
+                self._local.estagio = anterior
+        return wrapper
+
+    def reset_stage(self, nome: str):
+        """Zera só um estágio (o daemon roda estágios em threads próprias, cada um com seu resumo)."""
+        with self._lock:
+            self.estagios[nome] = _novo_estagio()
+
+    @contextmanager
+    def parse(self):
+        """Mede tempo de parsing (HTML etc.) dentro do estágio corrente."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            dur = time.perf_counter() - inicio
+            with self._lock:
+                self._dados(self._atual())["parse_seg"] += dur
+
+    def registrar_http(self, host: str, segundos: float, erro: bool):
+        with self._lock:
+            d = self._dados(self._atual())
+            d["http_requisicoes"] += 1
+            d["http_seg"] += segundos
+            if erro:
+                d["http_erros"] += 1
+            d["http_por_host"][host] = d["http_por_host"].get(host, 0) + 1
+            for i, limite in enumerate(HTTP_BUCKETS):
+                if segundos <= limite:
+                    d["http_buckets"][i] += 1
+                    break
+
+    def registrar_query(self, segundos: float):
+        with self._lock:
+            d = self._dados(self._atual())
+            d["db_queries"] += 1
+            d["db_seg"] += segundos
+
+    def registrar_commit(self):
+        with self._lock:
+            self._dados(self._atual())["db_commits"] += 1
+
+    def resumo(self, *estagios: str) -> dict:
+        """Resumo de todos os estágios (ou só dos informados)."""
+        with self._lock:
+            dados = {k: v for k, v in self.estagios.items() if not estagios or k in estagios}
+            return {
+                "iniciado_em": self.iniciado_em.isoformat(),
+                "estagios": json.loads(json.dumps(dados)),
+            }
+
+
+# Instância única do processo
+telemetria = Telemetria()
+_instalado = set()
+
+
+def install_db_hooks(engine) -> None:
+    """Conta queries/tempo de banco do engine e commits de qualquer Session (idempotente)."""
+    if id(engine) in _instalado:
+        return
+    _instalado.add(id(engine))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_telemetria_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        pilha = conn.info.get("_telemetria_t0")
+        if pilha:
+            telemetria.registrar_query(time.perf_counter() - pilha.pop())
+
+    if "session" not in _instalado:
+        _instalado.add("session")
+        event.listen(Session, "after_commit", lambda session: telemetria.registrar_commit())
+
+
+def instrument_http(session):
+    """Envolve session.request para medir latência/erros por estágio e respeitar o prazo. Devolve a própria sessão."""
+    if getattr(session, "_telemetria", False):
+        return session
+    original = session.request
+
+    def request(method, url, *args, **kwargs):
+        p = _prazo.atual()
+        if p is not None:
+            kwargs["timeout"] = p.timeout(kwargs.get("timeout"))   # PrazoEsgotado se não sobrar tempo
+        inicio = time.perf_counter()
+        erro = True
+        try:
+            resp = original(method, url, *args, **kwargs)
+            erro = resp.status_code >= 400
+            return resp
+        finally:
+            telemetria.registrar_http(urlparse(url).netloc, time.perf_counter() - inicio, erro)
+
+    session.request = request
+    session._telemetria = True
+    return session
+
+
+def registrar_execucao(status: str, resumo: dict, iniciado_em: datetime) -> None:
+    """Grava a linha de resumo da execução (sessão própria: a do pipeline pode estar inválida)."""
+    from backend.db.database import SessionLocal
+    from backend.models.models import ExecucaoPipeline
+
+    fim = datetime.now()
+    try:
+        with SessionLocal() as db:
+            db.add(ExecucaoPipeline(
+                iniciado_em=iniciado_em,
+                finalizado_em=fim,
+                status=status,
+                duracao_seg=(fim - iniciado_em).total_seconds(),
+                resumo=json.dumps(resumo, ensure_ascii=False),
+            ))
+            db.commit()
+    except Exception as e:
+        logger.warning(f"Não foi possível gravar o resumo da execução: {e}")
+
+
+def limpar_execucoes(dias: float) -> None:
+    """Apaga resumos de execução mais velhos que `dias` (0 = manter tudo)."""
+    if not dias:
+        return
+    from datetime import timedelta
+    from backend.db.database import SessionLocal
+    from backend.models.models import ExecucaoPipeline
+
+    limite = datetime.now() - timedelta(days=dias)
+    with SessionLocal() as db:
+        db.query(ExecucaoPipeline).filter(ExecucaoPipeline.finalizado_em < limite).delete(synchronize_session=False)
+        db.commit()
+
+
+def _escapa(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _linha(nome, valor, labels=None):
+    if labels:
+        rot = ",".join(f'{k}="{_escapa(v)}"' for k, v in labels.items())
+        return f"{nome}{{{rot}}} {valor}"
+    return f"{nome} {valor}"
+
+
+def render_prometheus(execucoes: list, total_execucoes: int) -> str:
+    """
+    Texto no formato de exposição do Prometheus a partir das últimas ExecucaoPipeline (mais nova primeiro).
+    Cada estágio usa a execução mais recente em que apareceu (o daemon grava uma linha por estágio).
+    """
+    execucao = execucoes[0] if execucoes else None
+    out = [
+        "# HELP curadoria_pipeline_runs_total Execuções do pipeline registradas.",
+        "# TYPE curadoria_pipeline_runs_total counter",
+        _linha("curadoria_pipeline_runs_total", total_execucoes),
+    ]
+    if execucao is None:
+        return "\n".join(out) + "\n"
+
+    estagios = {}
+    for ex in execucoes:
+        for s, d in json.loads(ex.resumo or "{}").get("estagios", {}).items():
+            estagios.setdefault(s, d)
+    out += [
+        "# HELP curadoria_pipeline_last_run_timestamp_seconds Fim da última execução (epoch).",
+        "# TYPE curadoria_pipeline_last_run_timestamp_seconds gauge",
+        _linha("curadoria_pipeline_last_run_timestamp_seconds", f"{execucao.finalizado_em.timestamp():.3f}"),
+        "# HELP curadoria_pipeline_last_run_success 1 se a última execução terminou sem erro.",
+        "# TYPE curadoria_pipeline_last_run_success gauge",
+        _linha("curadoria_pipeline_last_run_success", 1 if execucao.status == "ok" else 0),
+        "# HELP curadoria_pipeline_last_run_duration_seconds Duração total da última execução.",
+        "# TYPE curadoria_pipeline_last_run_duration_seconds gauge",
+        _linha("curadoria_pipeline_last_run_duration_seconds", f"{execucao.duracao_seg:.3f}"),
+        "# HELP curadoria_pipeline_last_run_deferred Trabalhos adiados por falta de prazo na última execução.",
+        "# TYPE curadoria_pipeline_last_run_deferred gauge",
+        _linha("curadoria_pipeline_last_run_deferred", len(json.loads(execucao.resumo or "{}").get("adiados", []))),
+    ]
+
+    gauges = [
+        ("stage_duration_seconds", "duracao_seg", "Tempo de parede do estágio"),
+        ("stage_parse_seconds", "parse_seg", "Tempo de parsing no estágio"),
+        ("stage_db_seconds", "db_seg", "Tempo em queries no estágio"),
+        ("stage_db_queries", "db_queries", "Queries executadas no estágio"),
+        ("stage_db_commits", "db_commits", "Commits no estágio"),
+        ("stage_http_errors", "http_erros", "Requisições HTTP com erro/status >= 400"),
+    ]
+    for metrica, chave, ajuda in gauges:
+        nome = f"curadoria_pipeline_{metrica}"
+        out += [f"# HELP {nome} {ajuda} (última execução)", f"# TYPE {nome} gauge"]
+        out += [_linha(nome, d.get(chave, 0), {"stage": s}) for s, d in estagios.items()]
+
+    nome = "curadoria_pipeline_stage_items"
+    out += [f"# HELP {nome} Itens de entrada/saída do estágio (última execução)", f"# TYPE {nome} gauge"]
+    for s, d in estagios.items():
+        out.append(_linha(nome, d.get("itens_entrada", 0), {"stage": s, "direcao": "entrada"}))
+        out.append(_linha(nome, d.get("itens_saida", 0), {"stage": s, "direcao": "saida"}))
+
+    nome = "curadoria_pipeline_stage_http_latency_seconds"
+    out += [f"# HELP {nome} Latência das requisições HTTP do estágio (última execução)", f"# TYPE {nome} histogram"]
+    for s, d in estagios.items():
+        acumulado = 0
+        for limite, n in zip(HTTP_BUCKETS, d.get("http_buckets", [])):
+            acumulado += n
+            out.append(_linha(f"{nome}_bucket", acumulado, {"stage": s, "le": limite}))
+        out.append(_linha(f"{nome}_bucket", d.get("http_requisicoes", 0), {"stage": s, "le": "+Inf"}))
+        out.append(_linha(f"{nome}_sum", f"{d.get('http_seg', 0.0):.6f}", {"stage": s}))
+        out.append(_linha(f"{nome}_count", d.get("http_requisicoes", 0), {"stage": s}))
+    return "\n".join(out) + "\n"
@@ -0,0 +1,11 @@
+# backend/utils/text.py
+import re
+import unicodedata
+
+
+def normalize_text(s: str) -> str:
+    """minúsculas, sem acentos (NFKD sem marcas combinantes) e espaços colapsados."""
+    s = (s or "").strip().lower()
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", s)
@@ -0,0 +1,234 @@
+# benchmarks/bench_pipeline.py
+"""
+Benchmark ponta a ponta do pipeline (RunPipeline) contra servidores locais (benchmarks/stubs.py).
+
+Para cada tamanho, um banco SQLite novo é semeado pelo gerador de dados sintéticos (lojas, tags,
+canais, produtos, histórico e ofertas em todos os status) e o RunPipeline roda num subprocesso próprio, com
+Mercado Livre, Telegram e Bitly apontados para os stubs. Por estágio sai: duração, vazão (itens/s),
+requisições HTTP e latência média, queries/tempo de banco e commits (da telemetria do pipeline);
+por execução, o pico de memória do processo e as requisições recebidas por cada stub.
+
+    python -m benchmarks.bench_pipeline --tamanhos 1000,10000,100000
+    python -m benchmarks.bench_pipeline --tamanhos 5000 --latencia-ms 30 --paginas 5 -o resultado.json
+    python -m benchmarks.bench_pipeline comparar benchmarks/resultados/a.json benchmarks/resultados/b.json
+
+O resultado vai para benchmarks/resultados/<data>_<commit>.json (ou -o), para comparar entre commits.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+
+# ---------------------------
+# Subprocesso: semeia o banco e roda o pipeline
+# ---------------------------
+def _semear(tamanho: int, n_lojas: int, pontos: int) -> dict:
+    """Banco com o catálogo dos stubs (mesmos códigos e vendedores), via benchmarks/dados_sinteticos.py."""
+    from benchmarks.dados_sinteticos import gerar
+
+    return gerar(tamanho, tamanho * pontos, lojas=n_lojas, dias=180, log=lambda *_: None)
+
+
+def _memoria_mb() -> float:
+    import resource
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+
+
+def _estagios(resumo: dict) -> dict:
+    saida = {}
+    for nome, d in resumo.get("estagios", {}).items():
+        dur = d["duracao_seg"]
+        saida[nome] = {
+            "duracao_seg": round(dur, 3),
+            "itens_entrada": d["itens_entrada"],
+            "itens_saida": d["itens_saida"],
+            "vazao_itens_seg": round(d["itens_entrada"] / dur, 2) if dur else None,
+            "http_requisicoes": d["http_requisicoes"],
+            "http_erros": d["http_erros"],
+            "http_media_ms": round(d["http_seg"] * 1000 / d["http_requisicoes"], 2) if d["http_requisicoes"] else None,
+            "db_queries": d["db_queries"],
+            "db_seg": round(d["db_seg"], 3),
+            "db_commits": d["db_commits"],
+            "parse_seg": round(d["parse_seg"], 3),
+        }
+    return saida
+
+
+def executar(tamanho: int, n_lojas: int, pontos: int, saida: str):
+    """Roda no subprocesso (variáveis de ambiente já apontando para o banco e os stubs)."""
+    sys.path.insert(0, RAIZ)
+    t0 = time.perf_counter()
+    linhas = _semear(tamanho, n_lojas, pontos)
+    seed_seg = time.perf_counter() - t0
+    memoria_seed = _memoria_mb()
+
+    from backend.utils.telemetry import telemetria
+    from run_pipeline import RunPipeline
+
+    t0 = time.perf_counter()
+    status = "ok"
+    try:
+        RunPipeline().run()
+    except Exception as e:
+        status = f"erro: {e}"
+    resultado = {
+        "tamanho": tamanho,
+        "status": status,
+        "linhas": linhas,
+        "seed_seg": round(seed_seg, 3),
+        "pipeline_seg": round(time.perf_counter() - t0, 3),
+        "memoria_apos_seed_mb": memoria_seed,
+        "pico_memoria_mb": _memoria_mb(),
+        "estagios": _estagios(telemetria.resumo()),
+    }
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f)
+
+
+# ---------------------------
+# Processo principal: stubs + um subprocesso por tamanho
+# ---------------------------
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "desconhecido"
+
+
+def rodar(args) -> dict:
+    from benchmarks.stubs import BitlyStub, MercadoLivreStub, TelegramStub
+
+    tamanhos = [int(t) for t in args.tamanhos.split(",") if t.strip()]
+    ml = MercadoLivreStub(args.latencia_ms, args.itens_por_pagina, args.lojas).iniciar()
+    telegram = TelegramStub(args.latencia_ms).iniciar()
+    bitly = BitlyStub(args.latencia_ms).iniciar()
+    stubs = (ml, telegram, bitly)
+
+    execucoes = []
+    with tempfile.TemporaryDirectory(prefix="bench_curadoria_") as tmp:
+        for tamanho in tamanhos:
+            for s in stubs:
+                s.requisicoes = 0
+            banco = os.path.join(tmp, f"bench_{tamanho}.db")
+            saida = os.path.join(tmp, f"resultado_{tamanho}.json")
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{banco}",
+                "COLETA_FONTES": "mercadolivre",
+                "ML_BASE_URL": ml.url,
+                "ML_MAX_PAGES": str(args.paginas),
+                "ML_REQUEST_DELAY_SEC": "0",
+                "TELEGRAM_API_URL": telegram.url,
+                "TELEGRAM_BOT_TOKEN": "bench",
+                "BITLY_API_URL": f"{bitly.url}/v4",
+                "BITLY_ACCESS_TOKEN": "bench",
+                "HISTORICO_ARQUIVO_DIR": os.path.join(tmp, f"arquivo_{tamanho}"),
+                "PYTHONPATH": RAIZ,
+            }
+            print(f"[bench] tamanho {tamanho}: semeando e rodando o pipeline...", flush=True)
+            log = None if args.verbose else subprocess.DEVNULL
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_pipeline", "_executar", "--tamanho", str(tamanho),
+                 "--lojas", str(args.lojas), "--pontos", str(args.pontos), "--saida", saida],
+                cwd=RAIZ, env=env, stdout=log, stderr=log,
+            )
+            if proc.returncode != 0 or not os.path.exists(saida):
+                execucoes.append({"tamanho": tamanho, "status": f"falhou (código {proc.returncode})"})
+                continue
+            with open(saida, encoding="utf-8") as f:
+                resultado = json.load(f)
+            resultado["requisicoes_stub"] = {s.nome: s.requisicoes for s in stubs}
+            execucoes.append(resultado)
+            print(f"[bench] tamanho {tamanho}: {resultado['pipeline_seg']}s "
+                  f"(seed {resultado['seed_seg']}s, pico {resultado['pico_memoria_mb']} MB)", flush=True)
+
+    for s in stubs:
+        s.parar()
+    return {
+        "commit": _commit(),
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {"tamanhos": tamanhos, "lojas": args.lojas, "pontos": args.pontos, "paginas": args.paginas,
+                       "itens_por_pagina": args.itens_por_pagina, "latencia_ms": args.latencia_ms},
+        "execucoes": execucoes,
+    }
+
+
+def comparar(base_path: str, novo_path: str):
+    """Duração e queries por estágio, lado a lado, para os tamanhos presentes nos dois resultados."""
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(novo_path, encoding="utf-8") as f:
+        novo = json.load(f)
+    print(f"base: {base['commit']} ({base['data']})  novo: {novo['commit']} ({novo['data']})")
+    por_tamanho = {e["tamanho"]: e for e in base["execucoes"] if "estagios" in e}
+    for e in novo["execucoes"]:
+        b = por_tamanho.get(e["tamanho"])
+        if b is None or "estagios" not in e:
+            continue
+        print(f"\ntamanho {e['tamanho']}: pipeline {b['pipeline_seg']}s -> {e['pipeline_seg']}s, "
+              f"pico {b['pico_memoria_mb']} -> {e['pico_memoria_mb']} MB")
+        print(f"  {'estágio':<12}{'duração (s)':>24}{'variação':>10}{'queries':>20}")
+        for nome, d in e["estagios"].items():
+            db_ = b["estagios"].get(nome)
+            if not db_:
+                continue
+            var = (d["duracao_seg"] / db_["duracao_seg"] - 1) * 100 if db_["duracao_seg"] else 0.0
+            print(f"  {nome:<12}{db_['duracao_seg']:>11.3f} -> {d['duracao_seg']:<9.3f}{var:>+9.1f}%"
+                  f"{db_['db_queries']:>9} -> {d['db_queries']:<7}")
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] == "_executar":
+        p = argparse.ArgumentParser()
+        p.add_argument("--tamanho", type=int, required=True)
+        p.add_argument("--lojas", type=int, required=True)
+        p.add_argument("--pontos", type=int, required=True)
+        p.add_argument("--saida", required=True)
+        a = p.parse_args(argv[1:])
+        executar(a.tamanho, a.lojas, a.pontos, a.saida)
+        return
+    if argv and argv[0] == "comparar":
+        p = argparse.ArgumentParser(prog="bench_pipeline comparar")
+        p.add_argument("base")
+        p.add_argument("novo")
+        a = p.parse_args(argv[1:])
+        comparar(a.base, a.novo)
+        return
+
+    p = argparse.ArgumentParser(description="Benchmark ponta a ponta do pipeline com serviços locais.")
+    p.add_argument("--tamanhos", default="1000,10000", help="produtos semeados por execução (separados por vírgula)")
+    p.add_argument("--lojas", type=int, default=20)
+    p.add_argument("--pontos", type=int, default=10, help="pontos de histórico por produto")
+    p.add_argument("--paginas", type=int, default=3, help="páginas da listagem coletadas (ML_MAX_PAGES)")
+    p.add_argument("--itens-por-pagina", type=int, default=48)
+    p.add_argument("--latencia-ms", type=float, default=0.0, help="latência simulada de cada resposta dos stubs")
+    p.add_argument("-o", "--saida", help="arquivo JSON (padrão: benchmarks/resultados/<data>_<commit>.json)")
+    p.add_argument("-v", "--verbose", action="store_true", help="mostra o log do pipeline")
+    args = p.parse_args(argv)
+
+    resultado = rodar(args)
+    saida = args.saida
+    if not saida:
+        os.makedirs(RESULTADOS, exist_ok=True)
+        saida = os.path.join(RESULTADOS, f"{datetime.now():%Y%m%d_%H%M%S}_{resultado['commit']}.json")
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"[bench] resultado gravado em {saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+# benchmarks/dados_sinteticos.py
+"""
+Gerador de dados sintéticos em volume de produção, para perfilar painel, validador e consultas de
+histórico localmente.
+
+Preenche um banco sem produtos com lojas, tags, canais (ligados às tags), produtos, histórico de
+preços e ofertas em todos os status (as publicadas com ofertas_publicadas e metricas_ofertas), tudo
+via executemany em lotes, com commit a cada lote de produtos (WAL sob controle).
+
+    DATABASE_URL=sqlite:///./escala.db python -m benchmarks.dados_sinteticos --produtos 1000000 --historico 50000000
+
+Dinâmica dos preços, por (produto, loja): preço base log-normal em torno da mediana da categoria e
+ajustado por loja; a cada observação o preço regular pode ser reajustado (com viés de queda), subir
+antes de uma promoção ("maquiagem") ou entrar em promoção de 10-45% por algumas observações. Preços
+terminam em ,90 e repetem entre observações, como no histórico real (poucos intervalos por par).
+
+Volume:
+- os lotes de produtos são gerados em processos separados (--processos) e gravados, em ordem, pelo
+  processo principal; cada lote tem a própria semente, então o banco não depende do nº de processos;
+- histórico e intervalos (o grosso das linhas) vão como tuplas para o executemany do driver, sem o
+  processamento de parâmetros por linha do insert() — as datas já saem no formato do DateTime;
+- synchronous=OFF durante a carga, e os índices secundários de historico_precos/intervalos_precos
+  saem e voltam no fim (criados uma vez só, em vez de mantidos linha a linha).
+Como nada passa pelos eventos do ORM, os intervalos de preço são gerados junto com cada série
+(intervalos_de, a mesma regra do rebuild_intervalos) e o índice FTS é reconstruído ao final.
+"""
+import argparse
+import bisect
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+try:
+    from benchmarks.stubs import TAGS, VENDEDOR_BASE, codigo
+except Exception:
+    from stubs import TAGS, VENDEDOR_BASE, codigo
+
+# Mediana de preço por categoria (R$); tags além destas sorteiam a própria mediana
+PRECO_MEDIANO = {"fone": 150, "notebook": 3500, "monitor": 1100, "teclado": 220, "mouse": 110,
+                 "cadeira": 900, "geladeira": 3200, "celular": 1800}
+MARCAS = ("Acme", "Zênite", "Orion", "Vértice", "Nimbus", "Astra", "Pulsar", "Boreal", "Quasar", "Atlas")
+
+# Fração das ofertas por status (o resto fica PENDENTE_APROVACAO, sem anotação do validador)
+FRACAO_STATUS = {
+    "PUBLICADO": 0.25, "REJEITADO": 0.30, "APROVADO": 0.03, "AGENDADO": 0.02, "PUBLICANDO": 0.002,
+    "REJEITADA_SEM_CANAL": 0.02, "REJEITADA_ERRO_DADOS": 0.008,
+}
+_STATUS = list(FRACAO_STATUS)
+_LIMITES = list(itertools.accumulate(FRACAO_STATUS.values()))
+
+# Quantas lojas vendem cada produto (1, 2 ou 3), em probabilidade acumulada
+_LOJAS_POR_PRODUTO = (0.6, 0.9, 1.0)
+_JANELA_MEDIA = timedelta(days=90)   # mesma janela do validador (3 meses)
+
+_SQL_HISTORICO = "INSERT INTO historico_precos (produto_id, loja_id, preco, data_verificacao) VALUES (?, ?, ?, ?)"
+_SQL_INTERVALO = ("INSERT INTO intervalos_precos (produto_id, loja_id, preco, valido_de, valido_ate, "
+                  "observacoes) VALUES (?, ?, ?, ?, ?, ?)")
+
+
+def _preco_vitrine(valor: float) -> float:
+    """R$ 1234,56 -> R$ 1234,90 (preço "quebrado" de vitrine)."""
+    return max(round(valor) - 0.10, 0.90)
+
+
+def _nome_tag(k: int) -> str:
+    return TAGS[k] if k < len(TAGS) else f"categoria-{k:04d}"
+
+
+def serie_precos(rng: random.Random, base: float, n: int, inicio: datetime, fim: datetime):
+    """
+    n observações (data, preço) de um (produto, loja), em ordem de data, entre inicio e fim.
+    A data sai como texto no formato que o DateTime do SQLAlchemy grava no SQLite (ordena igual).
+    """
+    aleatorio = rng.random
+    t0 = inicio.timestamp()
+    passo = (fim.timestamp() - t0) / max(n, 1)
+    regular, promo, desconto = base, 0, 0.0
+    for k in range(n):
+        if not promo:
+            r = aleatorio()
+            if r < 0.04:        # promoção por 1-6 observações
+                promo, desconto = rng.randint(1, 6), 0.10 + 0.35 * aleatorio()
+            elif r < 0.14:      # reajuste do regular, com viés de queda (eletrônicos depreciam)
+                regular *= 0.93 + 0.12 * aleatorio()
+            elif r < 0.16:      # "maquiagem": sobe antes de uma promoção
+                regular *= 1.10 + 0.15 * aleatorio()
+        if promo:
+            preco = regular * (1 - desconto)
+            promo -= 1
+        else:
+            preco = regular
+        data = datetime.fromtimestamp(t0 + passo * (k + 0.1 + 0.8 * aleatorio()))
+        yield data.isoformat(" ", "microseconds"), _preco_vitrine(preco)
+
+
+def _indices_secundarios(conn, tabela: str) -> list:
+    """(nome, sql) dos índices criados explicitamente na tabela (não os automáticos de UNIQUE/PK)."""
+    from sqlalchemy import text
+
+    return conn.execute(
+        text("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :t AND sql IS NOT NULL"),
+        {"t": tabela},
+    ).all()
+
+
+# ---------------------------
+# Geração de um lote de produtos (roda nos processos do pool)
+# ---------------------------
+_CTX: dict = {}
+
+
+def _iniciar_processo(ctx: dict):
+    _CTX.update(ctx)
+
+
+def _gerar_lote(base: int) -> dict:
+    """Produtos [base, base + lote) com tags, histórico, intervalos e ofertas."""
+    from backend.db.intervalos import intervalos_de
+
+    c = _CTX
+    rng = random.Random(c["semente"] * 1_000_003 + base)
+    lojas, tags, agora = c["lojas"], c["tags"], c["agora"]
+    limite_3m = (agora - _JANELA_MEDIA).isoformat(" ", "microseconds")
+    pontos, sobra_pontos = c["pontos"]
+    por_produto, sobra_ofertas = c["ofertas"]
+    oferta_id = base * por_produto + min(base, sobra_ofertas)
+    lote = {k: [] for k in ("produtos", "produto_tags", "historico", "intervalos", "ofertas",
+                            "publicadas", "metricas")}
+
+    for i in range(base, min(base + c["lote"], c["produtos"])):
+        tag = i % tags
+        lote["produtos"].append({
+            "id": i + 1, "id_product": codigo(i), "product_id_loja": str(VENDEDOR_BASE + i % lojas),
+            "product_id_loja_alt": codigo(i),
+            "nome_produto": f"{_nome_tag(tag).capitalize()} {MARCAS[i % len(MARCAS)]} Modelo {i} Edição {i % 97}",
+            "url_base": f"https://produto.mercadolivre.com.br/{codigo(i)}", "imagem_url": None,
+        })
+        lote["produto_tags"].append({"produto_id": i + 1, "tag_id": tag + 1})
+
+        # Lojas do produto: a principal (a do vendedor, como nos stubs) e talvez mais uma ou duas
+        n_lojas = min(bisect.bisect(_LOJAS_POR_PRODUTO, rng.random()) + 1, lojas)
+        lojas_produto = [i % lojas]
+        while len(lojas_produto) < n_lojas:
+            loja = rng.randrange(lojas)
+            if loja not in lojas_produto:
+                lojas_produto.append(loja)
+        base_preco = c["medianas"][tag] * rng.lognormvariate(0, 0.45)
+        n_pontos = pontos + (1 if i < sobra_pontos else 0)
+
+        # Da loja principal saem a última observação e a média 3m usadas nas ofertas
+        ultimo, media_3m = base_preco, None
+        for j, loja in enumerate(lojas_produto):
+            n = n_pontos // n_lojas + (1 if j < n_pontos % n_lojas else 0)
+            fator_loja = 1 + ((loja * 37) % 13 - 4) / 100
+            serie = [(i + 1, loja + 1, preco, data)
+                     for data, preco in serie_precos(rng, base_preco * fator_loja, n, c["inicio"], agora)]
+            lote["historico"].extend(serie)
+            lote["intervalos"].extend((iv["produto_id"], iv["loja_id"], iv["preco"], iv["valido_de"],
+                                       iv["valido_ate"], iv["observacoes"]) for iv in intervalos_de(serie))
+            if j == 0 and serie:
+                ultimo = serie[-1][2]
+                recentes = [preco for _, _, preco, data in serie if data >= limite_3m]
+                media_3m = sum(recentes) / len(recentes) if recentes else None
+
+        for _ in range(por_produto + (1 if i < sobra_ofertas else 0)):
+            oferta_id += 1
+            oferta, publicadas, metricas = _oferta(rng, oferta_id, i, lojas_produto[0], tag, ultimo, media_3m,
+                                                   agora, c["canais_por_tag"])
+            lote["ofertas"].append(oferta)
+            lote["publicadas"].extend(publicadas)
+            lote["metricas"].extend(metricas)
+    return lote
+
+
+def _oferta(rng, oferta_id: int, i: int, loja: int, tag: int, ultimo: float, media_3m, agora: datetime,
+            canais_por_tag: dict):
+    """Linha de ofertas (+ ofertas_publicadas/metricas_ofertas se publicada) coerente com o status."""
+    preco_oferta = _preco_vitrine(ultimo * (1 - rng.uniform(0.0, 0.35)))
+    preco_original = _preco_vitrine(max(ultimo, preco_oferta) * rng.uniform(1.0, 1.35))
+    encontrado = agora - timedelta(seconds=rng.randint(0, 30 * 86400))
+    k = bisect.bisect(_LIMITES, rng.random())
+    status = _STATUS[k] if k < len(_STATUS) else "PENDENTE_APROVACAO"
+    canais = canais_por_tag.get(tag, [])
+    if status == "PUBLICADO" and not canais:
+        status = "REJEITADA_SEM_CANAL"
+
+    desconto = motivo = publicacao = curta = mensagem = None
+    if status != "PENDENTE_APROVACAO":   # já passou pelo validador (mesmo texto que ele grava)
+        if media_3m:
+            desconto = (media_3m - preco_oferta) / media_3m * 100
+            motivo = (f"Média 3m R$ {media_3m:.2f} · Preço atual R$ {preco_oferta:.2f} "
+                      f"· Δ vs média {desconto:.1f}%")
+        else:
+            desconto = (preco_original - preco_oferta) / preco_original * 100
+            motivo = (f"Sem histórico · De R$ {preco_original:.2f} por R$ {preco_oferta:.2f} "
+                      f"· Desconto informado {desconto:.1f}%")
+    if status == "PUBLICADO":
+        publicacao = encontrado + timedelta(minutes=rng.randint(5, 600))
+        curta = f"https://bit.ly/s{oferta_id:x}"
+        mensagem = str(oferta_id)
+    elif status == "PUBLICANDO":
+        publicacao = agora - timedelta(minutes=rng.randint(0, 30))
+    elif status == "AGENDADO":
+        publicacao = agora + timedelta(minutes=rng.randint(10, 7 * 1440))
+
+    oferta = {
+        "id": oferta_id, "produto_id": i + 1, "loja_id": loja + 1, "preco_original": preco_original,
+        "preco_oferta": preco_oferta, "url_afiliado_longa": f"https://produto.mercadolivre.com.br/{codigo(i)}",
+        "url_afiliado_curta": curta, "data_encontrado": encontrado, "data_validade": None, "status": status,
+        "motivo_validacao": motivo, "data_publicacao": publicacao, "mensagem_id_telegram": mensagem,
+        "desconto_real": desconto,
+    }
+    publicadas, metricas = [], []
+    if status == "PUBLICADO":
+        publicadas = [{"oferta_id": oferta_id, "canal_id": canal, "data_publicacao": publicacao,
+                       "mensagem_id_telegram": mensagem} for canal in canais]
+        cliques = int(rng.paretovariate(1.5) * 5)
+        metricas = [{"oferta_id": oferta_id, "cliques": cliques, "vendas": int(cliques * rng.uniform(0, 0.05)),
+                     "data_atualizacao": publicacao + timedelta(hours=rng.randint(1, 48))}]
+    return oferta, publicadas, metricas
+
+
+# ---------------------------
+# Carga
+# ---------------------------
+def gerar(produtos: int, historico: int, lojas: int = 50, tags: int = len(TAGS), canais: int = None,
+          ofertas: int = None, dias: int = 365, semente: int = 42, lote: int = 5000, processos: int = 1,
+          log=print) -> dict:
+    """
+    Gera o banco inteiro (ver docstring do módulo) e devolve a contagem de linhas por tabela.
+    `historico` é o total de observações de preço, repartido entre os produtos e suas lojas;
+    `lote` é o nº de produtos por transação.
+    """
+    from sqlalchemy import func, insert, select
+
+    from backend.db.database import SQLITE_SYNCHRONOUS, create_db_tables, engine
+    from backend.db.fts import rebuild_fts
+    from backend.models.models import (
+        CanalTelegram, HistoricoPreco, IntervaloPreco, LojaConfiavel, MetricaOferta, Oferta,
+        OfertaPublicada, Produto, Tag, canal_tags, produto_tags,
+    )
+
+    canais = tags if canais is None else canais
+    ofertas = produtos if ofertas is None else ofertas
+    lojas, tags = max(lojas, 1), max(tags, 1)
+    rng = random.Random(semente)
+    agora = datetime.now().replace(microsecond=0)
+    medianas = [PRECO_MEDIANO.get(_nome_tag(k)) or rng.choice((80, 300, 900, 2500)) for k in range(tags)]
+    canais_por_tag = {}
+    for c in range(canais):
+        canais_por_tag.setdefault(c % tags, []).append(c + 1)
+    ctx = {
+        "semente": semente, "produtos": produtos, "lote": lote, "lojas": lojas, "tags": tags,
+        "medianas": medianas, "canais_por_tag": canais_por_tag, "agora": agora,
+        "inicio": agora - timedelta(days=dias),
+        "pontos": divmod(historico, produtos) if produtos else (0, 0),
+        "ofertas": divmod(ofertas, produtos) if produtos else (0, 0),
+    }
+    contagem = dict.fromkeys(("lojas", "tags", "canais", "produtos", "historico", "intervalos", "ofertas",
+                              "ofertas_publicadas", "metricas"), 0)
+
+    create_db_tables()
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(Produto.__table__)).scalar():
+            raise RuntimeError("O banco já tem produtos: aponte DATABASE_URL para um banco novo.")
+
+        indices = (_indices_secundarios(conn, HistoricoPreco.__tablename__)
+                   + _indices_secundarios(conn, IntervaloPreco.__tablename__))
+        # Qualquer falha daqui em diante (worker, constraint...) ainda devolve os índices e o
+        # synchronous no finally: o banco nunca fica sem eles, mesmo com a carga pela metade
+        pool = None
+        try:
+            conn.exec_driver_sql("PRAGMA synchronous = OFF")
+            for nome, _ in indices:
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {nome}")
+
+            # Tabelas pequenas
+            conn.execute(insert(Tag.__table__), [{"id": k + 1, "nome_tag": _nome_tag(k)} for k in range(tags)])
+            conn.execute(insert(LojaConfiavel.__table__), [
+                {"id": k + 1, "nome_loja": f"Loja {VENDEDOR_BASE + k}", "plataforma": "Mercado Livre",
+                 "id_loja_api": str(VENDEDOR_BASE + k), "id_loja_api_alt": None,
+                 "pontuacao_confianca": 1 + k % 5, "ativa": True}
+                for k in range(lojas)
+            ])
+            if canais:
+                conn.execute(insert(CanalTelegram.__table__), [
+                    {"id": c + 1, "id_canal_api": f"-100{c + 1:010d}", "nome_amigavel": f"Ofertas {_nome_tag(c % tags)}",
+                     "ativo": True, "inscritos": rng.randint(50, 50000)}
+                    for c in range(canais)
+                ])
+                conn.execute(insert(canal_tags), [{"canal_id": c + 1, "tag_id": c % tags + 1} for c in range(canais)])
+            conn.commit()
+            contagem.update(lojas=lojas, tags=tags, canais=canais)
+
+            # Lotes de produtos: gerados no pool (ou aqui mesmo), gravados em ordem
+            bases = range(0, produtos, lote)
+            if processos > 1 and len(bases) > 1:
+                pool = multiprocessing.Pool(processos, initializer=_iniciar_processo, initargs=(ctx,))
+                lotes = pool.imap(_gerar_lote, bases)
+            else:
+                _iniciar_processo(ctx)
+                lotes = map(_gerar_lote, bases)
+            t0 = time.perf_counter()
+            for dados in lotes:
+                conn.execute(insert(Produto.__table__), dados["produtos"])
+                conn.execute(insert(produto_tags), dados["produto_tags"])
+                if dados["historico"]:
+                    conn.exec_driver_sql(_SQL_HISTORICO, dados["historico"])
+                    conn.exec_driver_sql(_SQL_INTERVALO, dados["intervalos"])
+                for tabela, chave in ((Oferta, "ofertas"), (OfertaPublicada, "publicadas"), (MetricaOferta, "metricas")):
+                    if dados[chave]:
+                        conn.execute(insert(tabela.__table__), dados[chave])
+                conn.commit()
+                contagem["produtos"] += len(dados["produtos"])
+                contagem["historico"] += len(dados["historico"])
+                contagem["intervalos"] += len(dados["intervalos"])
+                contagem["ofertas"] += len(dados["ofertas"])
+                contagem["ofertas_publicadas"] += len(dados["publicadas"])
+                contagem["metricas"] += len(dados["metricas"])
+                decorrido = time.perf_counter() - t0
+                log(f"[dados] {contagem['produtos']}/{produtos} produtos, {contagem['historico']} históricos "
+                    f"({decorrido:.0f}s, {contagem['historico'] / decorrido if decorrido else 0:,.0f} linhas/s)")
+        finally:
+            if pool is not None:
+                pool.terminate()
+            conn.rollback()   # lote interrompido no meio (no caminho normal não há nada pendente)
+            t1 = time.perf_counter()
+            existentes = {r[0] for r in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            for nome, sql in indices:
+                if nome not in existentes:
+                    conn.exec_driver_sql(sql)
+            conn.commit()
+            conn.exec_driver_sql(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+
+        # Índice FTS (Core não dispara os eventos do ORM) e estatísticas
+        rebuild_fts(conn)
+        conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+        log(f"[dados] índices e FTS reconstruídos ({time.perf_counter() - t1:.0f}s)")
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return contagem
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Preenche um banco novo com dados sintéticos em volume de produção.")
+    p.add_argument("--produtos", type=int, default=100000)
+    p.add_argument("--historico", type=int, default=None, help="total de observações de preço (padrão: 50 por produto)")
+    p.add_argument("--lojas", type=int, default=200)
+    p.add_argument("--tags", type=int, default=len(TAGS))
+    p.add_argument("--canais", type=int, default=None, help="padrão: um por tag")
+    p.add_argument("--ofertas", type=int, default=None, help="padrão: uma por produto")
+    p.add_argument("--dias", type=int, default=365, help="período coberto pelo histórico")
+    p.add_argument("--semente", type=int, default=42)
+    p.add_argument("--lote", type=int, default=5000, help="produtos por transação")
+    p.add_argument("--processos", type=int, default=os.cpu_count() or 1, help="processos gerando lotes")
+    a = p.parse_args(argv)
+
+    sys.path.insert(0, RAIZ)
+    t0 = time.perf_counter()
+    contagem = gerar(a.produtos, a.produtos * 50 if a.historico is None else a.historico, lojas=a.lojas,
+                     tags=a.tags, canais=a.canais, ofertas=a.ofertas, dias=a.dias, semente=a.semente,
+                     lote=a.lote, processos=a.processos)
+    print(f"[dados] concluído em {time.perf_counter() - t0:.0f}s: "
+          + ", ".join(f"{k}={v}" for k, v in contagem.items()))
+
+
+if __name__ == "__main__":
+    main()
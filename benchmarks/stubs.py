@@ -0,0 +1,182 @@
+# benchmarks/stubs.py
+"""
+Servidores HTTP locais que fazem o papel do Mercado Livre (listagem /ofertas e páginas de produto),
+da Bot API do Telegram e da API do Bitly, para o benchmark rodar o pipeline sem rede.
+
+O catálogo é determinístico: o item i tem o código MLB{i:010d}, nome com uma das tags do
+benchmark e vendedor VENDEDOR_BASE + i % n_lojas (as lojas que o seed cadastra como ativas).
+`rodada` muda os preços, então execuções seguidas geram histórico novo.
+Cada servidor conta as próprias requisições e pode simular latência de rede (latencia_ms).
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TAGS = ("fone", "notebook", "monitor", "teclado", "mouse", "cadeira", "geladeira", "celular")
+VENDEDOR_BASE = 100000
+
+
+def codigo(i: int) -> str:
+    return f"MLB{i:010d}"
+
+
+def nome_produto(i: int) -> str:
+    return f"{TAGS[i % len(TAGS)].capitalize()} Modelo {i} Edição {i % 97}"
+
+
+def preco(i: int, rodada: int = 0) -> tuple:
+    """(preço original, preço com desconto) do item na rodada."""
+    original = 50.0 + (i * 37) % 4950
+    desconto = 10 + (i + rodada * 7) % 40
+    return original, round(original * (100 - desconto) / 100, 2)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, como os servidores reais
+    disable_nagle_algorithm = True  # sem isso cada resposta espera o ACK atrasado (~40 ms)
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status: int, corpo: str, tipo: str = "application/json"):
+        dados = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{tipo}; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _entrar(self):
+        stub = self.server.stub
+        stub.contar()
+        if stub.latencia_ms:
+            time.sleep(stub.latencia_ms / 1000)
+        return stub
+
+    def do_GET(self):
+        stub = self._entrar()
+        status, corpo, tipo = stub.get(urlparse(self.path))
+        self._responder(status, corpo, tipo)
+
+    def do_POST(self):
+        stub = self._entrar()
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(tamanho) or b"{}")
+        status, corpo = stub.post(urlparse(self.path), payload)
+        self._responder(status, corpo)
+
+
+class Stub:
+    nome = ""
+
+    def __init__(self, latencia_ms: float = 0.0):
+        self.latencia_ms = latencia_ms
+        self.requisicoes = 0
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def contar(self):
+        with self._lock:
+            self.requisicoes += 1
+
+    @property
+    def url(self) -> str:
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def iniciar(self) -> "Stub":
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._servidor.daemon_threads = True
+        self._servidor.stub = self
+        threading.Thread(target=self._servidor.serve_forever, name=f"stub-{self.nome}", daemon=True).start()
+        return self
+
+    def parar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+
+    def get(self, url):
+        return 404, json.dumps({"erro": "não encontrado"}), "application/json"
+
+    def post(self, url, payload):
+        return 404, json.dumps({"erro": "não encontrado"})
+
+
+class MercadoLivreStub(Stub):
+    """GET /ofertas?page=N (cards com as classes que a MercadoLivreFonte lê) e GET /produto/MLB... ."""
+    nome = "mercadolivre"
+
+    def __init__(self, latencia_ms: float = 0.0, itens_por_pagina: int = 48, n_lojas: int = 20, rodada: int = 0):
+        super().__init__(latencia_ms)
+        self.itens_por_pagina = itens_por_pagina
+        self.n_lojas = n_lojas
+        self.rodada = rodada
+
+    def _card(self, i: int) -> str:
+        original, oferta = preco(i, self.rodada)
+        desconto = round(100 - oferta * 100 / original)
+        brl = lambda v: f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        return (
+            '<div class="poly-card">'
+            f'<img class="poly-component__picture" data-src="{self.url}/img/{i}.webp"/>'
+            f'<h3 class="poly-component__title-wrapper"><a class="poly-component__title" '
+            f'href="{self.url}/produto/{codigo(i)}-{i}">{nome_produto(i)}</a></h3>'
+            f'<s class="andes-money-amount andes-money-amount--previous andes-money-amount--cents-comma">{brl(original)}</s>'
+            f'<span class="andes-money-amount andes-money-amount--cents-superscript">{brl(oferta)}</span>'
+            f'<span class="andes-money-amount__discount">{desconto}% OFF</span>'
+            '</div>'
+        )
+
+    def _produto(self, i: int) -> str:
+        vendedor = VENDEDOR_BASE + i % self.n_lojas
+        return (
+            "<html><body>"
+            f'<h1 class="ui-pdp-title">{nome_produto(i)}</h1>'
+            f'<a href="{self.url}/perfil?item_id={codigo(i)}&seller_id={vendedor}">Ver mais dados</a>'
+            f'<h2 class="ui-seller-data-header__title">Vendido por Loja {vendedor}</h2>'
+            f'<input type="hidden" name="parent_url" value="/p/{codigo(i)}"/>'
+            "</body></html>"
+        )
+
+    def get(self, url):
+        if url.path == "/ofertas":
+            pagina = int(parse_qs(url.query).get("page", ["1"])[0])
+            inicio = (pagina - 1) * self.itens_por_pagina
+            cards = "".join(self._card(i) for i in range(inicio, inicio + self.itens_por_pagina))
+            return 200, f"<html><body>{cards}</body></html>", "text/html"
+        if url.path.startswith("/produto/MLB"):
+            i = int(url.path.rsplit("-", 1)[-1])
+            return 200, self._produto(i), "text/html"
+        return super().get(url)
+
+
+class TelegramStub(Stub):
+    """POST /bot<token>/sendMessage -> ok com message_id sequencial."""
+    nome = "telegram"
+
+    def post(self, url, payload):
+        if url.path.endswith("/sendMessage"):
+            return 200, json.dumps({"ok": True, "result": {"message_id": self.requisicoes,
+                                                          "chat": {"id": payload.get("chat_id")}}})
+        return super().post(url, payload)
+
+
+class BitlyStub(Stub):
+    """POST /v4/shorten e GET /v4/bitlinks/<id>/clicks."""
+    nome = "bitly"
+
+    def post(self, url, payload):
+        if url.path == "/v4/shorten":
+            n = self.requisicoes
+            return 200, json.dumps({"id": f"bit.ly/b{n}", "link": f"https://bit.ly/b{n}",
+                                    "long_url": payload.get("long_url")})
+        return super().post(url, payload)
+
+    def get(self, url):
+        if url.path.startswith("/v4/bitlinks/") and url.path.endswith("/clicks"):
+            return 200, json.dumps({"link_clicks": 10 + self.requisicoes % 90, "units": -1, "unit": "day"}), \
+                "application/json"
+        return super().get(url)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PipelineDaemon — processo residente que roda cada estágio da curadoria no seu próprio ritmo,
+em vez de o cron disparar o pipeline inteiro a cada 2 horas.
+
+- coleta:      a cada DAEMON_COLETA_MIN (padrão 15 min)
+- validação:   incremental, oferta a oferta, a partir dos eventos OFERTA_CRIADA do Collector
+               (barramento em processo); varredura completa só a cada DAEMON_VALIDACAO_MIN (padrão 60 min)
+- publicação:  a cada DAEMON_PUBLICACAO_MIN (padrão 1 min)
+- métricas:    a cada DAEMON_METRICAS_MIN (padrão 60 min)
+
+Cada estágio roda numa thread própria (uma coleta longa não atrasa a publicação), com uma
+sessão de banco nova por ciclo. Imports, engine, cache de config e sessões HTTP (keep-alive)
+ficam quentes entre os ciclos. SIGTERM/SIGINT: termina o ciclo em andamento e sai.
+
+Uso:
+    python pipeline_daemon.py
+"""
+import os
+import sys
+import signal
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+project_root = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, project_root)
+
+# DB
+try:
+    from backend.db.database import SessionLocal, create_db_tables, engine
+except Exception:
+    from db.database import SessionLocal, create_db_tables, engine  # fallback
+
+# Módulos
+try:
+    from backend.modules.collector import Collector
+except Exception:
+    from modules.collector import Collector  # fallback
+
+try:
+    from backend.modules.validator import Validator
+except Exception:
+    from modules.validator import Validator  # fallback
+
+try:
+    from backend.modules.publisher import Publisher
+except Exception:
+    from modules.publisher import Publisher  # fallback
+
+try:
+    from backend.modules.metrics_analyzer import MetricsAnalyzer
+except Exception:
+    from modules.metrics_analyzer import MetricsAnalyzer  # fallback
+
+try:
+    from backend.utils.bus import bus, drain, OFERTA_CRIADA
+except Exception:
+    from utils.bus import bus, drain, OFERTA_CRIADA  # fallback
+
+try:
+    from backend.utils.run_lock import RunLock
+    from backend.utils.checkpoint import Checkpoint
+except Exception:
+    from utils.run_lock import RunLock  # fallback
+    from utils.checkpoint import Checkpoint  # fallback
+
+try:
+    from backend.utils import historico_arquivo
+    from backend.db.fila_eventos import limpar_eventos
+except Exception:
+    from utils import historico_arquivo  # fallback
+    from db.fila_eventos import limpar_eventos  # fallback
+
+try:
+    from backend.utils.config import get_config
+    from backend.utils.prazo import Prazo, usar
+    from backend.utils.telemetry import telemetria, install_db_hooks, registrar_execucao, limpar_execucoes
+except Exception:
+    from utils.config import get_config  # fallback
+    from utils.prazo import Prazo, usar  # fallback
+    from utils.telemetry import telemetria, install_db_hooks, registrar_execucao, limpar_execucoes  # fallback
+
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(threadName)s - %(message)s",
+    handlers=[logging.StreamHandler()],
+)
+
+
+class PipelineDaemon:
+    def __init__(self):
+        self.parar = threading.Event()
+        self.ofertas_criadas = bus.queue(OFERTA_CRIADA)   # coleta -> validação
+
+        minutos = lambda chave, padrao: float(get_config(chave, padrao)) * 60
+        self.intervalos = {
+            "coleta": minutos("DAEMON_COLETA_MIN", "15"),
+            "validacao": minutos("DAEMON_VALIDACAO_MIN", "60"),
+            "publicacao": minutos("DAEMON_PUBLICACAO_MIN", "1"),
+            "metricas": minutos("DAEMON_METRICAS_MIN", "60"),
+        }
+        # Agrupa os eventos que chegam em sequência (a coleta salva uma oferta por vez)
+        self.janela_validacao = float(get_config("DAEMON_VALIDACAO_JANELA_SEG", "5"))
+        self.retencao_execucoes_dias = float(get_config("EXECUCOES_RETENTION_DAYS", "30"))
+        self.retencao_eventos_horas = float(get_config("FEED_RETENTION_HOURS", "24"))
+
+        # Sessões HTTP mantidas entre ciclos (uma por estágio: cada thread usa a sua)
+        self.http_coleta = requests.Session()
+        self.http_publicacao = requests.Session()
+        self.http_metricas = None   # criada pelo primeiro MetricsAnalyzer (pool do tamanho do executor)
+
+        self._threads: list[threading.Thread] = []
+        self.lock = RunLock("pipeline")   # mesma trava do run_pipeline.py: cron e daemon não rodam juntos
+
+    # ---------- estágios ----------
+    def _coleta(self, db):
+        # progresso por página/item: reiniciar o daemon no meio de uma coleta não baixa tudo de novo
+        checkpoint = Checkpoint("daemon_coleta")
+        Collector(db, http=self.http_coleta).run_collection(checkpoint=checkpoint)
+        checkpoint.concluir()
+
+    def _validacao(self, db):
+        Validator(db).run_validation()   # varredura completa (rede de segurança)
+
+    def _publicacao(self, db):
+        Publisher(db, http=self.http_publicacao).run_publication()
+
+    def _metricas(self, db):
+        analyzer = MetricsAnalyzer(db, http=self.http_metricas)
+        self.http_metricas = analyzer.http
+        analyzer.analyze_metrics()
+        limpar_execucoes(self.retencao_execucoes_dias)
+        limpar_eventos(self.retencao_eventos_horas)   # sem painel aberto, ninguém mais limpa o feed
+        historico_arquivo.arquivar()   # histórico antigo -> Parquet (no que sobrar do prazo do ciclo)
+
+    # ---------- execução ----------
+    def _rodar(self, nome: str, fn):
+        telemetria.reset_stage(nome)
+        inicio = datetime.now()
+        status = "erro"
+        # cada ciclo tem como prazo o intervalo do estágio: o que não couber fica para o próximo
+        prazo = Prazo(self.intervalos[nome])
+        db = SessionLocal()
+        try:
+            with telemetria.stage(nome), usar(prazo):
+                fn(db)
+            db.commit()
+            status = "ok"
+        except Exception as e:
+            db.rollback()
+            logging.exception(f"Erro no estágio {nome}: {e}")
+        finally:
+            db.close()
+            registrar_execucao(status, {**telemetria.resumo(nome), "adiados": prazo.adiados}, inicio)
+
+    def _loop(self, nome: str, fn):
+        intervalo = self.intervalos[nome]
+        proxima = time.monotonic()   # primeira rodada logo na subida
+        while not self.parar.is_set():
+            if time.monotonic() >= proxima:
+                self._rodar(nome, fn)
+                proxima = time.monotonic() + intervalo
+                continue
+            # acorda no máximo a cada 1 s para ver a parada
+            self.parar.wait(min(1.0, max(0.0, proxima - time.monotonic())))
+
+    def _loop_validacao(self):
+        """Valida as ofertas conforme o Collector as cria; a varredura completa fica para o intervalo."""
+        intervalo = self.intervalos["validacao"]
+        proxima = time.monotonic()
+        while not self.parar.is_set():
+            if time.monotonic() >= proxima:
+                self._rodar("validacao", self._validacao)
+                proxima = time.monotonic() + intervalo
+                continue
+            eventos = drain(self.ofertas_criadas, timeout=1.0, janela=self.janela_validacao)
+            if eventos:
+                ids = [e["oferta_id"] for e in eventos]
+                self._rodar("validacao", lambda db: Validator(db).validar_ofertas(ids))
+
+    def start(self) -> bool:
+        create_db_tables()   # tabelas novas e migrações pendentes antes de qualquer estágio
+        if not self.lock.adquirir():
+            logging.error(f"Pipeline já em execução em outro processo ({self.lock.dono_atual}); daemon não iniciado.")
+            return False
+        install_db_hooks(engine)
+        estagios = [
+            ("coleta", self._loop, ("coleta", self._coleta)),
+            ("validacao", self._loop_validacao, ()),
+            ("publicacao", self._loop, ("publicacao", self._publicacao)),
+            ("metricas", self._loop, ("metricas", self._metricas)),
+        ]
+        for nome, alvo, args in estagios:
+            t = threading.Thread(target=alvo, args=args, name=f"estagio-{nome}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        logging.info("=== Daemon de curadoria iniciado: " + ", ".join(
+            f"{n} a cada {timedelta(seconds=s)}" for n, s in self.intervalos.items()) + " ===")
+        return True
+
+    def stop(self, timeout: float = None):
+        """Pede parada e espera cada estágio terminar o ciclo em andamento."""
+        self.parar.set()
+        for t in self._threads:
+            t.join(timeout)
+        for s in (self.http_coleta, self.http_publicacao, self.http_metricas):
+            if s is not None:
+                s.close()
+        self.lock.liberar()
+        logging.info("=== Daemon de curadoria encerrado ===")
+
+    def run_forever(self):
+        def _sinal(signum, frame):
+            if self.parar.is_set():
+                logging.warning("Segundo sinal recebido: saindo sem esperar os estágios.")
+                os._exit(1)
+            logging.info(f"Sinal {signum} recebido: terminando os ciclos em andamento…")
+            self.parar.set()
+
+        signal.signal(signal.SIGTERM, _sinal)
+        signal.signal(signal.SIGINT, _sinal)
+        if not self.start():
+            sys.exit(1)
+        while not self.parar.wait(1.0):
+            pass
+        self.stop()
+
+
+if __name__ == "__main__":
+    PipelineDaemon().run_forever()
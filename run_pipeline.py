@@ -13,9 +13,9 @@ sys.path.insert(0, project_root)
 
 # DB
 try:
-    from backend.db.database import SessionLocal
+    from backend.db.database import SessionLocal, create_db_tables, engine
 except Exception:
-    from db.database import SessionLocal  # fallback
+    from db.database import SessionLocal, create_db_tables, engine  # fallback
 
 # Módulos
 try:
@@ -38,6 +38,37 @@ try:
 except Exception:
     from modules.metrics_analyzer import MetricsAnalyzer  # fallback
 
+try:
+    from backend.utils.bus import bus, drain, OFERTA_CRIADA
+except Exception:
+    from utils.bus import bus, drain, OFERTA_CRIADA  # fallback
+
+try:
+    from backend.utils.run_lock import RunLock
+    from backend.utils.checkpoint import Checkpoint
+except Exception:
+    from utils.run_lock import RunLock  # fallback
+    from utils.checkpoint import Checkpoint  # fallback
+
+try:
+    from backend.utils.config import get_config
+    from backend.utils.prazo import Prazo, usar
+except Exception:
+    from utils.config import get_config  # fallback
+    from utils.prazo import Prazo, usar  # fallback
+
+try:
+    from backend.utils.telemetry import telemetria, install_db_hooks, registrar_execucao
+except Exception:
+    from utils.telemetry import telemetria, install_db_hooks, registrar_execucao  # fallback
+
+try:
+    from backend.utils import historico_arquivo
+    from backend.db.fila_eventos import limpar_eventos
+except Exception:
+    from utils import historico_arquivo  # fallback
+    from db.fila_eventos import limpar_eventos  # fallback
+
 
 logging.basicConfig(
     level=logging.INFO,
@@ -48,44 +79,107 @@ logging.basicConfig(
 class RunPipeline:
     def __init__(self):
         self.db = SessionLocal()
+        self.ofertas_criadas = None   # eventos do Collector desta execução (assinada em run())
+
+    def _estagio(self, nome: str, descricao: str, fn, minimo_seg: float = 0.0):
+        """
+        Roda um estágio (pulando se a execução interrompida já o concluiu) e grava o checkpoint.
+        Estágios de baixa prioridade passam `minimo_seg`: sem esse tempo no prazo, ficam para a próxima.
+        """
+        if self.checkpoint.feito(nome):
+            logging.info(f"{descricao[:1].upper() + descricao[1:]}: já concluída na execução interrompida, pulando.")
+            return
+        if self.prazo.restante() < max(minimo_seg, 1.0):
+            self.prazo.adiar(nome, f"estágio pulado ({self.prazo.restante():.0f}s restantes)")
+            return
+        logging.info(f"Iniciando {descricao}…")
+        with telemetria.stage(nome):
+            fn()
+        self.db.commit()
+        self.checkpoint.estagio_ok(nome)
+        logging.info(f"{descricao[:1].upper() + descricao[1:]} concluída.")
 
     def run(self):
+        # Tabelas novas e migrações pendentes (trava, checkpoint etc. vêm do create_all)
+        create_db_tables()
+        status = "erro"
+        self.prazo = None
+        # Uma execução por vez (cron + execução longa, daemon no ar etc.)
+        lock = RunLock("pipeline")
+        if not lock.adquirir():
+            logging.warning(f"Outra execução do pipeline em andamento ({lock.dono_atual}); saindo.")
+            self.db.close()
+            return
+        # Toda a preparação fica dentro do try: qualquer falha ainda libera a trava no finally
         try:
-            logging.info("=== Iniciando Pipeline (classe) de Curadoria de Ofertas ===")
+            # assinatura só durante a execução: o daemon e o benchmark criam várias instâncias no processo
+            self.ofertas_criadas = bus.queue(OFERTA_CRIADA)
+            # Tempos/contadores por estágio (log JSON ao fim de cada um + resumo em execucoes_pipeline)
+            install_db_hooks(engine)
+            telemetria.reset()
+            # Prazo da execução: termina antes do próximo horário do cron; a coleta para mais cedo
+            # para sobrar tempo para validação/publicação, e métricas só rodam se sobrar o mínimo
+            minutos = lambda chave, padrao: float(get_config(chave, padrao)) * 60
+            self.prazo = Prazo(minutos("PIPELINE_PRAZO_MIN", "110"))
+            reserva_publicacao = minutos("PIPELINE_RESERVA_PUBLICACAO_MIN", "10")
+            minimo_metricas = minutos("PIPELINE_MINIMO_METRICAS_MIN", "5")
 
-            # 1) Coleta (requests+BS4) — baseado no run_pipeline_simple.py
-            logging.info("Iniciando coleta (Collector - requests/BS4)…")
-            collector = Collector(self.db)
-            collector.run_collection()
-            logging.info("Coleta concluída.")
-
-            # 2) Validação — mantém sua lógica atual
-            logging.info("Iniciando validação…")
-            validator = Validator(self.db)
-            validator.run_validation()
-            logging.info("Validação concluída.")
-
-            # 3) Publicação — mantém sua lógica atual
-            logging.info("Iniciando publicação…")
-            publisher = Publisher(self.db)
-            publisher.run_publication()
-            logging.info("Publicação concluída.")
-
-            # 4) Métricas — mantém sua lógica atual
-            logging.info("Iniciando análise de métricas…")
-            metrics_analyzer = MetricsAnalyzer(self.db)
-            metrics_analyzer.analyze_metrics()
-            logging.info("Análise de métricas concluída.")
-
-            self.db.commit()
+            logging.info("=== Iniciando Pipeline (classe) de Curadoria de Ofertas ===")
+            self.checkpoint = Checkpoint("run_pipeline")
+            if self.checkpoint.retomando:
+                logging.info("Retomando execução interrompida a partir do checkpoint.")
+
+            with usar(self.prazo):
+                # 1) Coleta (requests+BS4) — baseado no run_pipeline_simple.py; progresso por página/item
+                def _coleta():
+                    with usar(self.prazo.reservando(reserva_publicacao)):
+                        Collector(self.db).run_collection(checkpoint=self.checkpoint)
+                self._estagio("coleta", "coleta (Collector - requests/BS4)", _coleta)
+
+                # 2) Validação — só as ofertas criadas nesta coleta (eventos OFERTA_CRIADA).
+                #    Na retomada os eventos da execução anterior se perderam: varredura completa.
+                #    Depois, um lote limitado de pendentes nunca anotadas (eventos perdidos em quedas
+                #    sem checkpoint válido, validações que falharam, ofertas antigas).
+                def _validacao():
+                    validator = Validator(self.db)
+                    if self.checkpoint.retomando:
+                        validator.run_validation()
+                    else:
+                        ids = [e["oferta_id"] for e in drain(self.ofertas_criadas, timeout=0, limite=10**9)]
+                        validator.validar_ofertas(ids)
+                        validator.validar_nao_anotadas(int(get_config("VALIDACAO_NAO_ANOTADAS_LOTE", "500")))
+                self._estagio("validacao", "validação", _validacao)
+
+                # 3) Publicação — cada oferta é reservada antes do envio (retomada não republica)
+                self._estagio("publicacao", "publicação", lambda: Publisher(self.db).run_publication())
+
+                # 4) Métricas — baixa prioridade: pulada se não sobrar PIPELINE_MINIMO_METRICAS_MIN.
+                #    Depois, manutenção como no daemon: retenção do feed da fila e histórico antigo
+                #    -> Parquet (no que sobrar do prazo)
+                def _metricas():
+                    MetricsAnalyzer(self.db).analyze_metrics()
+                    limpar_eventos(float(get_config("FEED_RETENTION_HOURS", "24")))
+                    historico_arquivo.arquivar()
+                self._estagio("metricas", "análise de métricas", _metricas, minimo_seg=minimo_metricas)
+
+            self.checkpoint.concluir()
+            status = "ok"
+            if self.prazo.adiados:
+                logging.warning(f"Adiado para a próxima execução: {self.prazo.adiados}")
             logging.info("=== Pipeline executado com sucesso ===")
         except Exception as e:
             self.db.rollback()
             logging.exception(f"Erro durante a execução do pipeline: {e}")
             raise
         finally:
-            self.db.close()
-
+            try:
+                self.db.close()
+                if self.ofertas_criadas is not None:
+                    bus.unsubscribe(OFERTA_CRIADA, self.ofertas_criadas)
+                adiados = self.prazo.adiados if self.prazo else []
+                registrar_execucao(status, {**telemetria.resumo(), "adiados": adiados}, telemetria.iniciado_em)
+            finally:
+                lock.liberar()
 
 if __name__ == "__main__":
     runner = RunPipeline()